@@ -2,16 +2,49 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
 from datetime import datetime, date
+from functools import partial
 from PIL import Image
 import os
-from io import BytesIO
+import multiprocessing
 try:
     import graphviz
     GRAPHVIZ_AVAILABLE = True
 except ImportError:
     GRAPHVIZ_AVAILABLE = False
 
+from simulation import (
+    strategy_pnl, total_profit_fn, find_roots, profit_interval,
+    calculate_strategy as build_strategy_table, margin_requirement, calculate_annualized_return
+)
+from simulation.sweep import SWEEP_PARAMS, sweep_strategy, profit_surface
+from simulation.montecarlo import PRICE_MODELS, basis_risk, monte_carlo_risk
+from simulation.basis import BASIS_DEFAULTS
+from simulation.rolling import (
+    MAIN_MONTHS, contract_strip, implied_carry, rolling_summary, simulate_rolling_hedge
+)
+from simulation.parallel import default_workers, parallel_monte_carlo_risk, parallel_sweep
+from simulation.pricing import black76_price, short_call_position
+from simulation.options import BOOK_PRESETS, OptionBook, book_preset
+from simulation.volatility import fit_surface, read_option_chain
+from simulation.backtest import BACKTEST_COLUMNS, backtest_strategy
+from simulation.io import read_price_history
+from simulation.store import MarketDataStore
+from simulation.hedging import hedge_summary, simulate_dynamic_hedge
+from simulation.margin import margin_summary, simulate_margin
+from simulation.stress import HISTORICAL_SCENARIOS, SCENARIO_FIELDS, SCENARIO_LABELS, shock_grid, stress_test
+from simulation.sensitivity import SENSITIVITY_FACTORS, portfolio_sensitivities
+from simulation.optimize import OPT_LIMITS, OPT_OBJECTIVES, optimize_allocation
+from simulation.portfolio import (
+    ASSET_COLUMNS, DEFAULT_ASSETS, DEFAULT_CORRELATION, AssetBook, CorrelatedAssets, simulate_portfolio
+)
+from simulation.grid import ATR_MULTIPLES, GridProfitCurve, estimate_atr, grid_summary, replay_grid, simulate_grid
+from simulation.cache import ResultCache
+from simulation.graph import ComputeGraph
+from simulation.charts import MARKER_POINTS, MAX_SURFACE_COLUMNS, chart_frame, downsample_indices, render_mode
+from simulation.report import EXCEL_MAX_ROWS, excel_report, table_bytes
+
 # 页面配置
 st.set_page_config(
     page_title="螺纹期现策略模拟系统", 
@@ -172,7 +205,8 @@ st.markdown("""
 # 创建顶部容器 - Logo和标题
 st.markdown('<div class="header-container">', unsafe_allow_html=True)
 
-# 公司Logo - 放置在页面最顶部
+# 公司Logo - 放置在页面最顶部（解码缩放结果跨会话缓存，交互时不重复读取）
+@st.cache_resource
 def load_logo():
     try:
         # 尝试加载本地logo文件
@@ -228,14 +262,44 @@ st.markdown('</div>', unsafe_allow_html=True)
 # =============== 侧边栏参数 ===============
 st.sidebar.header("📊 核心参数设置")
 
+# 行情库目录，可通过环境变量指定
+MARKET_DATA_DIR = os.environ.get("FUTURES_SIM_DATA", "market_data")
+
+@st.cache_resource
+def get_market_store(root):
+    return MarketDataStore(root)
+
+market_store = get_market_store(MARKET_DATA_DIR)
+
+with st.sidebar.expander("行情数据库", expanded=False):
+    store_contract = st.selectbox("从行情库载入合约", ["不使用"] + market_store.contracts())
+    store_row = market_store.latest(store_contract) if store_contract != "不使用" else None
+    if store_row:
+        st.caption(f"最新数据日期: {store_row['date']:%Y-%m-%d}")
+    
+    ingest_file = st.file_uploader("导入日度行情到行情库（CSV/Parquet）", type=["csv", "parquet"],
+                                   help="列: 日期、现货价格、期货价格；只需导入一次，之后按日期区间零拷贝读取")
+    ingest_contract = st.text_input("合约代码", value="RB2510", help="只能包含字母、数字、下划线和连字符").strip()
+    ingest_expiry = st.date_input("该合约到期日", value=date(2025, 10, 15))
+    if ingest_file is not None and st.button("导入行情库"):
+        try:
+            market_store.ingest_file(ingest_contract, ingest_file, ingest_expiry)
+            st.success(f"已导入 {ingest_contract}")
+            st.rerun()
+        except Exception as e:
+            st.warning(f"导入失败: {str(e)}")
+
 with st.sidebar.expander("基础参数", expanded=True):
-    spot_base = st.number_input("当前现货价格（元/吨）", value=3700, step=50)
-    futures_base = st.number_input("当前期货价格（元/吨）", value=3500, step=50)
+    spot_base = st.number_input("当前现货价格（元/吨）",
+                                value=int(round(store_row["spot"])) if store_row else 3700, step=50)
+    futures_base = st.number_input("当前期货价格（元/吨）",
+                                   value=int(round(store_row["futures"])) if store_row else 3500, step=50)
     warehouse = st.number_input("现货库存量（吨）", value=5000, step=500)
     strike_price = st.number_input("期权执行价格（元/吨）", value=3600, step=50)
     capital = st.number_input("策略总资金（万元）", value=1000, step=100)
     risk_free_rate = st.slider("无风险利率（%）", 0.0, 10.0, 2.5, step=0.1)
-    contract_expiry = st.date_input("合约到期日", value=date(2025, 8, 15))
+    contract_expiry = st.date_input("合约到期日",
+                                    value=store_row["expiry"] if store_row and store_row["expiry"] else date(2025, 8, 15))
     
     # 计算合约剩余天数
     today = date.today()
@@ -253,15 +317,82 @@ with st.sidebar.expander("策略仓位配置"):
     
     vol = vol_range_percent / 100
 
+with st.sidebar.expander("模拟网格设置", expanded=False):
+    price_step = st.selectbox("价格步长（元/吨）", [1, 5, 10, 25, 50], index=4)
+    adaptive_grid = st.checkbox("自适应加密网格", value=False,
+                                help="仅在执行价、对冲阈值拐点和盈亏平衡点附近加密价格点")
+
 with st.sidebar.expander("策略收益参数"):
     grid_profit_per_ton = st.slider("网格策略每吨收益（元）", 0, 50, 20)
     # 大幅扩大期权权利金范围至0-300元
     option_premium = st.slider("期权权利金（元/吨）", 0, 300, 20, 
                              help="根据市场波动率调整权利金水平，高波动环境可设置较高权利金")
+    grid_engine = st.checkbox("网格收益按事件驱动模拟", value=False,
+                              help="在蒙特卡洛日内路径上模拟以期货价格为中枢、ATR为间距的网格交易，"
+                                   "网格收益随到期价格变化，替代固定每吨收益")
+    if grid_engine:
+        grid_atr_multiple = st.select_slider("网格间距（ATR倍数）", options=list(ATR_MULTIPLES), value=1.0)
+        grid_levels = st.slider("单边网格档数", 2, 20, 5)
+        grid_steps = st.selectbox("每日价格采样数", [1, 4, 16], index=1)
+        grid_paths = st.selectbox("网格模拟路径数", [2_000, 10_000, 50_000], index=1,
+                                  format_func=lambda n: f"{n:,}")
 
 with st.sidebar.expander("保证金参数", expanded=False):
     futures_margin_ratio = st.slider("期货保证金比例（%）", 5, 20, 10)
     option_margin_ratio = st.slider("期权保证金比例（%）", 10, 30, 15)
+    margin_sim = st.checkbox("逐日盯市保证金模拟", value=False,
+                             help="沿蒙特卡洛价格路径逐日盯市，重算期货与期权保证金，统计追保概率与资金缺口")
+    if margin_sim:
+        cash_reserve = st.number_input("期货账户现金储备（万元）", min_value=1, value=100, step=10)
+        margin_sim_paths = st.selectbox("盯市模拟路径数", [100_000, 200_000, 500_000], index=0,
+                                        format_func=lambda n: f"{n:,}")
+
+with st.sidebar.expander("期权定价（Black-76）", expanded=False):
+    implied_vol = st.slider("期权隐含波动率（%）", 5, 80, 20) / 100
+    option_chain_file = st.file_uploader(
+        "期权报价链（CSV/Parquet）", type=["csv", "parquet"],
+        help="列: 执行价、剩余天数、类型(C/P)、权利金，可选期货价格；上传后按曲面插值得到执行价处隐含波动率"
+    )
+    vol_surface = None
+    if option_chain_file is not None:
+        try:
+            vol_surface = fit_surface(read_option_chain(option_chain_file), futures_base, risk_free_rate / 100)
+            implied_vol = float(vol_surface(strike_price, max(days_to_expiry, 1)))
+            st.success(f"曲面插值隐含波动率: {implied_vol*100:.2f}%")
+        except Exception as e:
+            st.warning(f"报价链解析失败: {str(e)}")
+            vol_surface = None
+    use_model_premium = st.checkbox("权利金采用Black-76理论价", value=False,
+                                    help="以期货价格、执行价、剩余期限、无风险利率和隐含波动率计算看涨期权理论价")
+    
+    # 期权剩余期限（年），已到期按0处理
+    option_years = max(days_to_expiry, 0) / 365
+    model_premium = float(black76_price(futures_base, strike_price, option_years,
+                                        risk_free_rate / 100, implied_vol))
+    st.info(f"Black-76理论权利金: {model_premium:.2f} 元/吨")
+    if use_model_premium:
+        option_premium = model_premium
+
+with st.sidebar.expander("期权组合", expanded=False):
+    multi_leg = st.checkbox("多腿期权组合", value=False,
+                            help="领口、价差、阶梯等多执行价、多到期日组合，替代单腿卖出看涨；"
+                                 "卖权策略列、保证金与报告均按组合计算")
+    option_book = None
+    if multi_leg:
+        book_template = st.selectbox("组合模板", list(BOOK_PRESETS), format_func=BOOK_PRESETS.get)
+        # 模板按当前卖权仓位、执行价与隐含波动率生成，权利金为Black-76理论价，可逐腿修改或增删
+        template_frame = book_preset(book_template, futures_base, strike_price, option_ratio / 100 * warehouse,
+                                     max(days_to_expiry, 1), risk_free_rate / 100, implied_vol).to_frame()
+        book_frame = st.data_editor(template_frame.round({"权利金": 2}), num_rows="dynamic", hide_index=True,
+                                    key=f"option_book_{book_template}")
+        try:
+            # 估值时点为合约到期日：更晚到期的腿按Black-76重估
+            option_book = OptionBook.from_frame(book_frame, horizon=max(days_to_expiry, 0),
+                                                r=risk_free_rate / 100, sigma=implied_vol)
+            st.info(f"{len(option_book)} 条腿，权利金净收入 {option_book.net_premium:,.0f} 元")
+        except Exception as e:
+            st.warning(f"期权组合解析失败: {str(e)}")
+            option_book = None
 
 with st.sidebar.expander("动态对冲参数", expanded=False):
     dynamic_hedge = st.checkbox("启用动态对冲比例", value=True)
@@ -272,176 +403,536 @@ with st.sidebar.expander("动态对冲参数", expanded=False):
         with col4:
             max_hedge = st.slider("最高对冲比例(%)", 50, 100, 80)
         hedge_threshold = st.slider("价格波动阈值(%)", 1, 10, 5)
+    
+    hedge_path_sim = st.checkbox("逐日路径调仓模拟", value=False,
+                                 help="沿蒙特卡洛价格路径逐日检查，涨跌幅超过阈值即按动态对冲规则调仓，计入手续费与滑点")
+    if hedge_path_sim:
+        col_fee, col_slip = st.columns(2)
+        with col_fee:
+            hedge_commission = st.number_input("手续费（万分之）", 0.0, 10.0, 1.0, step=0.5)
+        with col_slip:
+            hedge_slippage = st.number_input("滑点（元/吨）", 0.0, 20.0, 1.0, step=1.0)
+        hedge_paths = st.selectbox("调仓模拟路径数", [5_000, 20_000, 100_000], index=1,
+                                   format_func=lambda n: f"{n:,}")
 
-# =============== 模拟计算 ===============
-@st.cache_data
-def calculate_strategy(spot_base, warehouse, hedge_ratio, grid_ratio, option_ratio,
-                      grid_profit_per_ton, option_premium, vol, strike_price,
-                      dynamic_hedge=True, min_hedge=10, max_hedge=80, hedge_threshold=5):
-    
-    price_range = np.arange(
-        int(spot_base * (1 - vol)),
-        int(spot_base * (1 + vol) + 1),
-        50
-    )
+with st.sidebar.expander("蒙特卡洛模拟", expanded=False):
+    monte_carlo = st.checkbox("启用蒙特卡洛风险评估", value=True,
+                              help="按模拟到期价格分布计算VaR/CVaR，替代价格网格分位数")
+    mc_model = st.selectbox("价格模型", list(PRICE_MODELS), format_func=PRICE_MODELS.get)
+    mc_sigma = st.slider("年化波动率（%）", 5, 80, 20) / 100
+    mc_paths = st.selectbox("模拟路径数", [100_000, 500_000, 1_000_000, 5_000_000], index=2,
+                            format_func=lambda n: f"{n:,}")
+    mc_seed = st.number_input("随机种子", value=42, step=1)
+    mc_precision = st.selectbox("计算精度", ["float64", "float32"])
     
-    results = []
-    for price in price_range:
-        delta = price - spot_base
-        
-        # 动态调整对冲比例
-        if dynamic_hedge:
-            price_change_pct = abs(delta) / spot_base * 100
-            if price_change_pct > hedge_threshold:
-                actual_hedge_ratio = max_hedge
-            else:
-                actual_hedge_ratio = min_hedge + (max_hedge - min_hedge) * (price_change_pct / hedge_threshold)
+    # 合约已到期时按1天模拟
+    mc_days = max(days_to_expiry, 1)
+    if days_to_expiry <= 0:
+        st.warning("合约已到期，蒙特卡洛按1天期限模拟")
+
+with st.sidebar.expander("基差模型", expanded=False):
+    basis_model = st.checkbox("期现联合模拟（随机基差）", value=False,
+                              help="基差围绕线性收敛路径均值回复，并在合约到期日收敛为0；"
+                                   "期货对冲按期货价格变动计盈亏，蒙特卡洛路径中的期货价格同样含随机基差")
+    if basis_model:
+        basis_vol = st.slider("基差年化波动率（元/吨）", 50, 1500, int(BASIS_DEFAULTS["basis_vol"]), step=50)
+        basis_half_life = st.slider("均值回复半衰期（天）", 1, 120, int(BASIS_DEFAULTS["half_life"]))
+        # 合约已到期或仅剩1天时没有可选的平仓时点，按1天模拟
+        if mc_days > 1:
+            basis_days = st.slider("对冲平仓距今天数", 1, mc_days, min(mc_days, 30),
+                                   help="现货销售、期货平仓的时点；到期日平仓时基差已收敛，只剩确定性的收敛损益")
         else:
-            actual_hedge_ratio = hedge_ratio
-        
-        # 现货盈亏
-        spot_pnl = delta * warehouse
-        
-        # 期货对冲盈亏
-        hedge_pnl = -delta * (actual_hedge_ratio / 100) * warehouse
-        
-        # 网格策略收益（固定收益）
-        grid_pnl = grid_profit_per_ton * (grid_ratio / 100) * warehouse
-        
-        # 期权策略收益
-        option_pnl = option_premium * (option_ratio / 100) * warehouse
-        # 当现货价格超过执行价时，期权策略产生损失
-        if price > strike_price:
-            option_loss = (price - strike_price) * (option_ratio / 100) * warehouse
-            option_pnl -= option_loss
-        
-        # 总盈亏
-        total = spot_pnl + hedge_pnl + grid_pnl + option_pnl
-        
-        results.append({
-            "现货价格": price,
-            "价格变化率": delta / spot_base * 100,
-            "现货盈亏": spot_pnl,
-            "期货对冲": hedge_pnl,
-            "实际对冲比例": actual_hedge_ratio,
-            "网格策略": grid_pnl,
-            "卖权策略": option_pnl,
-            "总利润": total
-        })
-    
-    return pd.DataFrame(results)
+            basis_days = 1
+            st.warning("合约已到期或仅剩1天，基差模型按1天平仓模拟")
+
+with st.sidebar.expander("跨期展期对冲", expanded=False):
+    roll_sim = st.checkbox("多合约展期对冲模拟", value=False,
+                           help="期货空单在主力合约序列间逐月展期（如 RB2510 → RB2601 → RB2605），"
+                                "按期限结构计算移仓损益、跨期价差成本与保证金")
+    if roll_sim:
+        roll_horizon = st.slider("对冲期限（天）", 30, 730, 365, step=15)
+        roll_months = st.multiselect("合约月份", list(range(1, 13)), default=list(MAIN_MONTHS))
+        col_r1, col_r2 = st.columns(2)
+        with col_r1:
+            roll_before = st.number_input("到期前完成展期（天）", 0, 90, 30)
+        with col_r2:
+            roll_window = st.number_input("展期窗口（天）", 1, 30, 5)
+        roll_spread = st.number_input("跨期价差成本（元/吨）", 0.0, 30.0, 2.0, step=0.5)
+        # 期限结构斜率默认由当前现货与近月期货价格反推（合约已到期时取0）
+        default_carry = int(np.clip(round(implied_carry(spot_base, futures_base, days_to_expiry) * 100), -60, 30)) \
+            if days_to_expiry > 0 else 0
+        roll_carry = st.slider("期限结构斜率（年化%）", -60, 30, default_carry,
+                               help="各合约期货价格 = 现货 × exp(斜率 × 剩余年限)，负值为贴水（近高远低）") / 100
+        roll_carry_vol = st.slider("斜率波动率（年化%）", 0, 50, 10) / 100
+        roll_paths = st.selectbox("展期模拟路径数", [2_000, 10_000, 50_000], index=1,
+                                  format_func=lambda n: f"{n:,}")
+        # 合约序列与各合约剩余天数都以同一个 today 计算，随 roll_settings 进入计算图
+        roll_today = date.today()
+        roll_strip = contract_strip(roll_today, roll_horizon, roll_months or MAIN_MONTHS,
+                                    roll_before + roll_window)
+        st.caption("合约序列: " + " → ".join(code for code, _ in roll_strip))
+
+with st.sidebar.expander("历史回测", expanded=False):
+    history_file = st.file_uploader(
+        "螺纹钢期现日度行情（CSV/Parquet）", type=["csv", "parquet"],
+        help="列: 日期、现货价格、期货价格"
+    )
+    backtest_cycle = st.slider("期权/调仓周期（交易日）", 5, 60, 20)
+
+# 结果缓存：条目数与内存双重上限，可通过环境变量指定磁盘持久化目录
+RESULT_CACHE_ENTRIES = 64
+RESULT_CACHE_BYTES = 256 * 1024 ** 2
+
+@st.cache_resource
+def get_result_cache(persist_dir):
+    return ResultCache(RESULT_CACHE_ENTRIES, RESULT_CACHE_BYTES, persist_dir=persist_dir)
+
+result_cache = get_result_cache(os.environ.get("FUTURES_SIM_CACHE") or None)
+
+with st.sidebar.expander("计算资源", expanded=False):
+    n_workers = st.number_input("并行进程数", 1, 64, 1,
+                                help=f"本机可用 {default_workers()} 核。大于1时，超过200万路径的蒙特卡洛与大规模参数扫描、"
+                                     "优化分配到多个进程计算，结果与单进程一致；小规模计算仍在单进程内完成")
+    cache_stats_slot = st.empty()
+    graph_stats_slot = st.empty()
+
+# =============== 模拟计算 ===============
+# 策略盈亏表的计算在 simulation.scenario 中（界面与命令行共用），此处只加结果缓存
+calculate_strategy = result_cache.cached(build_strategy_table)
 
 # 执行计算
-df = calculate_strategy(
-    spot_base, warehouse, hedge_ratio, grid_ratio, option_ratio,
-    grid_profit_per_ton, option_premium, vol, strike_price,
-    dynamic_hedge, min_hedge if dynamic_hedge else hedge_ratio, 
-    max_hedge if dynamic_hedge else hedge_ratio, hedge_threshold
+strategy_params = dict(
+    spot_base=spot_base, warehouse=warehouse, hedge_ratio=hedge_ratio,
+    grid_ratio=grid_ratio, option_ratio=option_ratio,
+    grid_profit_per_ton=grid_profit_per_ton, option_premium=option_premium,
+    strike_price=strike_price, dynamic_hedge=dynamic_hedge,
+    min_hedge=min_hedge if dynamic_hedge else hedge_ratio,
+    max_hedge=max_hedge if dynamic_hedge else hedge_ratio,
+    hedge_threshold=hedge_threshold if dynamic_hedge else 5
 )
 
+@result_cache.cached
+def run_grid_simulation(strategy_params, futures_base, sigma, days, n_paths, model, seed,
+                        n_levels, steps_per_day, margin_ratio):
+    terminal, result = simulate_grid(strategy_params, futures_base, sigma, days, n_paths, ATR_MULTIPLES,
+                                     n_levels, model, seed=int(seed), steps_per_day=steps_per_day,
+                                     margin_ratio=margin_ratio)
+    grid_tons = strategy_params["grid_ratio"] / 100 * strategy_params["warehouse"]
+    curves = [GridProfitCurve.from_paths(terminal, total / grid_tons if grid_tons else total * 0)
+              for total in result["网格总盈亏"]]
+    return pd.DataFrame(grid_summary(result, ATR_MULTIPLES, grid_tons)), curves
+
+if grid_engine:
+    # 网格收益曲线（每吨收益随到期价格变化）替代固定每吨收益，价格路径沿用蒙特卡洛设置
+    grid_table, grid_curves = run_grid_simulation(
+        strategy_params, futures_base, mc_sigma, mc_days, grid_paths, mc_model, mc_seed,
+        grid_levels, grid_steps, futures_margin_ratio / 100
+    )
+    strategy_params["grid_profit_per_ton"] = grid_curves[ATR_MULTIPLES.index(grid_atr_multiple)]
+
+if option_book is not None:
+    strategy_params["option_book"] = option_book
+
+# 增量计算图（按会话保存）：策略表、风险指标、保证金、年化收益、各图表与报告均为图中节点，
+# 依赖即节点函数的参数名。交互时只重算输入有变化的节点，例如只改总资金或保证金比例时
+# 不重算策略表与盈亏曲线图
+if "compute_graph" not in st.session_state:
+    st.session_state["compute_graph"] = ComputeGraph()
+compute_graph = st.session_state["compute_graph"]
+compute_graph.begin()
+compute_graph.set_inputs(
+    strategy_params=strategy_params, vol=vol, price_step=price_step, adaptive_grid=adaptive_grid,
+    futures_base=futures_base, capital=capital, risk_free_rate=risk_free_rate,
+    days_to_expiry=days_to_expiry, futures_margin_ratio=futures_margin_ratio,
+    option_margin_ratio=option_margin_ratio, implied_vol=implied_vol, option_years=option_years,
+    monte_carlo=monte_carlo, mc_sigma=mc_sigma, mc_days=mc_days, mc_paths=mc_paths, mc_model=mc_model,
+    mc_seed=mc_seed, mc_precision=mc_precision, n_workers=int(n_workers),
+    # 未启用的路径模拟其设置为 None（对应控件未显示）
+    hedge_settings=dict(n_paths=hedge_paths, commission=hedge_commission, slippage=hedge_slippage)
+    if hedge_path_sim else None,
+    margin_settings=dict(n_paths=margin_sim_paths, cash_reserve=cash_reserve) if margin_sim else None,
+    basis_settings=dict(basis_vol=basis_vol, half_life=basis_half_life, days=basis_days) if basis_model else None,
+    roll_settings=dict(
+        today=roll_today, horizon=roll_horizon, strip=roll_strip, roll_before=roll_before, roll_window=roll_window,
+        spread_cost=roll_spread, carry=roll_carry, carry_vol=roll_carry_vol, n_paths=roll_paths
+    ) if roll_sim else None
+)
+
+@compute_graph.node
+def df(strategy_params, vol, price_step, adaptive_grid):
+    return calculate_strategy(vol=vol, price_step=price_step, adaptive_grid=adaptive_grid, **strategy_params)
+
+# 总利润的精确求值函数（用于盈亏平衡点求根和压力测试）
+@compute_graph.node
+def total_profit_at(strategy_params):
+    return total_profit_fn(**strategy_params)
+
+# 计算保证金占用
+@compute_graph.node
+def margin(strategy_params, futures_base, futures_margin_ratio, option_margin_ratio):
+    option_book = strategy_params.get("option_book")
+    futures_margin, option_margin, total_margin = margin_requirement(
+        futures_base, strategy_params["strike_price"], strategy_params["warehouse"],
+        strategy_params["hedge_ratio"], 0 if option_book is not None else strategy_params["option_ratio"],
+        futures_margin_ratio, option_margin_ratio
+    )
+    if option_book is not None:
+        # 多腿组合只对卖出腿收取保证金
+        option_margin = option_book.margin_requirement(option_margin_ratio)
+        total_margin = futures_margin + option_margin
+    return futures_margin, option_margin, total_margin
+
+df = compute_graph["df"]
+futures_margin, option_margin, total_margin = compute_graph["margin"]
+
 # 计算基差
 base_difference = spot_base - futures_base
 
-# 计算保证金占用
-futures_margin = futures_base * warehouse * (hedge_ratio / 100) * (futures_margin_ratio / 100)
-option_margin = strike_price * warehouse * (option_ratio / 100) * (option_margin_ratio / 100)
-total_margin = futures_margin + option_margin
+# 单元数超过该值时参数扫描才启用多进程（小规模扫描进程启动开销大于收益）
+PARALLEL_SWEEP_CELLS = 20_000_000
+# 路径数超过该值时蒙特卡洛才启用多进程。加速比尚未在多核机器上实测（单核环境下100万路径
+# 4进程 0.43 秒、单进程 0.38 秒），因此默认进程数为1
+PARALLEL_MC_PATHS = 2_000_000
+# Streamlit 服务端是多线程进程，fork 会复制其他线程持有的锁，进程池改用 forkserver（Windows 无此方式时用 spawn）
+PARALLEL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+@result_cache.cached
+def run_parameter_sweep(prices, base_params, ranges, workers=1):
+    n_cells = int(np.prod([len(v) for v in ranges.values()])) * len(prices)
+    if workers > 1 and n_cells > PARALLEL_SWEEP_CELLS:
+        summary, _ = parallel_sweep(prices, base_params, ranges, workers=workers, start_method=PARALLEL_START_METHOD)
+    else:
+        summary, _ = sweep_strategy(prices, base_params, ranges)
+    return summary
+
+@result_cache.cached
+def run_monte_carlo(strategy_params, sigma, days, n_paths, model, seed, precision, workers=1):
+    if workers > 1 and n_paths > PARALLEL_MC_PATHS:
+        return parallel_monte_carlo_risk(strategy_params, sigma, days, n_paths, model,
+                                         seed=int(seed), dtype=np.dtype(precision), workers=workers,
+                                         start_method=PARALLEL_START_METHOD)
+    return monte_carlo_risk(strategy_params, sigma, days, n_paths, model,
+                            seed=int(seed), dtype=np.dtype(precision))
+
+# 未启用的模拟节点返回 None，下游节点据此选择口径
+@compute_graph.node
+def mc_result(monte_carlo, strategy_params, mc_sigma, mc_days, mc_paths, mc_model, mc_seed, mc_precision, n_workers):
+    if not monte_carlo:
+        return None
+    return run_monte_carlo(strategy_params, mc_sigma, mc_days,
+                           mc_paths, mc_model, mc_seed, mc_precision, n_workers)
+
+mc_result = compute_graph["mc_result"]
+
+@result_cache.cached
+def run_optimizer(prices, base_params, capital, risk_free_rate, days_to_expiry, futures_base,
+                  futures_margin_ratio, option_margin_ratio, objective, limits, premium_fn, workers=1):
+    return optimize_allocation(prices, base_params, capital, risk_free_rate, days_to_expiry, futures_base,
+                               futures_margin_ratio, option_margin_ratio, objective, limits=limits,
+                               premium_fn=premium_fn, workers=workers, start_method=PARALLEL_START_METHOD)
+
+@result_cache.cached
+def run_hedge_simulation(strategy_params, futures_base, sigma, days, n_paths, model, seed,
+                         commission_rate, slippage, basis=None):
+    result = simulate_dynamic_hedge(strategy_params, futures_base, sigma, days, n_paths, model,
+                                    seed=int(seed), commission_rate=commission_rate, slippage=slippage,
+                                    basis=basis)
+    return result, hedge_summary(result)
 
-# 计算年化收益率
-def calculate_annualized_return(total_profit, capital, risk_free_rate, days_to_expiry):
+def path_basis(basis_settings, mc_days):
     """
-    计算年化收益率和超额收益率
+    路径模拟的基差模型参数（到期日取蒙特卡洛期限），未启用时为 None
     """
-    # 总收益率 = 总利润 / 总资金
-    total_return = total_profit / (capital * 10000)  # 资本单位：万元转为元
-    
-    # 年化因子 = 365 / 合约剩余天数
-    annual_factor = 365 / days_to_expiry if days_to_expiry > 0 else 1
-    
-    # 年化收益率 = (1 + 总收益率)^(年化因子) - 1
-    annualized_return = ((1 + total_return) ** annual_factor) - 1 if total_return > -1 else 0
-    
-    # 超额收益率 = 年化收益率 - 无风险利率
-    excess_return = annualized_return - (risk_free_rate / 100)
-    
-    return annualized_return, excess_return
+    if basis_settings is None:
+        return None
+    return dict(expiry_days=mc_days, basis_vol=basis_settings["basis_vol"], half_life=basis_settings["half_life"])
+
+@compute_graph.node
+def hedge_simulation(hedge_settings, strategy_params, futures_base, mc_sigma, mc_days, mc_model, mc_seed,
+                     basis_settings):
+    if hedge_settings is None:
+        return None
+    # 价格路径的波动率、模型与种子沿用蒙特卡洛设置
+    return run_hedge_simulation(strategy_params, futures_base, mc_sigma, mc_days, hedge_settings["n_paths"],
+                                mc_model, mc_seed, hedge_settings["commission"] / 10000,
+                                hedge_settings["slippage"], path_basis(basis_settings, mc_days))
+
+if hedge_path_sim:
+    hedge_paths_result, hedge_result = compute_graph["hedge_simulation"]
+
+@result_cache.cached
+def run_margin_simulation(strategy_params, futures_base, sigma, days, n_paths, model, seed, implied_vol,
+                          r, futures_margin_ratio, option_margin_ratio, cash_reserve, basis=None):
+    result, per_day = simulate_margin(strategy_params, futures_base, sigma, days, n_paths, model,
+                                      seed=int(seed), implied_vol=implied_vol, r=r,
+                                      futures_margin_ratio=futures_margin_ratio,
+                                      option_margin_ratio=option_margin_ratio, cash_reserve=cash_reserve,
+                                      basis=basis)
+    return margin_summary(result, per_day, cash_reserve)
+
+@compute_graph.node
+def margin_result(margin_settings, strategy_params, futures_base, mc_sigma, mc_days, mc_model, mc_seed,
+                  implied_vol, risk_free_rate, futures_margin_ratio, option_margin_ratio, basis_settings):
+    if margin_settings is None:
+        return None
+    return run_margin_simulation(
+        strategy_params, futures_base, mc_sigma, mc_days, margin_settings["n_paths"], mc_model, mc_seed,
+        implied_vol, risk_free_rate / 100, futures_margin_ratio / 100, option_margin_ratio / 100,
+        margin_settings["cash_reserve"] * 10000, path_basis(basis_settings, mc_days)
+    )
+
+margin_result = compute_graph["margin_result"]
+
+@result_cache.cached
+def run_basis_risk(strategy_params, futures_base, sigma, days, n_paths, model, seed, precision,
+                   expiry_days, basis_vol, half_life):
+    return basis_risk(strategy_params, futures_base, sigma, days, n_paths, model, seed=int(seed),
+                      dtype=np.dtype(precision), expiry_days=expiry_days, basis_vol=basis_vol,
+                      half_life=half_life)
+
+@compute_graph.node
+def basis_result(basis_settings, strategy_params, futures_base, mc_sigma, mc_days, mc_paths, mc_model, mc_seed,
+                 mc_precision):
+    if basis_settings is None:
+        return None
+    # 现货样本与蒙特卡洛风险评估一致，期限取平仓天数，基差在合约到期日收敛
+    return run_basis_risk(strategy_params, futures_base, mc_sigma, basis_settings["days"], mc_paths, mc_model,
+                          mc_seed, mc_precision, mc_days, basis_settings["basis_vol"], basis_settings["half_life"])
+
+basis_result = compute_graph["basis_result"]
+
+# 保证金与持仓货值成正比：模拟按保证金比例1（持仓货值）进行，比例在下游节点缩放，
+# 改资金、利率或保证金比例时不重跑路径模拟
+@result_cache.cached
+def run_rolling_hedge(strategy_params, sigma, horizon, expiries, carry, n_paths, model, seed, carry_vol,
+                      roll_before, roll_window, spread_cost):
+    return simulate_rolling_hedge(
+        strategy_params, sigma, horizon, expiries, carry, n_paths, model, seed=int(seed), carry_vol=carry_vol,
+        roll_before=roll_before, roll_window=roll_window, spread_cost=spread_cost, margin_ratio=1.0
+    )
+
+@compute_graph.node
+def roll_simulation(roll_settings, strategy_params, mc_sigma, mc_model, mc_seed):
+    if roll_settings is None:
+        return None
+    # 到期日按距今天数计，现货路径的波动率、模型与种子沿用蒙特卡洛设置；展期模拟只用到现货价、库存与对冲比例
+    expiries = [(expiry - roll_settings["today"]).days for _, expiry in roll_settings["strip"]]
+    hedge_params = {name: strategy_params[name] for name in ("spot_base", "warehouse", "hedge_ratio")}
+    return run_rolling_hedge(
+        hedge_params, mc_sigma, roll_settings["horizon"], expiries, roll_settings["carry"],
+        roll_settings["n_paths"], mc_model, mc_seed, roll_settings["carry_vol"], roll_settings["roll_before"],
+        roll_settings["roll_window"], roll_settings["spread_cost"]
+    )
+
+@compute_graph.node
+def roll_result(roll_simulation, roll_settings, futures_margin_ratio, capital, risk_free_rate):
+    if roll_simulation is None:
+        return None
+    result, schedule, notional = roll_simulation
+    margin_ratio = futures_margin_ratio / 100
+    result = {**result, "峰值保证金": result["峰值保证金"] * margin_ratio}
+    return rolling_summary(result, capital, risk_free_rate, roll_settings["horizon"]), schedule, notional * margin_ratio
+
+roll_result = compute_graph["roll_result"]
+
+@st.cache_data(max_entries=32)
+def run_backtest(history, strategy_params, capital, risk_free_rate, cycle_days):
+    table, equity = backtest_strategy(history, strategy_params, capital * 10000,
+                                      risk_free_rate / 100, cycle_days)
+    return table, equity[0]
+
+def format_backtest_table(table):
+    """
+    回测绩效表格式化为百分比文本
+    """
+    formatted = table[list(BACKTEST_COLUMNS)].copy()
+    for col in ["年化收益率", "最大回撤率", "波动率", "无风险利率", "超额收益率"]:
+        formatted[col] = formatted[col].map(lambda v: f"{v*100:.1f}%")
+    formatted["夏普比率"] = formatted["夏普比率"].map(lambda v: f"{v:.2f}")
+    return formatted
+
+backtest_table = None
+price_history = None
+if history_file is not None or store_row:
+    try:
+        # 优先使用上传文件，否则读取行情库中所选合约
+        price_history = read_price_history(history_file) if history_file is not None \
+            else market_store.frame(store_contract)
+        # 回测按日重放，网格收益沿用固定每吨收益口径
+        # 回测按周期滚动卖出单腿看涨，不使用多腿组合
+        backtest_params = dict(strategy_params, grid_profit_per_ton=grid_profit_per_ton)
+        backtest_params.pop("option_book", None)
+        backtest_table, backtest_equity = run_backtest(price_history, backtest_params, capital,
+                                                       risk_free_rate, backtest_cycle)
+        backtest_table = format_backtest_table(backtest_table)
+    except Exception as e:
+        st.sidebar.warning(f"历史行情解析失败: {str(e)}")
+        backtest_table, price_history = None, None
+
+cache_stats = result_cache.stats()
+cache_stats_slot.caption(
+    f"结果缓存：{cache_stats['entries']} 条 / {cache_stats['bytes'] / 1024 ** 2:.1f} MB，"
+    f"命中 {cache_stats['hits']}（磁盘 {cache_stats['disk_hits']}），未命中 {cache_stats['misses']}，"
+    f"淘汰 {cache_stats['evictions']}"
+)
+
+# 风险指标：与总资金无关的部分单独成节点，修改资金或利率时只重算比例与收益率
+@compute_graph.node
+def profit_stats(df, total_profit_at, strategy_params, vol):
+    prices = df["现货价格"].values
+    max_profit = df["总利润"].max()
+    # 压力测试价格处直接精确求值
+    stress_price = strategy_params["spot_base"] * (1 - vol * 1.5)
+    return {
+        "max_profit": max_profit,
+        "max_drawdown": max_profit - df["总利润"].min(),
+        "max_profit_price": df.loc[df["总利润"].idxmax(), "现货价格"],
+        # 盈亏平衡点在价格网格的变号区间内精确求根
+        "breakeven_prices": find_roots(total_profit_at, prices),
+        "profit_range": profit_interval(total_profit_at, prices),
+        "grid_var": df["总利润"].quantile(0.05),
+        "stress_price": stress_price,
+        "stress_loss": float(total_profit_at(stress_price)),
+    }
+
+@compute_graph.node
+def risk_metrics(profit_stats, mc_result, capital):
+    capital_yuan = capital * 10000
+    # 风险价值(VaR)：启用蒙特卡洛时基于模拟到期价格分布，否则退回价格网格分位数
+    var_95 = mc_result["var"] if mc_result is not None else profit_stats["grid_var"]
+    return dict(
+        profit_stats,
+        var_95=var_95,
+        max_drawdown_pct=profit_stats["max_drawdown"] / capital_yuan * 100,
+        var_95_pct=abs(var_95) / capital_yuan * 100,
+        stress_loss_pct=abs(profit_stats["stress_loss"]) / capital_yuan * 100,
+    )
+
+@compute_graph.node
+def annualized_return(profit_stats, capital, risk_free_rate, days_to_expiry):
+    return calculate_annualized_return(profit_stats["max_profit"], capital, risk_free_rate, days_to_expiry)
 
 # =============== 结果展示 ===============
-tab1, tab2, tab3 = st.tabs(["📈 策略表现分析", "📊 风险分析", "📘 策略说明"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["📈 策略表现分析", "📊 风险分析", "📘 策略说明", "🧮 参数扫描",
+                                        "🏭 多品种组合"])
 
 with tab1:
     st.subheader("策略总利润分析")
     
-    # 计算盈亏平衡点
-    breakeven_df = df[df["总利润"] >= 0]
-    breakeven_price = breakeven_df["现货价格"].min() if not breakeven_df.empty else None
-    
-    fig = px.line(df, x="现货价格", y="总利润", 
-                  title=f"策略总利润曲线 (当前现货价: {spot_base}元)",
-                  labels={"总利润": "利润（元）"},
-                  markers=True,
-                  line_shape="spline",
-                  color_discrete_sequence=["#2a6fdb"])
-    
-    # 添加参考线
-    fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.7)
+    @compute_graph.node
+    def fig_profit(df, strategy_params, profit_stats):
+        spot_base = strategy_params["spot_base"]
+        # 细网格降采样（保留执行价与盈亏平衡点处的拐点），点少时才逐点标记并样条平滑
+        data = chart_frame(df, "现货价格", "总利润",
+                           keep=(strategy_params["strike_price"], *profit_stats["breakeven_prices"]))
+        fig = px.line(data, x="现货价格", y="总利润", 
+                      title=f"策略总利润曲线 (当前现货价: {spot_base}元)",
+                      labels={"总利润": "利润（元）"},
+                      markers=len(data) <= MARKER_POINTS,
+                      line_shape="spline" if len(data) <= MARKER_POINTS else "linear",
+                      render_mode=render_mode(len(data)),
+                      color_discrete_sequence=["#2a6fdb"])
+        
+        # 添加参考线
+        fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.7)
+        
+        for breakeven_price in profit_stats["breakeven_prices"]:
+            fig.add_vline(x=breakeven_price, line_dash="dash", 
+                          line_color="#28a745", annotation_text=f"盈亏平衡点: {breakeven_price:.1f}元",
+                          annotation_position="top left")
+        
+        fig.add_vline(x=spot_base, line_dash="dash", 
+                      line_color="#6c757d", annotation_text=f"当前价格: {spot_base}元",
+                      annotation_position="top right")
+        return fig
     
-    if breakeven_price:
-        fig.add_vline(x=breakeven_price, line_dash="dash", 
-                      line_color="#28a745", annotation_text=f"盈亏平衡点: {breakeven_price}元",
-                      annotation_position="top left")
+    st.plotly_chart(compute_graph["fig_profit"], use_container_width=True)
     
-    fig.add_vline(x=spot_base, line_dash="dash", 
-                  line_color="#6c757d", annotation_text=f"当前价格: {spot_base}元",
-                  annotation_position="top right")
+    st.subheader("策略组件盈亏分解")
     
-    st.plotly_chart(fig, use_container_width=True)
+    @compute_graph.node
+    def fig_bar(df, strategy_params):
+        components = ["现货盈亏", "期货对冲", "网格策略", "卖权策略"]
+        return px.area(chart_frame(df, "现货价格", components, keep=strategy_params["strike_price"]),
+                       x="现货价格", y=components,
+                       title="各策略组件盈亏贡献",
+                       labels={"value": "利润（元）", "variable": "策略组件"},
+                       color_discrete_sequence=["#6c757d", "#2a6fdb", "#17a2b8", "#ffc107"])
     
-    st.subheader("策略组件盈亏分解")
-    fig_bar = px.area(df, x="现货价格", 
-                      y=["现货盈亏", "期货对冲", "网格策略", "卖权策略"],
-                      title="各策略组件盈亏贡献",
-                      labels={"value": "利润（元）", "variable": "策略组件"},
-                      color_discrete_sequence=["#6c757d", "#2a6fdb", "#17a2b8", "#ffc107"])
-    st.plotly_chart(fig_bar, use_container_width=True)
+    st.plotly_chart(compute_graph["fig_bar"], use_container_width=True)
     
-    if dynamic_hedge:
-        st.subheader("动态对冲比例变化")
-        fig_hedge = px.line(df, x="现货价格", y="实际对冲比例",
+    @compute_graph.node
+    def fig_hedge(df, strategy_params):
+        hedge_ratio = strategy_params["hedge_ratio"]
+        data = chart_frame(df, "现货价格", "实际对冲比例")
+        fig_hedge = px.line(data, x="现货价格", y="实际对冲比例",
                             title="动态对冲比例随价格变化情况",
                             labels={"实际对冲比例": "对冲比例（%）"},
-                            line_shape="spline",
+                            line_shape="spline" if len(data) <= MARKER_POINTS else "linear",
+                            render_mode=render_mode(len(data)),
                             color_discrete_sequence=["#e83e8c"])
         fig_hedge.add_hline(y=hedge_ratio, line_dash="dash", line_color="#6c757d", 
                             annotation_text=f"基础对冲比例: {hedge_ratio}%")
-        st.plotly_chart(fig_hedge, use_container_width=True)
+        return fig_hedge
+    
+    if dynamic_hedge:
+        st.subheader("动态对冲比例变化")
+        st.plotly_chart(compute_graph["fig_hedge"], use_container_width=True)
+    
+    if grid_engine:
+        st.subheader("网格交易模拟")
+        st.caption(f"中枢 {futures_base} 元/吨，ATR估计 {estimate_atr(futures_base, mc_sigma):.1f} 元，"
+                   f"单边 {grid_levels} 档，{grid_paths:,} 条路径 × {mc_days} 天 × 每日 {grid_steps} 个采样点")
+        grid_display = grid_table.copy()
+        for col in grid_display.columns[1:]:
+            grid_display[col] = grid_display[col].map(lambda v: f"{v:,.0f}")
+        grid_display["ATR倍数"] = grid_table["ATR倍数"].map(lambda v: f"{v:g} ATR")
+        st.dataframe(grid_display, hide_index=True, use_container_width=True)
+        
+        @compute_graph.node
+        def fig_grid(grid_curves, grid_atr_multiple, strategy_params):
+            fig_grid = go.Figure()
+            for multiple, curve in zip(ATR_MULTIPLES, grid_curves):
+                fig_grid.add_trace(go.Scatter(x=curve.prices, y=curve.profit_per_ton, mode="lines",
+                                              name=f"{multiple:g} ATR",
+                                              line=dict(width=3 if multiple == grid_atr_multiple else 1)))
+            fig_grid.add_hline(y=0, line_dash="dash", line_color="gray")
+            fig_grid.add_vline(x=strategy_params["spot_base"], line_dash="dash", line_color="gray")
+            fig_grid.update_layout(title="网格每吨收益随到期现货价格变化（震荡区间获利、单边趋势亏损）",
+                                   xaxis_title="到期现货价格（元/吨）", yaxis_title="每吨收益（元）")
+            return fig_grid
+        
+        compute_graph.set_inputs(grid_curves=grid_curves, grid_atr_multiple=grid_atr_multiple)
+        st.plotly_chart(compute_graph["fig_grid"], use_container_width=True)
+        
+        if price_history is not None:
+            # 已加载历史行情时，同一网格引擎按实际期货日收盘价回放（单条历史路径）
+            grid_tons = grid_ratio / 100 * warehouse
+            try:
+                history_atr, replay = replay_grid(price_history["futures"].values, ATR_MULTIPLES, grid_levels,
+                                                  grid_tons, margin_ratio=futures_margin_ratio / 100)
+                st.markdown(f"**历史行情网格回放**（历史ATR {history_atr:.1f} 元，"
+                            f"{len(price_history) - 14} 个交易日，按日收盘价撮合）")
+                st.dataframe(pd.DataFrame({
+                    "ATR倍数": [f"{m:g} ATR" for m in ATR_MULTIPLES],
+                    "每吨收益": replay["网格总盈亏"] / grid_tons if grid_tons else 0.0,
+                    **{name: replay[name] for name in ("已实现盈亏", "浮动盈亏", "交易成本", "网格总盈亏",
+                                                       "成交量", "峰值保证金")},
+                }).round(1), hide_index=True, use_container_width=True)
+            except ValueError as e:
+                st.warning(str(e))
 
 with tab2:
     st.subheader("风险指标分析")
     
-    # 风险指标计算
-    max_profit = df["总利润"].max()
-    min_profit = df["总利润"].min()
-    max_drawdown = max_profit - min_profit
-    max_drawdown_pct = max_drawdown / (capital * 10000) * 100  # 最大回撤率
-    
-    profit_range = df[df["总利润"] > 0]["现货价格"]
-    breakeven_str = f"{profit_range.min():.0f} ~ {profit_range.max():.0f}" if not profit_range.empty else "无"
-    
-    # 计算风险价值(VaR)
-    var_95 = df["总利润"].quantile(0.05)
-    var_95_pct = abs(var_95) / (capital * 10000) * 100  # VaR百分比
-    
-    # 计算压力测试结果
-    stress_price = spot_base * (1 - vol * 1.5)
-    stress_row = df.iloc[(df['现货价格'] - stress_price).abs().argsort()[:1]]
-    stress_loss = stress_row["总利润"].values[0] if not stress_row.empty else 0
-    stress_loss_pct = abs(stress_loss) / (capital * 10000) * 100  # 压力损失百分比
-    
-    # 计算年化收益率
-    annualized_return, excess_return = calculate_annualized_return(
-        max_profit, capital, risk_free_rate, days_to_expiry
-    )
+    # 风险指标与年化收益率（计算图节点）
+    risk = compute_graph["risk_metrics"]
+    max_drawdown, max_drawdown_pct = risk["max_drawdown"], risk["max_drawdown_pct"]
+    profit_range = risk["profit_range"]
+    breakeven_str = f"{profit_range[0]:.1f} ~ {profit_range[1]:.1f}" if profit_range else "无"
+    var_95, var_95_pct = risk["var_95"], risk["var_95_pct"]
+    stress_price, stress_loss, stress_loss_pct = risk["stress_price"], risk["stress_loss"], risk["stress_loss_pct"]
+    annualized_return, excess_return = compute_graph["annualized_return"]
     
     # 保证金占用分析
     st.subheader("保证金占用分析")
@@ -468,6 +959,44 @@ with tab2:
     </div>
     """, unsafe_allow_html=True)
     
+    if margin_sim:
+        st.subheader("逐日盯市保证金与流动性")
+        col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+        with col_m1:
+            st.metric("峰值保证金 (P99)", f"{margin_result['peak_p99']:,.0f} 元",
+                      delta=f"占现金储备 {margin_result['usage_p99']*100:.0f}%", delta_color="off")
+        with col_m2:
+            st.metric("追保概率", f"{margin_result['prob_call']*100:.2f}%")
+        with col_m3:
+            first_call = margin_result["first_call_median"]
+            st.metric("首次追保时间（中位数）", f"第 {first_call:.0f} 天" if first_call is not None else "无追保",
+                      delta=f"5%分位 第 {margin_result['first_call_p05']:.0f} 天" if first_call is not None else None,
+                      delta_color="off")
+        with col_m4:
+            st.metric("资金缺口 (P99)", f"{margin_result['shortfall_p99']:,.0f} 元")
+        
+        @compute_graph.node
+        def fig_margin(margin_result, margin_settings):
+            cash_reserve = margin_settings["cash_reserve"]
+            margin_days = np.arange(len(margin_result["mean_margin"]))
+            fig_margin = go.Figure()
+            fig_margin.add_trace(go.Scatter(x=margin_days, y=margin_result["mean_margin"], name="平均保证金",
+                                            line=dict(color="#2a6fdb")))
+            fig_margin.add_trace(go.Scatter(x=margin_days, y=margin_result["max_margin"], name="各路径最大保证金",
+                                            line=dict(color="#dc3545", dash="dot")))
+            fig_margin.add_trace(go.Scatter(x=margin_days, y=margin_result["call_curve"] * 100,
+                                            name="累计追保概率（%）", yaxis="y2", line=dict(color="#ffc107")))
+            fig_margin.add_hline(y=cash_reserve * 10000, line_dash="dash", line_color="gray",
+                                 annotation_text=f"现金储备: {cash_reserve}万元")
+            fig_margin.update_layout(
+                title=f"保证金需求与累计追保概率（{margin_result['n_paths']:,}条路径）",
+                xaxis_title="距今天数", yaxis_title="保证金（元）",
+                yaxis2=dict(title="累计追保概率（%）", overlaying="y", side="right", range=[0, 100])
+            )
+            return fig_margin
+        
+        st.plotly_chart(compute_graph["fig_margin"], use_container_width=True)
+    
     # 风险矩阵
     st.subheader("风险矩阵评估")
     st.markdown("""
@@ -522,7 +1051,11 @@ with tab2:
         st.markdown('<div class="metric-box">', unsafe_allow_html=True)
         st.metric("95%置信度风险价值(VaR)", f"{abs(var_95):,.0f} 元", 
                  delta=f"{var_95_pct:.2f}%")
-        st.metric("最大利润价格", f"{df.loc[df['总利润'].idxmax()]['现货价格']:.0f} 元")
+        if monte_carlo:
+            st.metric("95%条件风险价值(CVaR)", f"{abs(mc_result['cvar']):,.0f} 元",
+                     delta=f"{abs(mc_result['cvar'])/(capital*10000)*100:.2f}%")
+            st.metric("亏损概率", f"{mc_result['prob_loss']*100:.2f}%")
+        st.metric("最大利润价格", f"{risk['max_profit_price']:.0f} 元")
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col4:
@@ -534,28 +1067,319 @@ with tab2:
                  delta=f"超越无风险利率{excess_return*100:.2f}%")
         st.markdown('</div>', unsafe_allow_html=True)
     
+    if monte_carlo:
+        st.subheader("蒙特卡洛盈亏分布")
+        # 流式累加器给出的抽样误差：路径数增加时标准误按 1/√n 收敛，内存不随路径数增长
+        col_e1, col_e2, col_e3, col_e4 = st.columns(4)
+        with col_e1:
+            st.metric("VaR 标准误", f"±{mc_result['var_se']:,.0f} 元",
+                      delta="尾部精确值" if mc_result["exact_tail"] else "直方图插值", delta_color="off")
+        with col_e2:
+            st.metric("CVaR 标准误", f"±{mc_result['cvar_se']:,.0f} 元")
+        with col_e3:
+            st.metric("亏损概率标准误", f"±{mc_result['prob_loss_se']*100:.3f}%")
+        with col_e4:
+            st.metric("t-digest VaR", f"{abs(mc_result['var_digest']):,.0f} 元",
+                      delta=f"差 {mc_result['var_digest'] - mc_result['var']:+,.0f} 元", delta_color="off",
+                      help="分位数草图给出的VaR，与主估计交叉核对")
+        
+        @compute_graph.node
+        def fig_mc(mc_result, mc_model, mc_sigma, mc_days):
+            fig_mc = px.bar(
+                x=mc_result["hist_centers"], y=mc_result["hist_counts"] / mc_result["n_paths"] * 100,
+                labels={"x": "到期总利润（元）", "y": "概率（%）"},
+                title=f"到期总利润分布（{PRICE_MODELS[mc_model]}，{mc_result['n_paths']:,}条路径，"
+                      f"年化波动率{mc_sigma*100:.0f}%，{mc_days}天）",
+                color_discrete_sequence=["#2a6fdb"]
+            )
+            fig_mc.update_traces(marker_line_width=0)
+            fig_mc.update_layout(bargap=0)
+            fig_mc.add_vline(x=mc_result["var"], line_dash="dash", line_color="#dc3545",
+                             annotation_text=f"95% VaR: {mc_result['var']:,.0f}元", annotation_position="top left")
+            fig_mc.add_vline(x=0, line_dash="dash", line_color="gray")
+            return fig_mc
+        
+        st.plotly_chart(compute_graph["fig_mc"], use_container_width=True)
+    
+    if hedge_path_sim:
+        st.subheader("逐日调仓对冲模拟")
+        col_h1, col_h2, col_h3, col_h4 = st.columns(4)
+        with col_h1:
+            st.metric("净对冲盈亏均值", f"{hedge_result['mean']:,.0f} 元",
+                      delta=f"静态口径 {hedge_result['static_mean']:,.0f} 元", delta_color="off")
+        with col_h2:
+            st.metric("对冲盈亏95% VaR", f"{hedge_result['var']:,.0f} 元",
+                      delta=f"CVaR {hedge_result['cvar']:,.0f} 元", delta_color="off")
+        with col_h3:
+            st.metric("平均交易成本", f"{hedge_result['cost']:,.0f} 元")
+        with col_h4:
+            st.metric("平均换手量", f"{hedge_result['turnover']:,.0f} 吨",
+                      delta=f"调仓 {hedge_result['rebalances']:.1f} 次", delta_color="off")
+        
+        @compute_graph.node
+        def fig_hedge_dist(hedge_simulation, mc_days):
+            hedge_paths_result, hedge_result = hedge_simulation
+            # 逐路径结果先在服务端分箱（两组共用箱边界），只向浏览器发送箱高度
+            series = (("净对冲盈亏", "#e83e8c"), ("静态对冲盈亏", "#6c757d"))
+            edges = np.histogram_bin_edges(np.concatenate([hedge_paths_result[name] for name, _ in series]), 100)
+            fig_hedge_dist = go.Figure()
+            for name, color in series:
+                counts, _ = np.histogram(hedge_paths_result[name], edges)
+                fig_hedge_dist.add_trace(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts / counts.sum() * 100,
+                                                width=np.diff(edges), name=name, marker_color=color,
+                                                marker_line_width=0, opacity=0.6))
+            fig_hedge_dist.update_layout(
+                barmode="overlay", bargap=0,
+                title=f"对冲盈亏分布（{hedge_result['n_paths']:,}条路径，{mc_days}天）",
+                xaxis_title="对冲盈亏（元）", yaxis_title="概率（%）"
+            )
+            return fig_hedge_dist
+        
+        st.plotly_chart(compute_graph["fig_hedge_dist"], use_container_width=True)
+    
+    if basis_model:
+        st.subheader("期现联合模拟：基差风险")
+        st.caption(f"对冲按期货价格变动计盈亏，第{basis_days}天平仓时基差期望 "
+                   f"{basis_result['expected_basis']:,.0f} 元/吨（当前 {base_difference} 元/吨），"
+                   f"标准差 {basis_result['basis_std']:,.0f} 元/吨；VaR 以盈亏计，负值表示亏损")
+        col_b1, col_b2, col_b3, col_b4 = st.columns(4)
+        with col_b1:
+            st.metric("零基差风险 95% VaR", f"{basis_result['spot_only']['var']:,.0f} 元")
+        with col_b2:
+            st.metric("基差收敛贡献", f"{basis_result['convergence_var']:,.0f} 元")
+        with col_b3:
+            st.metric("随机基差贡献", f"{basis_result['stochastic_var']:,.0f} 元")
+        with col_b4:
+            st.metric("期现联合 95% VaR", f"{basis_result['joint']['var']:,.0f} 元",
+                      delta=f"CVaR {basis_result['joint']['cvar']:,.0f} 元", delta_color="off")
+        
+        @compute_graph.node
+        def fig_basis(df, strategy_params, futures_base, basis_result):
+            # 价格网格 × 基差分位数一次广播求值
+            prices = df["现货价格"].values
+            base = strategy_params["spot_base"] - futures_base
+            quantiles = {"基差5%分位": -1.645, "基差期望": 0.0, "基差95%分位": 1.645}
+            changes = basis_result["expected_basis"] - base + basis_result["basis_std"] * np.array(list(quantiles.values()))
+            totals = strategy_pnl(prices[:, None], basis_change=changes, **strategy_params)["总利润"]
+            frame = pd.DataFrame({"现货价格": prices, "零基差风险": df["总利润"].values,
+                                  **dict(zip(quantiles, totals.T))})
+            values = ["零基差风险", *quantiles]
+            data = chart_frame(frame, "现货价格", values, keep=strategy_params["strike_price"])
+            fig_basis = px.line(data, x="现货价格", y=values, render_mode=render_mode(len(data)),
+                                title="平仓时总利润：零基差风险与随机基差分位数",
+                                labels={"value": "利润（元）", "variable": "基差口径"},
+                                color_discrete_sequence=["#6c757d", "#dc3545", "#2a6fdb", "#28a745"])
+            fig_basis.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.7)
+            return fig_basis
+        
+        st.plotly_chart(compute_graph["fig_basis"], use_container_width=True)
+    
+    if roll_sim:
+        st.subheader("跨期展期对冲")
+        roll_summary = roll_result[0]
+        st.caption(f"合约序列 {' → '.join(code for code, _ in roll_strip)}，对冲期限 {roll_horizon} 天，"
+                   f"{roll_summary['n_paths']:,} 条路径；展期收益为期货对冲相对按现货变动对冲的差额")
+        col_r1, col_r2, col_r3, col_r4 = st.columns(4)
+        with col_r1:
+            st.metric("期现总盈亏均值", f"{roll_summary['mean']:,.0f} 元",
+                      delta=f"年化 {roll_summary['annualized']*100:.2f}%", delta_color="off")
+        with col_r2:
+            st.metric("总盈亏95% VaR", f"{roll_summary['var']:,.0f} 元",
+                      delta=f"CVaR {roll_summary['cvar']:,.0f} 元", delta_color="off")
+        with col_r3:
+            st.metric("展期收益均值", f"{roll_summary['roll_yield']:,.0f} 元",
+                      delta=f"交易成本 {roll_summary['cost']:,.0f} 元", delta_color="off")
+        with col_r4:
+            st.metric("峰值保证金 (P95)", f"{roll_summary['peak_margin_p95']:,.0f} 元",
+                      delta=f"均值 {roll_summary['peak_margin_mean']:,.0f} 元", delta_color="off")
+        
+        @compute_graph.node
+        def fig_roll(roll_result, roll_settings, strategy_params):
+            _, schedule, mean_margin = roll_result
+            hedge_tons = strategy_params["hedge_ratio"] / 100 * strategy_params["warehouse"]
+            roll_days = np.arange(len(schedule))
+            fig_roll = go.Figure()
+            for (code, _), weights in zip(roll_settings["strip"], schedule.T):
+                if weights.any():
+                    fig_roll.add_trace(go.Scatter(x=roll_days, y=weights * hedge_tons, name=code,
+                                                  stackgroup="position", mode="lines", line=dict(width=0.5)))
+            fig_roll.add_trace(go.Scatter(x=roll_days, y=mean_margin, name="平均保证金（元）", yaxis="y2",
+                                          line=dict(color="#dc3545", dash="dot")))
+            fig_roll.update_layout(
+                title="各合约空单持仓与平均保证金",
+                xaxis_title="距今天数", yaxis_title="空单持仓（吨）",
+                yaxis2=dict(title="保证金（元）", overlaying="y", side="right")
+            )
+            return fig_roll
+        
+        st.plotly_chart(compute_graph["fig_roll"], use_container_width=True)
+    
+    st.subheader("压力情景库")
+    st.caption("历史行情冲击、假设情景网格与自定义联合冲击（现货、期货/基差、隐含波动率）按当前持仓一次性批量重估，"
+               "期货腿按冲击后期货价格计盈亏，卖权按Black-76以剩余期限和冲击后波动率重估")
+    stress_col1, stress_col2 = st.columns(2)
+    with stress_col1:
+        stress_history = st.multiselect("历史情景", list(HISTORICAL_SCENARIOS), default=list(HISTORICAL_SCENARIOS),
+                                        help="螺纹钢主力合约阶段涨跌幅的近似值")
+        stress_points = st.number_input("假设情景每维取值个数", 2, 30, 11,
+                                        help="现货冲击 × 基差变动 × 波动率变动 的笛卡尔积")
+        stress_days = st.number_input("假设情景持续天数", 0, 365, 5)
+    with stress_col2:
+        stress_spot = st.slider("现货冲击区间（%）", -50, 50, (-30, 30))
+        stress_basis = st.slider("基差变动区间（元/吨）", -500, 500, (-200, 200))
+        stress_iv = st.slider("波动率变动区间（百分点）", -20, 40, (-5, 15))
+    custom_scenarios = st.data_editor(
+        pd.DataFrame({"情景": ["自定义情景"], "现货冲击(%)": [-15.0], "期货冲击(%)": [-18.0],
+                      "波动率变动(百分点)": [10.0], "持续天数": [10]}),
+        num_rows="dynamic", hide_index=True, use_container_width=True, key="stress_custom"
+    )
+    
+    # 情景库：每个情景为一行参数向量（界面单位），三类情景合并后一次性重估
+    def scenario_frame(names, kind, vectors):
+        return pd.DataFrame({"情景": names, "类型": kind, **{
+            SCENARIO_LABELS[name]: np.asarray(vectors[name], dtype=float) * (1 if name == "days" else 100)
+            for name in SCENARIO_FIELDS
+        }})
+    
+    stress_grid = shock_grid(
+        np.linspace(*stress_spot, int(stress_points)) / 100, np.linspace(*stress_basis, int(stress_points)),
+        np.linspace(*stress_iv, int(stress_points)) / 100, stress_days, spot_base, futures_base
+    )
+    basis_shift = stress_grid["spot_shock"] * spot_base - stress_grid["futures_shock"] * futures_base
+    stress_scenarios = pd.concat([
+        scenario_frame(stress_history, "历史", dict(zip(SCENARIO_FIELDS, np.asarray(
+            [HISTORICAL_SCENARIOS[name] for name in stress_history]).reshape(-1, len(SCENARIO_FIELDS)).T))),
+        scenario_frame([f"现货{s:+.0%} 基差{b:+.0f} 波动率{v:+.0%}" for s, b, v in
+                        zip(stress_grid["spot_shock"], basis_shift, stress_grid["iv_shift"])],
+                       "假设", stress_grid),
+        custom_scenarios.dropna().assign(类型="自定义").astype({"持续天数": float}),
+    ], ignore_index=True)
+    
+    @compute_graph.node
+    def stress_table(stress_scenarios, strategy_params, futures_base, days_to_expiry, risk_free_rate, implied_vol,
+                     capital):
+        vectors = {name: stress_scenarios[SCENARIO_LABELS[name]].values / (1 if name == "days" else 100)
+                   for name in SCENARIO_FIELDS}
+        result = stress_test(strategy_params, futures_base, vectors, max(days_to_expiry, 0),
+                             risk_free_rate / 100, implied_vol)
+        table = stress_scenarios.assign(**result, **{"亏损占资金(%)": -result["总利润"] / (capital * 10000) * 100})
+        return table.sort_values("总利润", kind="stable").reset_index(drop=True)
+    
+    @compute_graph.node
+    def fig_stress(stress_table):
+        named = stress_table[stress_table["类型"] != "假设"].sort_values("总利润")
+        fig_stress = px.bar(named, y="情景", x=["现货盈亏", "期货对冲", "网格策略", "卖权策略"], orientation="h",
+                            title="历史与自定义情景盈亏分解",
+                            labels={"value": "盈亏（元）", "variable": "策略组件"},
+                            color_discrete_sequence=["#6c757d", "#2a6fdb", "#17a2b8", "#ffc107"])
+        fig_stress.add_scatter(y=named["情景"], x=named["总利润"], mode="markers", name="总利润",
+                               marker=dict(color="#dc3545", size=10, symbol="diamond"))
+        fig_stress.update_layout(barmode="relative", height=max(300, 40 * len(named)))
+        return fig_stress
+    
+    compute_graph.set_inputs(stress_scenarios=stress_scenarios)
+    stress_result = compute_graph["stress_table"]
+    worst = stress_result.iloc[0]
+    col_s1, col_s2, col_s3 = st.columns(3)
+    with col_s1:
+        st.metric("情景数", f"{len(stress_result):,}")
+    with col_s2:
+        st.metric("最差情景亏损", f"{-worst['总利润']:,.0f} 元", delta=worst["情景"], delta_color="off")
+    with col_s3:
+        st.metric("亏损超过资金5%的情景", f"{(stress_result['亏损占资金(%)'] > 5).mean() * 100:.1f}%")
+    if (stress_result["类型"] != "假设").any():
+        st.plotly_chart(compute_graph["fig_stress"], use_container_width=True)
+    st.caption("亏损最大的20个情景（完整排序表随报告导出）")
+    st.dataframe(stress_result.head(20).round(2), hide_index=True, use_container_width=True)
+    
+    st.subheader("组合敏感度")
+    st.caption("现货、波动率、基差、时间的全部差分冲击与阶梯档位堆叠为一个数组一次批量重估（口径同压力测试）。"
+               + ("启用蒙特卡洛时按模拟期末价格求期望盈亏的敏感度，各冲击共用同一组随机数"
+                  if monte_carlo else "未启用蒙特卡洛，按当前价格即时冲击重估"))
+    if monte_carlo:
+        sensitivity_paths = st.selectbox("敏感度模拟路径数", [10_000, 50_000, 200_000], index=1,
+                                         format_func=lambda n: f"{n:,}")
+    else:
+        sensitivity_paths = 0
+    compute_graph.set_inputs(sensitivity_paths=sensitivity_paths)
+    
+    @result_cache.cached
+    def run_sensitivities(strategy_params, futures_base, days_to_expiry, r, implied_vol, sigma, days, n_paths,
+                          model, seed):
+        return portfolio_sensitivities(strategy_params, futures_base, days_to_expiry, r, implied_vol, sigma,
+                                       days, n_paths, model, seed=int(seed))
+    
+    @compute_graph.node
+    def sensitivity_result(strategy_params, futures_base, days_to_expiry, risk_free_rate, implied_vol, mc_sigma,
+                           mc_days, mc_model, mc_seed, sensitivity_paths):
+        return run_sensitivities(strategy_params, futures_base, max(days_to_expiry, 0), risk_free_rate / 100,
+                                 implied_vol, mc_sigma, mc_days if sensitivity_paths else 0, sensitivity_paths,
+                                 mc_model, mc_seed)
+    
+    @compute_graph.node
+    def sensitivity_table(sensitivity_result):
+        return pd.DataFrame(sensitivity_result["table"])
+    
+    @compute_graph.node
+    def fig_ladder(sensitivity_result):
+        units = {"spot": "元/吨", "vol": "百分点", "basis": "元/吨", "time": "天"}
+        ladder = pd.concat([
+            pd.DataFrame(table).assign(因子=f"{SENSITIVITY_FACTORS[name][0]}（{units[name]}）")
+            for name, table in sensitivity_result["ladders"].items()
+        ], ignore_index=True)
+        fig_ladder = px.bar(ladder, x="冲击", y=["期望盈亏变动", "VaR变动"], barmode="group",
+                            facet_col="因子", facet_col_wrap=2, facet_col_spacing=0.08,
+                            title=f"敏感度阶梯（{sensitivity_result['n_rows']}个冲击行一次重估）",
+                            labels={"value": "盈亏变动（元）", "variable": ""},
+                            color_discrete_sequence=["#2a6fdb", "#dc3545"])
+        fig_ladder.update_xaxes(matches=None, showticklabels=True)
+        fig_ladder.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+        fig_ladder.update_layout(height=600)
+        return fig_ladder
+    
+    sensitivity_frame = compute_graph["sensitivity_table"]
+    sens_cols = st.columns(len(sensitivity_frame))
+    for col, row in zip(sens_cols, sensitivity_frame.itertuples(index=False)):
+        with col:
+            st.metric(f"{row.因子}敏感度", f"{row.期望盈亏敏感度:,.0f}", delta=row.单位, delta_color="off")
+    st.dataframe(sensitivity_frame.round(2), hide_index=True, use_container_width=True)
+    st.plotly_chart(compute_graph["fig_ladder"], use_container_width=True)
+    
     st.subheader("风险-收益分布图")
-    fig_risk = px.scatter(df, x="现货价格", y="总利润", 
-                         color="总利润", 
-                         color_continuous_scale=["#dc3545", "#ffc107", "#28a745"],
-                         title="风险-收益分布图",
-                         labels={"总利润": "利润（元）"})
-    fig_risk.add_hline(y=0, line_dash="dash", line_color="gray")
-    fig_risk.add_vline(x=spot_base, line_dash="dash", line_color="gray")
-    st.plotly_chart(fig_risk, use_container_width=True)
+    
+    @compute_graph.node
+    def fig_risk(df, strategy_params):
+        data = chart_frame(df, "现货价格", "总利润", keep=strategy_params["strike_price"])
+        fig_risk = px.scatter(data, x="现货价格", y="总利润", 
+                             color="总利润", render_mode=render_mode(len(data)),
+                             color_continuous_scale=["#dc3545", "#ffc107", "#28a745"],
+                             title="风险-收益分布图",
+                             labels={"总利润": "利润（元）"})
+        fig_risk.add_hline(y=0, line_dash="dash", line_color="gray")
+        fig_risk.add_vline(x=strategy_params["spot_base"], line_dash="dash", line_color="gray")
+        return fig_risk
+    
+    st.plotly_chart(compute_graph["fig_risk"], use_container_width=True)
     
     # 期权风险分析
     st.subheader("期权风险分析")
     
-    # 权利金收益卡片
-    total_premium = option_premium * warehouse * (option_ratio / 100)
+    # 权利金收益卡片（多腿组合取权利金净收入）
+    option_tons = option_ratio / 100 * warehouse
+    premium_per_ton = option_premium
+    if option_book is not None:
+        option_tons = float(option_book.quantity[option_book.side < 0].sum())
+        total_premium = option_book.net_premium
+        premium_per_ton = total_premium / option_tons if option_tons else 0.0
+    else:
+        total_premium = option_premium * option_tons
     st.markdown(f"""
     <div class="premium-card">
         <h3>期权权利金收益分析</h3>
         <div style="display: flex; justify-content: space-between; margin-top: 15px;">
             <div>
                 <h4>每吨权利金</h4>
-                <h2>{option_premium} 元/吨</h2>
+                <h2>{premium_per_ton:,.2f} 元/吨</h2>
             </div>
             <div>
                 <h4>总权利金收入</h4>
@@ -569,6 +1393,78 @@ with tab2:
     </div>
     """, unsafe_allow_html=True)
     
+    # 卖出看涨期权头寸的Black-76市值与希腊字母（现货价格网格按当前基差映射为期货价格）
+    if option_book is not None:
+        option_position = option_book.position(futures_base, 0, risk_free_rate / 100, implied_vol)
+    else:
+        option_position = short_call_position(
+            futures_base, strike_price, option_years, risk_free_rate / 100, implied_vol, option_tons
+        )
+    unit_delta = option_position["delta"] / option_tons if option_tons else 0.0
+    
+    greek_col1, greek_col2, greek_col3, greek_col4 = st.columns(4)
+    with greek_col1:
+        st.metric("Delta（每吨）", f"{float(unit_delta):.3f}",
+                  delta="在±0.3以内" if abs(unit_delta) <= 0.3 else "超出±0.3",
+                  delta_color="normal" if abs(unit_delta) <= 0.3 else "inverse")
+    with greek_col2:
+        st.metric("Gamma（头寸）", f"{float(option_position['gamma']):.4f}")
+    with greek_col3:
+        st.metric("Vega（元/1%波动率）", f"{float(option_position['vega']):,.0f}")
+    with greek_col4:
+        st.metric("Theta（元/天）", f"{float(option_position['theta']):,.0f}")
+    
+    @compute_graph.node
+    def option_greeks(df, strategy_params, futures_base, option_years, risk_free_rate, implied_vol):
+        option_book = strategy_params.get("option_book")
+        if option_book is None:
+            option_book = OptionBook.single(strategy_params["strike_price"], strategy_params["option_premium"],
+                                            strategy_params["option_ratio"] / 100 * strategy_params["warehouse"],
+                                            option_years * 365)
+        option_tons = float(option_book.quantity[option_book.side < 0].sum())
+        grid_futures = df["现货价格"].values - (strategy_params["spot_base"] - futures_base)
+        grid_position = option_book.position(grid_futures, 0, risk_free_rate / 100, implied_vol)
+        return pd.DataFrame({
+            "现货价格": df["现货价格"].values,
+            "Delta（每吨）": grid_position["delta"] / option_tons if option_tons else 0.0,
+            "Gamma（头寸）": grid_position["gamma"],
+            "Vega（元/1%）": grid_position["vega"],
+            "Theta（元/天）": grid_position["theta"],
+            "卖权市值": grid_position["value"],
+            "到期内在价值": option_book.expiry_pnl(grid_futures) + option_book.weights @ option_book.premium,
+        })
+    
+    @compute_graph.node
+    def fig_greeks(option_greeks, strategy_params, futures_base, implied_vol, days_to_expiry):
+        greeks = ["Delta（每吨）", "Gamma（头寸）", "Vega（元/1%）", "Theta（元/天）"]
+        data = chart_frame(option_greeks, "现货价格", greeks,
+                           keep=strategy_params["strike_price"] + strategy_params["spot_base"] - futures_base)
+        fig_greeks = px.line(data, x="现货价格", y=greeks,
+                             facet_row="variable", render_mode=render_mode(len(data)),
+                             title=f"卖权头寸希腊字母（隐含波动率{implied_vol*100:.0f}%，剩余{max(days_to_expiry, 0)}天）",
+                             color_discrete_sequence=["#6f42c1"])
+        fig_greeks.update_yaxes(matches=None, title_text="")
+        fig_greeks.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+        fig_greeks.add_vline(x=strategy_params["strike_price"] + strategy_params["spot_base"] - futures_base,
+                             line_dash="dash", line_color="gray")
+        fig_greeks.update_layout(height=700, showlegend=False)
+        return fig_greeks
+    
+    @compute_graph.node
+    def fig_option_value(option_greeks, strategy_params, futures_base):
+        values = ["当前市值（含时间价值）", "到期内在价值"]
+        data = chart_frame(option_greeks.rename(columns={"卖权市值": values[0]}), "现货价格", values,
+                           keep=strategy_params["strike_price"] + strategy_params["spot_base"] - futures_base)
+        return px.line(
+            data, x="现货价格", y=values, render_mode=render_mode(len(data)),
+            title="卖权头寸盯市价值",
+            labels={"value": "市值（元）", "variable": "口径"},
+            color_discrete_sequence=["#ffc107", "#6c757d"]
+        )
+    
+    st.plotly_chart(compute_graph["fig_greeks"], use_container_width=True)
+    st.plotly_chart(compute_graph["fig_option_value"], use_container_width=True)
+    
     option_col1, option_col2 = st.columns(2)
     
     with option_col1:
@@ -706,6 +1602,30 @@ with tab3:
         </p>
         </div>
         """.format(option_margin_ratio=option_margin_ratio), unsafe_allow_html=True)
+        
+        # 按当前隐含波动率给出卖权仓位提示
+        iv_col1, iv_col2 = st.columns([1, 2])
+        with iv_col1:
+            st.metric("当前隐含波动率", f"{implied_vol*100:.1f}%",
+                      help="来自期权报价链曲面插值，未上传报价链时为侧边栏设定值")
+        with iv_col2:
+            if implied_vol > 0.30:
+                st.success("IV>30%：可优先卖出期权")
+            elif implied_vol < 0.20:
+                st.warning("IV<20%：建议减少卖权比例")
+            else:
+                st.info("IV处于20%-30%：维持当前卖权比例")
+        
+        @compute_graph.node
+        def fig_smile(vol_surface):
+            fig_smile = px.line(vol_surface.to_frame(), x="执行价", y="隐含波动率", color="剩余天数",
+                                markers=True, render_mode="svg", title="隐含波动率曲面（按到期日）")
+            fig_smile.update_yaxes(tickformat=".0%")
+            return fig_smile
+        
+        if vol_surface is not None:
+            compute_graph.set_inputs(vol_surface=vol_surface)
+            st.plotly_chart(compute_graph["fig_smile"], use_container_width=True)
     
     st.subheader("动态仓位管理系统")
     
@@ -758,32 +1678,44 @@ with tab3:
         else:
             st.image("https://via.placeholder.com/500x300?text=动态仓位管理流程图", use_container_width=True)
     
-    st.subheader("历史回测表现 (2022-2024)")
-    backtest_data = {
-        "年度": ["2022", "2023", "2024"],
-        "年化收益率": ["15.2%", "22.7%", "18.3%"],
-        "最大回撤率": ["6.8%", "7.2%", "5.9%"],
-        "波动率": ["12.4%", "14.1%", "11.7%"],
-        "夏普比率": ["1.23", "1.61", "1.56"],
-        "无风险利率": ["2.5%", "2.6%", "2.7%"],
-        "超额收益率": ["12.7%", "20.1%", "15.6%"]
-    }
-    st.dataframe(pd.DataFrame(backtest_data), hide_index=True)
+    if backtest_table is not None:
+        first_year = price_history["date"].dt.year.min()
+        last_year = price_history["date"].dt.year.max()
+        st.subheader(f"历史回测表现 ({first_year}-{last_year})")
+        st.dataframe(backtest_table, hide_index=True)
+        
+        @compute_graph.node
+        def fig_equity(price_history, backtest_equity, backtest_cycle):
+            data = chart_frame(pd.DataFrame({"日期": price_history["date"], "策略权益": backtest_equity}),
+                               "日期", "策略权益")
+            return px.line(
+                data, x="日期", y="策略权益", render_mode=render_mode(len(data)),
+                title=f"策略权益曲线（{backtest_cycle}个交易日调仓周期）",
+                labels={"策略权益": "权益（元）"},
+                color_discrete_sequence=["#2a6fdb"]
+            )
+        
+        compute_graph.set_inputs(price_history=price_history, backtest_equity=backtest_equity,
+                                 backtest_cycle=backtest_cycle)
+        st.plotly_chart(compute_graph["fig_equity"], use_container_width=True)
+    else:
+        st.subheader("历史回测表现")
+        st.info("请在侧边栏“历史回测”中上传螺纹钢期现日度行情（或从行情库载入合约），按当前参数逐日重放策略")
     
     # 年化收益率比较
     st.subheader("年化收益率比较")
-    fig_comparison = px.bar(
-        pd.DataFrame({
-            "指标": ["策略年化", "无风险利率", "超额收益"],
-            "值": [annualized_return * 100, risk_free_rate, excess_return * 100]
-        }), 
-        x="指标", y="值", 
-        color="指标",
-        color_discrete_sequence=["#2a6fdb", "#6c757d", "#28a745"],
-        labels={"值": "收益率 (%)"},
-        title="策略年化收益率 vs 无风险利率"
-    )
-    st.plotly_chart(fig_comparison, use_container_width=True)
+    
+    @compute_graph.node
+    def fig_comparison(annualized_return, risk_free_rate):
+        # 该图随总资金、利率变化而重建，直接用 graph_objects 构造（比 plotly.express 快一个数量级）
+        annualized, excess = annualized_return
+        return go.Figure(
+            go.Bar(x=["策略年化", "无风险利率", "超额收益"], y=[annualized * 100, risk_free_rate, excess * 100],
+                   marker_color=["#2a6fdb", "#6c757d", "#28a745"]),
+            layout=dict(title="策略年化收益率 vs 无风险利率", xaxis_title="指标", yaxis_title="收益率 (%)")
+        )
+    
+    st.plotly_chart(compute_graph["fig_comparison"], use_container_width=True)
     
     # 实现10%以上年化收益率的条件
     st.subheader("实现10%以上年化收益率的条件")
@@ -837,77 +1769,444 @@ with tab3:
     - 权利金范围扩大至0-300元/吨，可根据市场波动率灵活调整
     """)
 
+with tab4:
+    st.subheader("批量参数扫描")
+    st.caption("在所选参数区间的笛卡尔积上一次性计算盈亏模型，未扫描的参数取侧边栏当前值")
+    
+    if dynamic_hedge:
+        st.info("已启用动态对冲：实际对冲比例由最低/最高对冲比例决定，扫描“对冲比例”不会改变结果")
+    if option_book is not None:
+        st.info("已启用多腿期权组合：组合盈亏不依赖单腿的期权比例、执行价和权利金，因此参数扫描与仓位优化"
+                "改按侧边栏的单腿卖出看涨期权参数计算（不含多腿组合）")
+    
+    # 扫描与优化的基准参数：去掉多腿组合，期权相关参数按单腿卖权计算
+    @compute_graph.node
+    def sweep_params(strategy_params):
+        return {name: value for name, value in strategy_params.items() if name != "option_book"}
+    
+    sweep_params = compute_graph["sweep_params"]
+    
+    # 各参数的扫描区间上下限及默认区间
+    sweep_limits = {
+        "hedge_ratio": (0, 100, (0, 50)),
+        "grid_ratio": (0, 30, (0, 30)),
+        "option_ratio": (0, 30, (0, 30)),
+        "option_premium": (0, 300, (0, 300)),
+        "strike_price": (int(spot_base * 0.8), int(spot_base * 1.2), (int(spot_base * 0.9), int(spot_base * 1.1))),
+        "grid_profit_per_ton": (0, 50, (0, 50)),
+        "min_hedge": (0, 30, (0, 30)),
+        "max_hedge": (50, 100, (50, 100)),
+        "hedge_threshold": (1, 10, (1, 10)),
+    }
+    
+    sweep_names = st.multiselect(
+        "扫描参数", list(SWEEP_PARAMS),
+        default=["hedge_ratio", "option_ratio", "grid_ratio", "option_premium"],
+        format_func=SWEEP_PARAMS.get
+    )
+    
+    sweep_ranges = {}
+    for name in sweep_names:
+        low, high, default = sweep_limits[name]
+        col_range, col_count = st.columns([3, 1])
+        with col_range:
+            value_range = st.slider(f"{SWEEP_PARAMS[name]}区间", low, high, default, key=f"sweep_range_{name}")
+        with col_count:
+            count = st.number_input(f"{SWEEP_PARAMS[name]}取值个数", 2, 200, 11, key=f"sweep_count_{name}")
+        sweep_ranges[name] = np.linspace(value_range[0], value_range[1], int(count))
+    
+    n_combos = int(np.prod([len(v) for v in sweep_ranges.values()])) if sweep_ranges else 0
+    st.write(f"参数组合数: {n_combos:,} × 价格点数: {len(df):,}")
+    
+    if n_combos == 0:
+        st.info("请至少选择一个扫描参数")
+    elif n_combos > 200000:
+        st.warning("参数组合数超过200,000，请缩小扫描区间或减少取值个数")
+    else:
+        prices = df["现货价格"].values
+        first_name = sweep_names[0]
+        first_label = SWEEP_PARAMS[first_name]
+        
+        # 首个扫描参数 × 价格 的总利润曲面（其余参数取当前值）
+        @compute_graph.node
+        def sweep_surface(df, sweep_params, sweep_axis):
+            name, values = sweep_axis
+            return profit_surface(df["现货价格"].values, sweep_params, **{name: values})
+        
+        # 曲面沿价格轴等间隔抽取列（保留执行价附近的列）
+        @compute_graph.node
+        def surface_columns(df, strategy_params):
+            return downsample_indices(df["现货价格"].values, max_points=MAX_SURFACE_COLUMNS,
+                                      keep=strategy_params["strike_price"])
+        
+        @compute_graph.node
+        def fig_surface_map(sweep_surface, surface_columns, df, sweep_axis):
+            name, values = sweep_axis
+            return px.imshow(
+                sweep_surface[:, surface_columns], x=df["现货价格"].values[surface_columns], y=values,
+                origin="lower", aspect="auto",
+                color_continuous_scale=["#dc3545", "#ffc107", "#28a745"],
+                labels={"x": "现货价格", "y": SWEEP_PARAMS[name], "color": "总利润（元）"},
+                title=f"总利润热力图（{SWEEP_PARAMS[name]} × 现货价格）"
+            )
+        
+        @compute_graph.node
+        def fig_surface_3d(sweep_surface, surface_columns, df, sweep_axis):
+            name, values = sweep_axis
+            fig_surface_3d = go.Figure(go.Surface(x=df["现货价格"].values[surface_columns], y=values,
+                                                  z=sweep_surface[:, surface_columns],
+                                                  colorscale=["#dc3545", "#ffc107", "#28a745"]))
+            fig_surface_3d.update_layout(
+                title=f"总利润三维曲面（{SWEEP_PARAMS[name]} × 现货价格）",
+                scene=dict(xaxis_title="现货价格", yaxis_title=SWEEP_PARAMS[name], zaxis_title="总利润（元）"),
+                height=600
+            )
+            return fig_surface_3d
+        
+        compute_graph.set_inputs(sweep_axis=(first_name, sweep_ranges[first_name]))
+        st.subheader(f"总利润曲面: {first_label} × 现货价格")
+        st.plotly_chart(compute_graph["fig_surface_map"], use_container_width=True)
+        st.plotly_chart(compute_graph["fig_surface_3d"], use_container_width=True)
+        
+        st.subheader("参数组合风险汇总")
+        # 缓存结果为共享对象，派生列用 assign 生成新表
+        sweep_summary = run_parameter_sweep(prices, sweep_params, sweep_ranges, int(n_workers))
+        sweep_summary = sweep_summary.assign(**{
+            "最大回撤率(%)": sweep_summary["最大回撤"] / (capital * 10000) * 100,
+            "VaR占比(%)": sweep_summary["95% VaR"].abs() / (capital * 10000) * 100,
+        })
+        st.dataframe(
+            sweep_summary.sort_values("95% VaR", ascending=False),
+            hide_index=True, use_container_width=True
+        )
+    
+    st.subheader("约束仓位优化")
+    st.caption("搜索对冲/网格/期权比例与执行价（及权利金），在回撤、VaR与保证金约束下使收益最高；"
+               "价格网格与其余参数取侧边栏当前值")
+    col_o1, col_o2, col_o3, col_o4 = st.columns(4)
+    with col_o1:
+        opt_objective = st.radio("优化目标", list(OPT_OBJECTIVES), format_func=OPT_OBJECTIVES.get, index=1)
+    with col_o2:
+        opt_drawdown = st.number_input("最大回撤上限（%）", 1.0, 50.0, OPT_LIMITS["drawdown"] * 100, step=0.5)
+    with col_o3:
+        opt_var = st.number_input("VaR上限（%）", 1.0, 50.0, OPT_LIMITS["var"] * 100, step=0.5)
+    with col_o4:
+        opt_margin = st.number_input("保证金占用上限（%）", 5.0, 100.0, OPT_LIMITS["margin"] * 100, step=5.0)
+    opt_model_premium = st.checkbox("权利金按Black-76随执行价定价", value=True,
+                                    help="取消后权利金作为独立变量搜索（优化器会倾向于最高权利金）")
+    
+    if st.toggle("运行仓位优化", value=False):
+        premium_fn = partial(black76_price, futures_base, T=option_years, r=risk_free_rate / 100,
+                             sigma=implied_vol) if opt_model_premium else None
+        opt_limits = {"drawdown": opt_drawdown / 100, "var": opt_var / 100, "margin": opt_margin / 100}
+        opt_best, opt_table = run_optimizer(
+            df["现货价格"].values, sweep_params, capital, risk_free_rate, days_to_expiry, futures_base,
+            futures_margin_ratio, option_margin_ratio, opt_objective, opt_limits, premium_fn, int(n_workers)
+        )
+        if opt_best is None:
+            st.warning("在当前约束下未找到可行配置，请放宽约束或调整其他参数")
+        else:
+            col_b1, col_b2, col_b3, col_b4, col_b5 = st.columns(5)
+            col_b1.metric("对冲比例", f"{opt_best['hedge_ratio']:.0f}%")
+            col_b2.metric("网格比例", f"{opt_best['grid_ratio']:.0f}%")
+            col_b3.metric("期权比例", f"{opt_best['option_ratio']:.0f}%")
+            col_b4.metric("执行价格", f"{opt_best['strike_price']:.0f} 元")
+            col_b5.metric("期权权利金", f"{opt_best['option_premium']:.2f} 元")
+            col_r1, col_r2, col_r3, col_r4 = st.columns(4)
+            col_r1.metric(OPT_OBJECTIVES[opt_objective], f"{opt_best[opt_objective]*100:.2f}%")
+            col_r2.metric("最大回撤率", f"{opt_best['drawdown']*100:.2f}%")
+            col_r3.metric("VaR占比", f"{opt_best['var']*100:.2f}%")
+            col_r4.metric("保证金占比", f"{opt_best['margin']*100:.1f}%")
+            st.caption(f"共评估 {len(opt_table):,} 个可行配置，前20名如下")
+            st.dataframe(opt_table.head(20), hide_index=True, use_container_width=True)
+
+@result_cache.cached
+def run_portfolio(book, model, days, n_paths, seed):
+    return simulate_portfolio(book, None, days, n_paths, seed=int(seed), model=model)
+
+with tab5:
+    st.subheader("多品种组合风险")
+    st.caption("螺纹钢、热卷、铁矿石、焦炭等多个品种的库存与对冲、网格、卖权腿，按相关系数矩阵联合模拟到期价格"
+               "（Cholesky 因子只在相关系数或波动率变化时重算），汇总组合 VaR、各品种尾部贡献与保证金。"
+               "对冲品种可填其他品种实现跨品种对冲，按货值折算对冲吨数")
+    portfolio_sim = st.checkbox("启用多品种组合模拟", value=False,
+                                help="按下表持仓联合模拟组合风险，并将结果写入导出报告（默认关闭，示例持仓不进入报告）")
+    if portfolio_sim:
+        asset_frame = st.data_editor(pd.DataFrame(DEFAULT_ASSETS, columns=list(ASSET_COLUMNS.values())),
+                                     num_rows="dynamic", hide_index=True, use_container_width=True, key="portfolio_assets")
+        asset_codes = [str(code) for code in asset_frame[ASSET_COLUMNS["code"]].dropna()]
+        
+        # 相关系数矩阵按当前品种生成默认值（默认持仓之外的品种相关系数为0），品种变化时重置
+        default_codes = [row[0] for row in DEFAULT_ASSETS]
+        default_corr = pd.DataFrame(DEFAULT_CORRELATION, index=default_codes, columns=default_codes)
+        corr_frame = pd.DataFrame(np.eye(len(asset_codes)), index=asset_codes, columns=asset_codes)
+        known = [code for code in asset_codes if code in default_codes]
+        corr_frame.loc[known, known] = default_corr.loc[known, known].values
+        st.markdown("**相关系数矩阵**")
+        corr_frame = st.data_editor(corr_frame, use_container_width=True, key=f"portfolio_corr_{'_'.join(asset_codes)}")
+        
+        col_p1, col_p2 = st.columns(2)
+        with col_p1:
+            portfolio_paths = st.selectbox("组合模拟路径数", [100_000, 1_000_000, 5_000_000], index=1,
+                                           format_func=lambda n: f"{n:,}")
+        with col_p2:
+            st.metric("模拟期限", f"{mc_days} 天", delta=f"随机种子 {mc_seed}", delta_color="off")
+        # 价格模型只取品种与波动率两列，改库存、对冲比例等持仓列不触发重算
+        compute_graph.set_inputs(portfolio_assets=asset_frame, portfolio_corr=corr_frame,
+                                 portfolio_vols=asset_frame[[ASSET_COLUMNS["code"], ASSET_COLUMNS["vol"]]],
+                                 portfolio_paths=portfolio_paths)
+        
+        @compute_graph.node
+        def asset_book(portfolio_assets):
+            return AssetBook.from_frame(portfolio_assets)
+        
+        # 价格模型单独成节点：只改持仓（库存、对冲比例等）时复用已分解的 Cholesky 因子
+        @compute_graph.node
+        def asset_model(portfolio_corr, portfolio_vols):
+            vols = portfolio_vols.dropna(subset=[ASSET_COLUMNS["code"]])[ASSET_COLUMNS["vol"]].to_numpy(dtype=float)
+            return CorrelatedAssets(portfolio_corr.to_numpy(dtype=float), vols / 100)
+        
+        @compute_graph.node
+        def portfolio_result(asset_book, asset_model, mc_days, portfolio_paths, mc_seed):
+            return run_portfolio(asset_book, asset_model, mc_days, portfolio_paths, mc_seed)
+        
+        @compute_graph.node
+        def asset_risk_table(asset_book, portfolio_result, futures_margin_ratio, option_margin_ratio):
+            futures_margin, option_margin = asset_book.margin(futures_margin_ratio, option_margin_ratio)
+            table = pd.DataFrame(portfolio_result["assets"])
+            table["期货保证金"] = futures_margin
+            table["期权保证金"] = option_margin
+            return table
+        
+        try:
+            portfolio = compute_graph["portfolio_result"]
+            portfolio_table = compute_graph["asset_risk_table"]
+        except Exception as e:
+            st.warning(f"多品种组合参数有误: {str(e)}")
+            portfolio, portfolio_table = None, None
+        # 导出报告只取已算出的结果，参数有误时跳过该表
+        compute_graph.set_inputs(portfolio_table=portfolio_table)
+        
+        if portfolio is not None:
+            portfolio_margin = portfolio_table["期货保证金"].sum() + portfolio_table["期权保证金"].sum()
+            col_q1, col_q2, col_q3, col_q4 = st.columns(4)
+            with col_q1:
+                st.metric("组合 95% VaR", f"{portfolio['var']:,.0f} 元",
+                          delta=f"亏损概率 {portfolio['prob_loss']*100:.1f}%", delta_color="off")
+            with col_q2:
+                st.metric("组合 95% CVaR", f"{portfolio['cvar']:,.0f} 元")
+            with col_q3:
+                st.metric("分散化收益", f"{portfolio['diversification']:,.0f} 元",
+                          help="组合VaR相对各品种单独VaR之和少亏的金额")
+            with col_q4:
+                st.metric("组合保证金", f"{portfolio_margin:,.0f} 元",
+                          delta=f"占总资金 {portfolio_margin/(capital*10000)*100:.1f}%", delta_color="off")
+            st.dataframe(portfolio_table.round(0), hide_index=True, use_container_width=True)
+        
+            @compute_graph.node
+            def fig_portfolio(portfolio_result, portfolio_table):
+                fig_portfolio = go.Figure()
+                fig_portfolio.add_trace(go.Bar(x=portfolio_table["品种"], y=portfolio_table["单品种VaR"],
+                                               name="单品种 95% VaR", marker_color="#6c757d"))
+                fig_portfolio.add_trace(go.Bar(x=portfolio_table["品种"], y=portfolio_table["尾部贡献"],
+                                               name="组合尾部贡献（合计为组合CVaR）", marker_color="#dc3545"))
+                fig_portfolio.update_layout(
+                    barmode="group",
+                    title=f"各品种风险贡献（{portfolio_result['n_paths']:,}条路径）",
+                    yaxis_title="盈亏（元）"
+                )
+                return fig_portfolio
+        
+            @compute_graph.node
+            def fig_portfolio_dist(portfolio_result):
+                fig_portfolio_dist = go.Figure(go.Bar(
+                    x=portfolio_result["hist_centers"], y=portfolio_result["hist_counts"],
+                    marker_color="#1f77b4", name="路径数"
+                ))
+                fig_portfolio_dist.add_vline(x=portfolio_result["var"], line_dash="dash", line_color="red",
+                                             annotation_text="95% VaR")
+                fig_portfolio_dist.update_layout(title="组合盈亏分布", xaxis_title="组合盈亏（元）",
+                                                 yaxis_title="路径数", bargap=0)
+                return fig_portfolio_dist
+        
+            col_f1, col_f2 = st.columns(2)
+            with col_f1:
+                st.plotly_chart(compute_graph["fig_portfolio_dist"], use_container_width=True)
+            with col_f2:
+                st.plotly_chart(compute_graph["fig_portfolio"], use_container_width=True)
+    else:
+        # 未启用时导出报告不含多品种组合表
+        compute_graph.set_inputs(portfolio_table=None)
+
 # =============== 导出功能 ===============
 st.subheader("📁 数据导出与分析报告")
 
-# 创建内存中的Excel文件
-excel_buffer = BytesIO()
-with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-    # 主数据表
-    df.to_excel(writer, sheet_name='策略模拟', index=False)
-    
-    # 参数汇总表
-    params_data = {
-        "参数名称": [
-            "现货价格", "期货价格", "基差", "库存量", 
-            "对冲比例", "网格比例", "期权比例",
-            "网格收益", "期权权利金", "波动范围",
-            "执行价格", "动态对冲", "最低对冲比例", 
-            "最高对冲比例", "波动阈值", "总资金", "无风险利率",
-            "合约到期日", "期货保证金比例", "期权保证金比例"
-        ],
-        "参数值": [
-            f"{spot_base}元/吨", f"{futures_base}元/吨", f"{base_difference}元", f"{warehouse}吨",
-            f"{hedge_ratio}%", f"{grid_ratio}%", f"{option_ratio}%",
-            f"{grid_profit_per_ton}元/吨", f"{option_premium}元/吨", f"±{vol_range_percent}%",
-            f"{strike_price}元/吨", "是" if dynamic_hedge else "否",
-            f"{min_hedge}%" if dynamic_hedge else "N/A", 
-            f"{max_hedge}%" if dynamic_hedge else "N/A",
-            f"{hedge_threshold}%" if dynamic_hedge else "N/A",
-            f"{capital}万元", f"{risk_free_rate}%",
-            contract_expiry.strftime("%Y-%m-%d"),
-            f"{futures_margin_ratio}%", f"{option_margin_ratio}%"
-        ]
-    }
-    params_df = pd.DataFrame(params_data)
-    params_df.to_excel(writer, sheet_name='参数设置', index=False)
+# 报告只在点击下载时生成（按表格内容缓存）；此处仅整理各工作表数据
+
+# 参数汇总表
+params_data = {
+    "参数名称": [
+        "现货价格", "期货价格", "基差", "库存量", 
+        "对冲比例", "网格比例", "期权比例",
+        "网格收益", "期权权利金", "波动范围",
+        "执行价格", "动态对冲", "最低对冲比例", 
+        "最高对冲比例", "波动阈值", "总资金", "无风险利率",
+        "合约到期日", "期货保证金比例", "期权保证金比例",
+        "价格步长", "自适应加密网格"
+    ],
+    "参数值": [
+        f"{spot_base}元/吨", f"{futures_base}元/吨", f"{base_difference}元", f"{warehouse}吨",
+        f"{hedge_ratio}%", f"{grid_ratio}%", f"{option_ratio}%",
+        f"事件驱动模拟（{grid_atr_multiple:g} ATR，单边{grid_levels}档）" if grid_engine else f"{grid_profit_per_ton}元/吨",
+        f"{option_premium:.2f}元/吨", f"±{vol_range_percent}%",
+        f"{strike_price}元/吨", "是" if dynamic_hedge else "否",
+        f"{min_hedge}%" if dynamic_hedge else "N/A", 
+        f"{max_hedge}%" if dynamic_hedge else "N/A",
+        f"{hedge_threshold}%" if dynamic_hedge else "N/A",
+        f"{capital}万元", f"{risk_free_rate}%",
+        contract_expiry.strftime("%Y-%m-%d"),
+        f"{futures_margin_ratio}%", f"{option_margin_ratio}%",
+        f"{price_step}元/吨", "是" if adaptive_grid else "否"
+    ]
+}
+compute_graph.set_inputs(report_params=pd.DataFrame(params_data), backtest_table=backtest_table)
+
+@compute_graph.node
+def report_sheets(df, report_params, strategy_params, risk_metrics, annualized_return, margin, capital, mc_result,
+                  mc_model, mc_seed, margin_result, margin_settings, hedge_simulation, basis_result, basis_settings,
+                  roll_result, roll_settings, portfolio_table, sensitivity_table, stress_table, backtest_table):
+    sheets = {}
+    if len(df) < EXCEL_MAX_ROWS:
+        sheets["策略模拟"] = df
+    sheets["参数设置"] = report_params
     
     # 风险指标表
-    risk_metrics = {
+    risk, capital_yuan = risk_metrics, capital * 10000
+    annualized, excess = annualized_return
+    total_margin = margin[2]
+    profit_range = risk["profit_range"]
+    rows = {
         "指标": ["最大回撤", "盈亏平衡区间", "95% VaR", "压力测试亏损", "年化收益率", "超额收益率", "总保证金占用"],
         "数值": [
-            f"{max_drawdown:,.0f}元 ({max_drawdown_pct:.2f}%)", 
-            breakeven_str,
-            f"{abs(var_95):,.0f}元 ({var_95_pct:.2f}%)",
-            f"{abs(stress_loss):,.0f}元 ({stress_loss_pct:.2f}%)",
-            f"{annualized_return*100:.2f}%",
-            f"{excess_return*100:.2f}%",
-            f"{total_margin:,.0f}元 ({total_margin/(capital*10000)*100:.1f}%)"
+            f"{risk['max_drawdown']:,.0f}元 ({risk['max_drawdown_pct']:.2f}%)", 
+            f"{profit_range[0]:.1f} ~ {profit_range[1]:.1f}" if profit_range else "无",
+            f"{abs(risk['var_95']):,.0f}元 ({risk['var_95_pct']:.2f}%)",
+            f"{abs(risk['stress_loss']):,.0f}元 ({risk['stress_loss_pct']:.2f}%)",
+            f"{annualized*100:.2f}%",
+            f"{excess*100:.2f}%",
+            f"{total_margin:,.0f}元 ({total_margin/capital_yuan*100:.1f}%)"
         ]
     }
-    pd.DataFrame(risk_metrics).to_excel(writer, sheet_name='风险指标', index=False)
+    if mc_result is not None:
+        rows["指标"] += ["95% CVaR", "亏损概率", "VaR/CVaR 标准误", "模拟路径数"]
+        rows["数值"] += [
+            f"{abs(mc_result['cvar']):,.0f}元 ({abs(mc_result['cvar'])/capital_yuan*100:.2f}%)",
+            f"{mc_result['prob_loss']*100:.2f}% (±{mc_result['prob_loss_se']*100:.3f}%)",
+            f"±{mc_result['var_se']:,.0f}元 / ±{mc_result['cvar_se']:,.0f}元",
+            f"{mc_result['n_paths']:,} ({PRICE_MODELS[mc_model]}, 种子{mc_seed})"
+        ]
+    if margin_result is not None:
+        rows["指标"] += ["峰值保证金(P99)", "追保概率", "首次追保时间(中位数)", "资金缺口(P99)"]
+        rows["数值"] += [
+            f"{margin_result['peak_p99']:,.0f}元 (占现金储备{margin_result['usage_p99']*100:.0f}%)",
+            f"{margin_result['prob_call']*100:.2f}% (现金储备{margin_settings['cash_reserve']}万元)",
+            f"第{margin_result['first_call_median']:.0f}天" if margin_result["first_call_median"] is not None else "无追保",
+            f"{margin_result['shortfall_p99']:,.0f}元"
+        ]
+    if hedge_simulation is not None:
+        hedge_result = hedge_simulation[1]
+        rows["指标"] += ["调仓对冲净盈亏均值", "调仓对冲95% VaR", "平均交易成本", "平均换手量"]
+        rows["数值"] += [
+            f"{hedge_result['mean']:,.0f}元",
+            f"{hedge_result['var']:,.0f}元",
+            f"{hedge_result['cost']:,.0f}元",
+            f"{hedge_result['turnover']:,.0f}吨 (平均调仓{hedge_result['rebalances']:.1f}次)"
+        ]
+    if basis_result is not None:
+        rows["指标"] += ["零基差风险95% VaR", "基差收敛贡献", "随机基差贡献", "期现联合95% VaR"]
+        rows["数值"] += [
+            f"{basis_result['spot_only']['var']:,.0f}元 (第{basis_settings['days']}天平仓)",
+            f"{basis_result['convergence_var']:,.0f}元 (期望基差{basis_result['expected_basis']:,.0f}元/吨)",
+            f"{basis_result['stochastic_var']:,.0f}元 (基差标准差{basis_result['basis_std']:,.0f}元/吨)",
+            f"{basis_result['joint']['var']:,.0f}元"
+        ]
+    if roll_result is not None:
+        roll_summary = roll_result[0]
+        rows["指标"] += ["展期对冲总盈亏均值", "展期对冲95% VaR", "展期收益均值", "展期交易成本",
+                        "展期峰值保证金(P95)", "展期对冲年化收益率"]
+        rows["数值"] += [
+            f"{roll_summary['mean']:,.0f}元 ({' → '.join(code for code, _ in roll_settings['strip'])})",
+            f"{roll_summary['var']:,.0f}元",
+            f"{roll_summary['roll_yield']:,.0f}元",
+            f"{roll_summary['cost']:,.0f}元",
+            f"{roll_summary['peak_margin_p95']:,.0f}元",
+            f"{roll_summary['annualized']*100:.2f}% (期限{roll_settings['horizon']}天)"
+        ]
+    sheets["风险指标"] = pd.DataFrame(rows)
+    
+    # 多腿期权组合逐腿明细
+    option_book = strategy_params.get("option_book")
+    if option_book is not None:
+        # 权利金收支：卖出腿收取为正，买入腿支付为负
+        sheets["期权组合"] = option_book.to_frame().assign(权利金收支=-option_book.weights * option_book.premium)
+    
+    if portfolio_table is not None:
+        sheets["多品种组合"] = portfolio_table
+    sheets["组合敏感度"] = sensitivity_table
+    
+    # 压力测试情景按总利润升序（亏损最大在前）
+    if len(stress_table) < EXCEL_MAX_ROWS:
+        sheets["压力测试"] = stress_table
     
     # 历史回测数据
-    backtest_df = pd.DataFrame({
-        "年度": ["2022", "2023", "2024"],
-        "年化收益率": ["15.2%", "22.7%", "18.3%"],
-        "最大回撤率": ["6.8%", "7.2%", "5.9%"],
-        "波动率": ["12.4%", "14.1%", "11.7%"],
-        "夏普比率": ["1.23", "1.61", "1.56"],
-        "无风险利率": ["2.5%", "2.6%", "2.7%"],
-        "超额收益率": ["12.7%", "20.1%", "15.6%"]
-    })
-    backtest_df.to_excel(writer, sheet_name='历史回测', index=False)
-
-# 下载按钮
+    if backtest_table is not None:
+        sheets["历史回测"] = backtest_table
+    return sheets
+
+report_sheets = compute_graph["report_sheets"]
+
+build_excel_report = result_cache.cached(excel_report)
+build_table_file = result_cache.cached(table_bytes)
+export_stamp = datetime.now().strftime('%Y%m%d_%H%M')
+
+# 下载按钮（传入函数，点击时才生成文件）
 st.download_button(
     label="📥 下载完整分析报告 (Excel)",
-    data=excel_buffer.getvalue(),
-    file_name=f"螺纹期现策略模拟_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    data=lambda: build_excel_report(report_sheets),
+    file_name=f"螺纹期现策略模拟_{export_stamp}.xlsx",
+    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    on_click="ignore"
 )
 
-st.caption("报告包含策略模拟数据、参数设置、风险指标和历史回测")
+if "策略模拟" in report_sheets:
+    st.caption("报告包含策略模拟数据、参数设置、风险指标、期权组合、压力测试和历史回测")
+else:
+    st.caption(f"策略模拟数据共 {len(df):,} 行，超过Excel行数上限，请通过下方Parquet/CSV导出")
+
+# 大数据量输出（百万行级）使用列式文件导出
+col_parquet, col_csv = st.columns(2)
+with col_parquet:
+    st.download_button(
+        label="📦 导出策略模拟数据 (Parquet)",
+        data=lambda: build_table_file(df, "parquet"),
+        file_name=f"螺纹期现策略模拟_{export_stamp}.parquet",
+        mime="application/octet-stream",
+        on_click="ignore"
+    )
+with col_csv:
+    st.download_button(
+        label="📄 导出策略模拟数据 (CSV)",
+        data=lambda: build_table_file(df, "csv"),
+        file_name=f"螺纹期现策略模拟_{export_stamp}.csv",
+        mime="text/csv",
+        on_click="ignore"
+    )
+
+graph_stats = compute_graph.stats()
+graph_stats_slot.caption(
+    f"增量计算：本次重算 {len(graph_stats['recomputed'])} / {graph_stats['nodes']} 个节点"
+    f"（{graph_stats['elapsed'] * 1000:.0f} ms），复用 {graph_stats['reused']} 次"
+)
 
 # 页脚
 st.markdown("---")
@@ -0,0 +1,41 @@
+"""
+螺纹钢期现策略模拟内核（不依赖Streamlit界面）
+
+导出名称按需延迟导入，`import simulation` 本身不加载 NumPy/pandas/SciPy，
+命令行批量运行（python -m simulation）因此可以快速启动。
+"""
+import importlib
+
+_EXPORTS = {
+    "PNL_COLUMNS": "strategy",
+    "price_grid": "strategy",
+    "strategy_pnl": "strategy",
+    "total_profit_fn": "strategy",
+    "strategy_kinks": "strategy",
+    "refine_grid": "strategy",
+    "find_roots": "strategy",
+    "adaptive_price_grid": "strategy",
+    "profit_interval": "strategy",
+    "calculate_strategy_reference": "strategy",
+    "SCENARIO_DEFAULTS": "scenario",
+    "strategy_params": "scenario",
+    "strategy_columns": "scenario",
+    "calculate_strategy": "scenario",
+    "margin_requirement": "scenario",
+    "calculate_annualized_return": "scenario",
+    "run_scenario": "scenario",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
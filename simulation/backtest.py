@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+from .io import HISTORY_COLUMNS, read_price_history  # 兼容原导入路径
+from .strategy import dynamic_hedge_ratio
+
+TRADING_DAYS = 252
+
+# 回测结果表列（与历史回测表及Excel导出一致）
+BACKTEST_COLUMNS = ("年度", "年化收益率", "最大回撤率", "波动率", "夏普比率", "无风险利率", "超额收益率")
+
+
+def _column(value):
+    """
+    一维参数数组转为 (配置数, 1) 以便与日期维广播，标量保持不变
+    """
+    value = np.asarray(value)
+    return value.reshape(-1, 1) if value.ndim else value
+
+
+def backtest_pnl(spot, futures, spot_base, warehouse, hedge_ratio, grid_ratio, option_ratio,
+                 grid_profit_per_ton, option_premium, strike_price,
+                 dynamic_hedge=True, min_hedge=10, max_hedge=80, hedge_threshold=5, cycle_days=20):
+    """
+    按日重放期货对冲、网格和卖出看涨期权策略，返回各组件日盈亏 {名称: (配置数, 天数-1)}
+
+    策略参数可为标量或长度为配置数的一维数组，全部配置与交易日一次性向量化计算：
+    - 每 cycle_days 个交易日为一个周期，周期初按执行价/现货价的比值卖出看涨期权，
+      收取权利金，周期末按现货价格结算内在价值（与情景模拟口径一致）
+    - 对冲比例以周期初现货价为基准，按动态对冲规则逐日确定，次日按期货价格变动计盈亏
+    - 网格策略收益按周期平均计入每日
+    """
+    params = {name: _column(value) for name, value in dict(
+        warehouse=warehouse, hedge_ratio=hedge_ratio, grid_ratio=grid_ratio,
+        option_ratio=option_ratio, grid_profit_per_ton=grid_profit_per_ton,
+        option_premium=option_premium, strike_price=strike_price, dynamic_hedge=dynamic_hedge,
+        min_hedge=min_hedge, max_hedge=max_hedge, hedge_threshold=hedge_threshold
+    ).items()}
+    n_configs = max(np.size(value) for value in params.values())
+
+    spot = np.asarray(spot, dtype=float)[None, :]
+    futures = np.asarray(futures, dtype=float)[None, :]
+    n_days = spot.shape[1]
+    shape = (n_configs, n_days - 1)
+
+    # 周期初现货价作为动态对冲基准
+    day = np.arange(n_days)
+    anchor = spot[:, day // cycle_days * cycle_days]
+    dynamic_ratio = dynamic_hedge_ratio(spot, anchor, params["min_hedge"], params["max_hedge"],
+                                        params["hedge_threshold"])
+    ratio = np.where(params["dynamic_hedge"], dynamic_ratio, params["hedge_ratio"])
+
+    spot_pnl = np.broadcast_to(np.diff(spot, axis=1) * params["warehouse"], shape)
+    hedge_pnl = np.broadcast_to(-np.diff(futures, axis=1) * ratio[:, :-1] / 100 * params["warehouse"], shape)
+    grid_pnl = np.broadcast_to(
+        params["grid_profit_per_ton"] * params["grid_ratio"] / 100 * params["warehouse"] / cycle_days, shape
+    )
+
+    # 期权：周期初收取权利金，周期末（或回测最后一日）按内在价值结算
+    option_tons = params["option_ratio"] / 100 * params["warehouse"]
+    sale_days = np.arange(0, n_days - 1, cycle_days)
+    settle_days = np.minimum(sale_days + cycle_days, n_days - 1)
+    strikes = spot[:, sale_days] * params["strike_price"] / spot_base
+    payoff = np.maximum(spot[:, settle_days] - strikes, 0)
+    option_pnl = np.zeros(shape)
+    option_pnl[:, sale_days] += np.broadcast_to(params["option_premium"] * option_tons, (n_configs, 1))
+    option_pnl[:, settle_days - 1] -= np.broadcast_to(payoff * option_tons, (n_configs, len(settle_days)))
+
+    return {
+        "现货盈亏": spot_pnl,
+        "期货对冲": hedge_pnl,
+        "网格策略": grid_pnl,
+        "卖权策略": option_pnl,
+        "总利润": spot_pnl + hedge_pnl + grid_pnl + option_pnl,
+    }
+
+
+def _period_metrics(pnl, equity_start, risk_free_rate):
+    """
+    单个区间的绩效指标，pnl 形状 (配置数, 天数)
+    """
+    equity = equity_start[:, None] + np.cumsum(pnl, axis=1)
+    prev = np.concatenate([equity_start[:, None], equity[:, :-1]], axis=1)
+    returns = pnl / prev
+    n = pnl.shape[1]
+
+    growth = equity[:, -1] / equity_start
+    annualized = np.where(growth > 0, np.abs(growth) ** (TRADING_DAYS / n) - 1, -1.0)
+    peak = np.maximum.accumulate(np.concatenate([equity_start[:, None], equity], axis=1), axis=1)[:, 1:]
+    drawdown = np.max(1 - equity / peak, axis=1)
+    volatility = returns.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS) if n > 1 else np.zeros(len(growth))
+    excess = annualized - risk_free_rate
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(volatility > 0, excess / volatility, np.nan)
+    return annualized, drawdown, volatility, sharpe, excess
+
+
+def performance_table(dates, pnl, capital, risk_free_rate):
+    """
+    按自然年度及全区间汇总绩效：年化收益率、最大回撤率、波动率、夏普比率、超额收益率
+
+    pnl 形状 (配置数, 天数-1)，第 t 列为第 t 日至第 t+1 日的盈亏；capital 以元计，
+    risk_free_rate 为小数。返回长表，含“配置”列。
+    """
+    years = pd.DatetimeIndex(dates[1:]).year.values
+    n_configs = pnl.shape[0]
+    equity = capital + np.concatenate([np.zeros((n_configs, 1)), np.cumsum(pnl, axis=1)], axis=1)
+
+    frames = []
+    periods = [(str(year), years == year) for year in np.unique(years)] + [("全区间", np.ones_like(years, bool))]
+    for label, mask in periods:
+        first = np.argmax(mask)
+        annualized, drawdown, volatility, sharpe, excess = _period_metrics(
+            pnl[:, mask], equity[:, first], risk_free_rate
+        )
+        frames.append(pd.DataFrame({
+            "配置": np.arange(n_configs),
+            "年度": label,
+            "年化收益率": annualized,
+            "最大回撤率": drawdown,
+            "波动率": volatility,
+            "夏普比率": sharpe,
+            "无风险利率": risk_free_rate,
+            "超额收益率": excess,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def backtest_strategy(history, strategy_params, capital, risk_free_rate, cycle_days=20):
+    """
+    历史回测：读取日度行情后重放策略，返回 (绩效长表, 权益曲线)
+
+    strategy_params 与 strategy_pnl 的参数一致，可含一维数组以同时回测多组配置；
+    capital 以元计，risk_free_rate 为小数。权益曲线形状 (配置数, 交易日数)。
+    """
+    components = backtest_pnl(history["spot"].values, history["futures"].values,
+                              cycle_days=cycle_days, **strategy_params)
+    pnl = components["总利润"]
+    equity = capital + np.concatenate([np.zeros((pnl.shape[0], 1)), np.cumsum(pnl, axis=1)], axis=1)
+    return performance_table(history["date"].values, pnl, capital, risk_free_rate), equity
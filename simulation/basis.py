@@ -0,0 +1,91 @@
+import numpy as np
+from scipy.signal import lfilter
+
+# 基差模型默认参数：年化基差波动率（元/吨）、均值回复半衰期（自然日）
+BASIS_DEFAULTS = {"basis_vol": 400.0, "half_life": 20.0}
+
+
+def _kappa(half_life):
+    """
+    半衰期（天）换算为年化均值回复速度，None 或非正数按 0 处理（纯布朗桥）
+    """
+    return np.log(2) / (half_life / 365) if half_life else 0.0
+
+
+def _ou_variance(t, kappa, basis_vol):
+    """
+    从 0 出发的 OU 过程在 t 年后的方差
+    """
+    t = np.asarray(t, dtype=float)
+    if kappa == 0:
+        return basis_vol ** 2 * t
+    return basis_vol ** 2 * -np.expm1(-2 * kappa * t) / (2 * kappa)
+
+
+def basis_mean(basis_base, days, expiry_days):
+    """
+    基差的期望路径：自当前基差线性收敛，到合约到期日为 0
+    """
+    expiry_days = max(expiry_days, 1)
+    return basis_base * np.clip(expiry_days - np.asarray(days, dtype=float), 0, None) / expiry_days
+
+
+def basis_std(days, expiry_days, basis_vol, half_life=BASIS_DEFAULTS["half_life"]):
+    """
+    days 天后随机基差的标准差（元/吨）
+
+    基差偏离期望路径的部分为均值回复的 OU 过程，并以到期日偏离为 0 作条件（OU 桥），
+    方差 = v(t) − e^{−2κ(T−t)} v(t)² / v(T)，v 为 OU 过程的无条件方差；到期日及之后为 0。
+    """
+    expiry = max(expiry_days, 1) / 365
+    t = np.clip(np.asarray(days, dtype=float) / 365, 0, expiry)
+    kappa = _kappa(half_life)
+    v_t, v_T = _ou_variance(t, kappa, basis_vol), _ou_variance(expiry, kappa, basis_vol)
+    if v_T == 0:
+        return np.zeros_like(t)
+    return np.sqrt(np.maximum(v_t - np.exp(-2 * kappa * (expiry - t)) * v_t ** 2 / v_T, 0.0))
+
+
+def terminal_basis(rng, n, basis_base, days, expiry_days, basis_vol, half_life=BASIS_DEFAULTS["half_life"],
+                   dtype=np.float64):
+    """
+    模拟 days 天后的基差（现货 − 期货），服从 OU 桥的精确边际分布，无需逐日递推
+    """
+    dtype = np.dtype(dtype).type
+    z = rng.standard_normal(n, dtype=dtype)
+    return dtype(basis_mean(basis_base, days, expiry_days)) \
+        + dtype(basis_std(days, expiry_days, basis_vol, half_life)) * z
+
+
+def basis_paths(rng, n, basis_base, days, expiry_days, basis_vol, half_life=BASIS_DEFAULTS["half_life"],
+                steps_per_day=1, dtype=np.float64):
+    """
+    模拟基差路径，返回形状 (n, days * steps_per_day + 1)，时间网格与 price_paths 一致
+
+    先按精确离散化生成 OU 过程至到期日（时间维递推用 lfilter，全部路径一次完成），
+    再减去 X_T · Cov(X_t, X_T) / Var(X_T) 钉住到期日偏离为 0，最后叠加期望收敛路径。
+    到期日之后基差为 0。
+    """
+    dtype = np.dtype(dtype).type
+    n_steps = max(int(days * steps_per_day), 1)
+    dt = max(days, 0) / 365 / n_steps
+    expiry_steps = max(int(np.ceil(max(expiry_days, 1) / 365 / dt)), 1) if dt > 0 else 1
+    kappa = _kappa(half_life)
+    decay = np.exp(-kappa * dt)
+    scale = np.sqrt(_ou_variance(dt, kappa, basis_vol))
+
+    z = rng.standard_normal((n, expiry_steps), dtype=dtype)
+    noise = np.zeros((n, expiry_steps + 1), dtype=dtype)
+    noise[:, 1:] = lfilter([scale], [1.0, -decay], z, axis=1)
+
+    times = np.arange(expiry_steps + 1) * dt
+    expiry = times[-1]
+    v_t, v_T = _ou_variance(times, kappa, basis_vol), _ou_variance(expiry, kappa, basis_vol)
+    weight = np.exp(-kappa * (expiry - times)) * v_t / v_T if v_T > 0 else np.zeros_like(times)
+    noise -= noise[:, -1:] * weight.astype(dtype)
+
+    n_keep = min(n_steps, expiry_steps) + 1
+    paths = np.zeros((n, n_steps + 1), dtype=dtype)
+    paths[:, :n_keep] = noise[:, :n_keep]
+    paths += basis_mean(basis_base, np.arange(n_steps + 1) * dt * 365, expiry_days).astype(dtype)
+    return paths
@@ -0,0 +1,277 @@
+import datetime
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import threading
+import types
+from collections import OrderedDict
+
+import numpy as np
+
+
+def sizeof(value):
+    """
+    估算缓存值占用的字节数（DataFrame、数组、字典/列表递归累加）
+    """
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    LRU缓存，按条目数（及可选的总字节数）限制容量，超出时淘汰最久未使用的条目
+
+    记录命中、未命中与淘汰次数；读写加锁，可在多个会话线程间共享。
+    """
+
+    def __init__(self, maxsize=128, max_bytes=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._sizes = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            size = sizeof(value) if self.max_bytes is not None else 0
+            self._data[key] = value
+            self._sizes[key] = size
+            self.nbytes += size
+            # 至少保留刚写入的条目
+            while len(self._data) > 1 and (
+                len(self._data) > self.maxsize
+                or (self.max_bytes is not None and self.nbytes > self.max_bytes)
+            ):
+                self._evict(next(iter(self._data)))
+
+    def _remove(self, key):
+        del self._data[key]
+        self.nbytes -= self._sizes.pop(key)
+
+    def _evict(self, key):
+        self._remove(key)
+        self.evictions += 1
+
+    def stats(self):
+        """
+        缓存统计：条目数、字节数、命中、未命中、淘汰次数
+        """
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+def code_digest(code):
+    """
+    函数字节码、引用名称及常量的哈希（嵌套函数递归处理），函数体修改后缓存与节点随之失效
+    """
+    digest = hashlib.sha1(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        digest.update(code_digest(const).encode() if isinstance(const, types.CodeType) else repr(const).encode())
+    return digest.hexdigest()
+
+
+def _round_significant(values, digits):
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide="ignore"):
+        magnitude = np.where(values == 0, 0, np.floor(np.log10(np.abs(values))))
+    scale = 10.0 ** (digits - 1 - magnitude)
+    return np.round(values * scale) / scale
+
+
+def canonical(value, digits=10):
+    """
+    参数规范化：数值统一为按有效数字取整的浮点数（3700、3700.0、np.int64(3700) 等价），
+    容器递归处理、字典按键排序，数组按形状与取整后的内容表示，其他对象按类型与属性表示
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        value = float(value)
+        return 0.0 if value == 0 else float(f"{value:.{digits}g}")
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in "biuf":
+            rounded = np.ascontiguousarray(_round_significant(value, digits) + 0.0)
+            return ("ndarray", value.shape, hashlib.sha1(rounded).hexdigest())
+        return ("ndarray", value.shape, tuple(canonical(v, digits) for v in value.ravel().tolist()))
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), canonical(v, digits)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(canonical(v, digits) for v in value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if hasattr(value, "to_numpy") and hasattr(value, "columns"):
+        import pandas as pd
+        # 逐行哈希按顺序整体取摘要（求和会忽略行顺序）
+        rows = pd.util.hash_pandas_object(value, index=True).values
+        return ("frame", tuple(value.columns), hashlib.sha1(rows).hexdigest())
+    if isinstance(value, functools.partial):
+        return ("partial", getattr(value.func, "__qualname__", repr(value.func)),
+                canonical(value.args, digits), canonical(value.keywords, digits))
+    if hasattr(value, "__dict__") and not isinstance(value, (type, types.FunctionType, types.MethodType)):
+        # 自定义对象（如收益曲线）按类型与属性内容表示，避免 repr 中的内存地址
+        return (type(value).__qualname__, canonical(vars(value), digits))
+    return value
+
+
+class ResultCache(LRUCache):
+    """
+    计算结果缓存：参数规范化后取哈希作为键，数值相同的输入命中同一条目
+
+    按条目数与字节数双重限制内存；指定 persist_dir 时结果同时写入磁盘，
+    服务重启后未命中内存可从磁盘恢复（磁盘文件同样按容量限制清理）。
+    """
+
+    def __init__(self, maxsize=64, max_bytes=256 * 1024 ** 2, persist_dir=None, digits=10):
+        super().__init__(maxsize, max_bytes)
+        self.digits = digits
+        self.persist_dir = persist_dir
+        self.disk_hits = 0
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+            self._prune_disk()
+
+    def key(self, name, args=(), kwargs=None):
+        payload = repr((name, canonical(args, self.digits), canonical(kwargs or {}, self.digits)))
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.persist_dir, f"{key}.pkl")
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        if value is default and self.persist_dir and os.path.exists(self._disk_path(key)):
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    value = pickle.load(f)
+            except (OSError, pickle.PickleError, EOFError):
+                return default
+            with self._lock:
+                self.misses -= 1
+                self.hits += 1
+                self.disk_hits += 1
+            # 刷新修改时间，磁盘清理按最近使用保留
+            try:
+                os.utime(self._disk_path(key))
+            except OSError:
+                pass
+            super().put(key, value)
+        return value
+
+    def put(self, key, value):
+        super().put(key, value)
+        if self.persist_dir:
+            # 磁盘写入失败（空间不足、对象不可序列化等）只影响持久化，不影响本次计算结果
+            tmp = self._disk_path(key) + ".tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self._disk_path(key))
+            except (OSError, pickle.PicklingError, AttributeError, TypeError):
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                return
+            # 目录中可能有此前运行留下、不在内存 LRU 中的文件，每次写入后按容量清理
+            with self._lock:
+                self._prune_disk()
+
+    def _evict(self, key):
+        super()._evict(key)
+        if self.persist_dir and os.path.exists(self._disk_path(key)):
+            os.remove(self._disk_path(key))
+
+    def _prune_disk(self):
+        """
+        磁盘文件按修改时间保留最新的条目，超出条目数或字节数上限的删除（最新写入的文件始终保留）
+        """
+        files = []
+        for name in os.listdir(self.persist_dir):
+            path = os.path.join(self.persist_dir, name)
+            if name.endswith(".pkl"):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        files.sort(reverse=True)
+        total = 0
+        for i, (_, size, path) in enumerate(files):
+            total += size
+            if i > 0 and (i >= self.maxsize or (self.max_bytes is not None and total > self.max_bytes)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        stats = super().stats()
+        stats["disk_hits"] = self.disk_hits
+        return stats
+
+    def cached(self, func):
+        """
+        装饰器：按规范化参数缓存函数结果（返回的对象为共享实例，调用方不应原地修改）
+
+        键包含函数代码摘要，代码修改后（如重新部署）磁盘上的旧结果不再命中；
+        参数先按签名绑定并补全默认值，位置参数、关键字参数与省略默认值的调用命中同一条目。
+        """
+        name = f"{func.__module__}.{func.__qualname__}:{code_digest(func.__code__)}"
+        signature = inspect.signature(func)
+        missing = object()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = self.key(name, kwargs=dict(bound.arguments))
+            value = self.get(key, missing)
+            if value is missing:
+                value = func(*bound.args, **bound.kwargs)
+                self.put(key, value)
+            return value
+
+        wrapper.cache = self
+        return wrapper
@@ -0,0 +1,107 @@
+import numpy as np
+
+# 单条曲线发送到浏览器的点数上限，超过时降采样
+MAX_CHART_POINTS = 2_000
+
+# 点数超过该值时改用 WebGL（Scattergl）渲染
+WEBGL_POINTS = 1_000
+
+# 点数不超过该值时才逐点绘制标记与样条平滑
+MARKER_POINTS = 100
+
+# 热力图与三维曲面沿价格轴的列数上限
+MAX_SURFACE_COLUMNS = 400
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if values.dtype.kind == "M":
+        values = values.astype("datetime64[ns]").astype(np.int64)
+    return values.astype(float)
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回保留点的下标
+
+    首尾点固定保留，其余点按顺序均分为 n_out-2 个桶，每桶保留与上一个保留点、
+    下一桶均值点构成三角形面积最大的点，曲线的峰谷与转折得以保留。
+    """
+    x, y = _as_float(x), _as_float(y)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(bounds)
+    mean_x = np.add.reduceat(x[:n - 1], bounds[:-1]) / counts
+    mean_y = np.add.reduceat(y[:n - 1], bounds[:-1]) / counts
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_buckets):
+    """
+    按下标均分为 n_buckets 个桶，每桶每列保留最小值与最大值所在点（多条曲线共用横轴时使用）
+    """
+    y = _as_float(y)
+    y = y.reshape(len(y), -1)
+    n = len(y)
+    bucket = np.arange(n) * n_buckets // n
+    first = np.r_[True, bucket[1:] != bucket[:-1]]
+    last = np.r_[bucket[1:] != bucket[:-1], True]
+    picks = []
+    for column in y.T:
+        # 按 (桶, 数值) 排序后每桶首尾即最小、最大值
+        order = np.lexsort((column, bucket))
+        picks += [order[first], order[last]]
+    return np.unique(np.concatenate(picks))
+
+
+def downsample_indices(x, y=None, max_points=MAX_CHART_POINTS, keep=()):
+    """
+    图表数据降采样，返回保留点的下标（升序）
+
+    单条曲线用 LTTB，多列数据 (点数, 列数) 用分桶最值，y 为 None 时等间隔抽取。
+    keep 为必须保留的横坐标（如执行价、盈亏平衡点），其两侧最近的网格点一并保留，
+    分段线性盈亏曲线在这些拐点处的形状不会被抹平。
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    if y is None:
+        picks = np.linspace(0, n - 1, max_points).astype(np.int64)
+    elif np.ndim(y) == 1:
+        picks = lttb(x, y, max_points)
+    else:
+        picks = minmax_indices(y, max(max_points // (2 * np.shape(y)[1]), 1))
+    x = _as_float(x)
+    keep = np.asarray([k for k in np.atleast_1d(keep) if k is not None], dtype=float)
+    pos = np.searchsorted(x, keep)
+    kinks = np.clip(np.concatenate([pos - 1, pos, pos + 1]), 0, n - 1)
+    return np.unique(np.concatenate([picks, kinks, [0, n - 1]]))
+
+
+def chart_frame(frame, x, y=None, max_points=MAX_CHART_POINTS, keep=()):
+    """
+    按列名降采样 DataFrame（y 为列名或列名列表），未超过点数上限时原样返回
+    """
+    index = downsample_indices(frame[x].values, None if y is None else frame[y].values, max_points, keep)
+    return frame if len(index) == len(frame) else frame.iloc[index]
+
+
+def render_mode(n_points):
+    """
+    plotly.express 的 render_mode：点数多时用 WebGL
+    """
+    return "webgl" if n_points > WEBGL_POINTS else "svg"
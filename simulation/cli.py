@@ -0,0 +1,134 @@
+"""
+命令行批量运行情景：python -m simulation 情景文件... [-o 输出目录] [-f csv|parquet|json]
+
+情景文件为 JSON（单个参数对象，或对象列表）或 CSV（每行一个情景，表头为参数名），
+参数名与缺省值见 simulation.scenario.SCENARIO_DEFAULTS，可用 "name" 指定情景名称。
+每个情景输出一份价格网格盈亏表，全部情景的汇总指标另写入 summary 文件。
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+
+FORMATS = ("csv", "parquet", "json")
+
+
+def _convert(value):
+    """
+    CSV 单元格文本转为数值/布尔值（空单元格视为未指定）
+    """
+    text = value.strip()
+    if text == "":
+        return None
+    if text.lower() in ("true", "false"):
+        return text.lower() == "true"
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return int(number) if number.is_integer() and "." not in text else number
+
+
+def load_scenarios(path):
+    """
+    读取情景文件，返回 [(名称, 参数字典)]
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = [{k: v for k, v in ((k, _convert(v)) for k, v in row.items()) if v is not None}
+                    for row in csv.DictReader(f)]
+    else:
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+        rows = rows if isinstance(rows, list) else [rows]
+
+    scenarios = []
+    for i, row in enumerate(rows):
+        name = str(row.get("name") or (stem if len(rows) == 1 else f"{stem}_{i + 1}"))
+        scenarios.append((name, {k: v for k, v in row.items() if k != "name"}))
+    return scenarios
+
+
+def output_name(name, used):
+    """
+    情景名称转为输出文件名：替换路径分隔符等文件名非法字符，与已用名称（不区分大小写）重复时加序号
+    """
+    base = re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", name).strip(" .") or "scenario"
+    candidate, i = base, 1
+    while candidate.lower() in used:
+        i += 1
+        candidate = f"{base}_{i}"
+    used.add(candidate.lower())
+    return candidate
+
+
+def write_table(columns, path, fmt):
+    """
+    写出列式结果 {列名: 数组或列表}；CSV/JSON 不依赖 pandas
+    """
+    if fmt == "parquet":
+        import pandas as pd
+        pd.DataFrame(columns).to_parquet(path, index=False)
+        return
+    names = list(columns)
+    values = [[v.item() if hasattr(v, "item") else v for v in columns[name]] for name in names]
+    rows = list(zip(*values))
+    if fmt == "csv":
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(rows)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([dict(zip(names, row)) for row in rows], f, ensure_ascii=False, indent=1)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m simulation", description="批量计算期现策略情景")
+    parser.add_argument("scenarios", nargs="+", help="情景参数文件（JSON/CSV）")
+    parser.add_argument("-o", "--output", default="results", help="输出目录（默认 results）")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="csv", help="输出格式（默认 csv）")
+    parser.add_argument("--summary-only", action="store_true", help="只输出汇总指标，不写各情景盈亏表")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from .scenario import run_scenario
+
+    os.makedirs(args.output, exist_ok=True)
+    started = time.perf_counter()
+    summary = {}
+    failed = 0
+    # summary 文件名预留；不同目录下同名文件、同名情景按序号区分
+    used = {"summary"}
+    for path in args.scenarios:
+        try:
+            scenarios = load_scenarios(path)
+        except Exception as e:
+            print(f"{path}: 读取失败 - {e}", file=sys.stderr)
+            failed += 1
+            continue
+        for name, scenario in scenarios:
+            name = output_name(name, used)
+            try:
+                columns, metrics = run_scenario(scenario)
+                if not args.summary_only:
+                    write_table(columns, os.path.join(args.output, f"{name}.{args.format}"), args.format)
+            except Exception as e:
+                print(f"{name}: 失败 - {e}", file=sys.stderr)
+                failed += 1
+                continue
+            for key, value in {"情景": name, **metrics}.items():
+                summary.setdefault(key, []).append(value)
+
+    if summary:
+        write_table(summary, os.path.join(args.output, f"summary.{args.format}"), args.format)
+    n_done = len(summary.get("情景", []))
+    print(f"完成 {n_done} 个情景，失败 {failed} 个，用时 {time.perf_counter() - started:.2f}s，"
+          f"结果目录: {args.output}", file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,95 @@
+import hashlib
+import inspect
+import time
+
+from .cache import canonical, code_digest
+
+
+def fingerprint(value, digits=10):
+    """
+    输入值的指纹：规范化后取哈希（与结果缓存的键口径一致）
+    """
+    return hashlib.sha1(repr(canonical(value, digits)).encode("utf-8")).hexdigest()
+
+
+class ComputeGraph:
+    """
+    依赖追踪的增量计算图
+
+    节点为纯函数，依赖即函数的参数名（输入或其他节点）。节点指纹由自身代码与各依赖的指纹
+    逐层合成，取值时指纹未变即直接返回上次结果，否则先取依赖再重算；只有受输入变动影响的
+    节点会重算。图对象按会话保存，每次交互重设输入即可。
+    """
+
+    def __init__(self, digits=10):
+        self.digits = digits
+        self._nodes = {}
+        self._inputs = {}
+        self._values = {}
+        self._stamps = {}
+        self.recomputed = []
+        self.reused = 0
+        self.elapsed = 0.0
+
+    def node(self, func):
+        """
+        装饰器：以函数名注册节点（重复注册时替换函数，保留已有结果）
+        """
+        deps = tuple(inspect.signature(func).parameters)
+        self._nodes[func.__name__] = (func, deps, code_digest(func.__code__))
+        self._stamps.clear()
+        return func
+
+    def begin(self):
+        """
+        开始新一轮交互：清空本轮的重算记录
+        """
+        self.recomputed = []
+        self.reused = 0
+        self.elapsed = 0.0
+
+    def set_inputs(self, **values):
+        for name, value in values.items():
+            self._inputs[name] = (fingerprint(value, self.digits), value)
+        self._stamps.clear()
+
+    def stamp(self, name):
+        if name in self._inputs:
+            return self._inputs[name][0]
+        if name not in self._stamps:
+            if name not in self._nodes:
+                raise KeyError(f"计算图中没有名为 {name} 的节点或输入")
+            _, deps, code = self._nodes[name]
+            payload = repr((name, code, tuple(self.stamp(dep) for dep in deps)))
+            self._stamps[name] = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+        return self._stamps[name]
+
+    def get(self, name):
+        if name in self._inputs:
+            return self._inputs[name][1]
+        stamp = self.stamp(name)
+        cached = self._values.get(name)
+        if cached is not None and cached[0] == stamp:
+            self.reused += 1
+            return cached[1]
+        func, deps, _ = self._nodes[name]
+        kwargs = {dep: self.get(dep) for dep in deps}
+        start = time.perf_counter()
+        value = func(**kwargs)
+        self.elapsed += time.perf_counter() - start
+        self._values[name] = (stamp, value)
+        self.recomputed.append(name)
+        return value
+
+    __getitem__ = get
+
+    def __contains__(self, name):
+        return name in self._inputs or name in self._nodes
+
+    def stats(self):
+        return {
+            "nodes": len(self._nodes),
+            "recomputed": list(self.recomputed),
+            "reused": self.reused,
+            "elapsed": self.elapsed,
+        }
@@ -0,0 +1,162 @@
+import numpy as np
+
+from .montecarlo import simulate_paths
+
+# 网格宽度候选（ATR 倍数），界面批量对比
+ATR_MULTIPLES = (0.5, 1.0, 1.5, 2.0, 3.0)
+
+DEFAULT_GRID_CHUNK = 5_000
+
+# 网格交易逐路径输出列
+GRID_COLUMNS = ("已实现盈亏", "浮动盈亏", "交易成本", "网格总盈亏", "成交量", "期末持仓", "峰值保证金")
+
+
+def estimate_atr(price, sigma, days=1):
+    """
+    按年化波动率估计平均真实波幅：布朗运动 days 天内振幅的期望 sqrt(8t/π)·σ·价格
+    """
+    return price * sigma * np.sqrt(8 * days / 365 / np.pi)
+
+
+def historical_atr(close, window=14):
+    """
+    由收盘价序列估计 ATR（无高低价时以相邻收盘价差近似真实波幅），取最近 window 日均值
+    """
+    true_range = np.abs(np.diff(np.asarray(close, dtype=float)))
+    return float(true_range[-window:].mean()) if len(true_range) else 0.0
+
+
+def grid_trade(prices, center, spacing, n_levels, lot, margin_ratio=0.1,
+               commission_rate=0.0001, slippage=1.0):
+    """
+    事件驱动网格交易：以 center 为中枢、spacing 为间距上下各挂 n_levels 档，
+    价格向上穿越一档卖出 lot 吨、向下穿越一档买入 lot 吨，超出最外档不再加仓
+
+    prices 形状 (路径数, 时点数)，spacing 为标量或一维数组（批量对比不同网格宽度），
+    返回 {列名: (间距数, 路径数)}。Python 循环只在时间维，全部路径与间距一次性计算：
+    当前所在档位 j 满足 floor(x) <= j <= ceil(x)（x 为价格距中枢的档数）时不成交，
+    否则移动到最近的一档，跨越的各档一并成交。
+    路径为离散采样，成交价取发现穿越时点的路径价格（按挂单价成交会系统性高估亏损，
+    因为只有收在档位之外的穿越才会被观察到）；持仓按移动平均成本计已实现与浮动盈亏。
+    """
+    prices = np.asarray(prices, dtype=float)
+    spacing = np.atleast_1d(np.asarray(spacing, dtype=float))[:, None]
+    shape = (len(spacing), prices.shape[0])
+
+    level = np.zeros(shape)
+    position = np.zeros(shape)
+    avg_cost = np.zeros(shape)
+    realized = np.zeros(shape)
+    cost = np.zeros(shape)
+    volume = np.zeros(shape)
+    peak_margin = np.zeros(shape)
+
+    for t in range(prices.shape[1]):
+        price = prices[:, t][None, :]
+        x = (price - center) / spacing
+        new_level = np.clip(np.clip(level, np.floor(x), np.ceil(x)), -n_levels, n_levels)
+        trade = (level - new_level) * lot
+        if trade.any():
+            # 反向成交先平掉原持仓（计已实现盈亏），剩余部分按成交价开新仓
+            closing = np.where(position * trade < 0, np.minimum(np.abs(trade), np.abs(position)), 0.0)
+            realized += closing * (price - avg_cost) * np.sign(position)
+            opening = np.abs(trade) - closing
+            new_position = position + trade
+            held = np.abs(position) - closing
+            avg_cost = np.where(
+                opening > 0,
+                (avg_cost * held + price * opening) / np.maximum(held + opening, 1e-12),
+                avg_cost
+            )
+            volume += np.abs(trade)
+            cost += np.abs(trade) * (price * commission_rate + slippage)
+            position = new_position
+            level = new_level
+        peak_margin = np.maximum(peak_margin, np.abs(position) * price * margin_ratio)
+
+    unrealized = position * (prices[:, -1][None, :] - avg_cost)
+    return dict(zip(GRID_COLUMNS, (
+        realized, unrealized, cost, realized + unrealized - cost, volume, position, peak_margin
+    )))
+
+
+class GridProfitCurve:
+    """
+    网格策略每吨收益随到期价格变化的曲线（模拟路径按到期价格分组求均值），
+    可作为 strategy_pnl 的 grid_profit_per_ton 传入，按价格线性插值
+    """
+
+    def __init__(self, prices, profit_per_ton):
+        self.prices = np.asarray(prices, dtype=float)
+        self.profit_per_ton = np.asarray(profit_per_ton, dtype=float)
+
+    def __call__(self, price):
+        return np.interp(price, self.prices, self.profit_per_ton)
+
+    @classmethod
+    def from_paths(cls, terminal_price, profit_per_ton, bins=50):
+        """
+        按到期价格分位数分组，每组取价格与每吨收益的均值
+        """
+        order = np.argsort(terminal_price)
+        groups = np.array_split(order, min(bins, len(order)))
+        return cls([terminal_price[g].mean() for g in groups], [profit_per_ton[g].mean() for g in groups])
+
+
+def simulate_grid(strategy_params, futures_base, sigma, days, n_paths, atr_multiples=ATR_MULTIPLES,
+                  n_levels=5, model="gbm", seed=None, steps_per_day=4, chunk_size=DEFAULT_GRID_CHUNK,
+                  margin_ratio=0.1, commission_rate=0.0001, slippage=1.0):
+    """
+    蒙特卡洛日内路径上的网格交易，网格以 futures_base 为中枢、间距为 ATR 的若干倍
+
+    网格总仓位为 grid_ratio × warehouse 吨，平均分配到单边 n_levels 档。
+    返回 (到期现货价格 (n_paths,), {列名: (倍数个数, n_paths)})。
+    """
+    atr = estimate_atr(futures_base, sigma)
+    spacings = np.asarray(atr_multiples, dtype=float) * atr
+    grid_tons = strategy_params["grid_ratio"] / 100 * strategy_params["warehouse"]
+    lot = grid_tons / n_levels
+
+    terminal, chunks = [], []
+    for spot, futures in simulate_paths(strategy_params["spot_base"], futures_base, sigma, days, n_paths,
+                                        model, seed, chunk_size, steps_per_day):
+        terminal.append(spot[:, -1])
+        chunks.append(grid_trade(futures, futures_base, spacings, n_levels, lot,
+                                 margin_ratio, commission_rate, slippage))
+    result = {name: np.concatenate([chunk[name] for chunk in chunks], axis=1) for name in GRID_COLUMNS}
+    return np.concatenate(terminal), result
+
+
+def replay_grid(futures, atr_multiples=ATR_MULTIPLES, n_levels=5, grid_tons=0.0, window=14, margin_ratio=0.1,
+                commission_rate=0.0001, slippage=1.0):
+    """
+    历史行情回放网格交易：以前 window 个交易日的收盘价估计 ATR（historical_atr），
+    此后以首个交易日的期货价为中枢按日收盘价逐日撮合，各 ATR 倍数一次计算
+
+    返回 (ATR, {列名: (倍数个数,)})；历史只有一条路径，结果为单条路径的实际损益。
+    """
+    futures = np.asarray(futures, dtype=float)
+    if len(futures) <= window + 1:
+        raise ValueError(f"历史行情不足 {window + 2} 个交易日，无法估计ATR并回放网格")
+    atr = historical_atr(futures[:window + 1], window)
+    traded = futures[window:]
+    result = grid_trade(traded[None, :], traded[0], np.asarray(atr_multiples, dtype=float) * atr, n_levels,
+                        grid_tons / n_levels, margin_ratio, commission_rate, slippage)
+    return atr, {name: values[:, 0] for name, values in result.items()}
+
+
+def grid_summary(result, atr_multiples, grid_tons):
+    """
+    各网格宽度的汇总：每吨收益均值、收益标准差、95% 分位亏损、平均成交量与峰值保证金
+    """
+    total = result["网格总盈亏"]
+    return {
+        "ATR倍数": np.asarray(atr_multiples, dtype=float),
+        "每吨收益均值": total.mean(axis=1) / grid_tons if grid_tons else np.zeros(len(total)),
+        "总盈亏均值": total.mean(axis=1),
+        "总盈亏标准差": total.std(axis=1),
+        "95% VaR": np.quantile(total, 0.05, axis=1),
+        "已实现盈亏均值": result["已实现盈亏"].mean(axis=1),
+        "平均成交量": result["成交量"].mean(axis=1),
+        "平均峰值保证金": result["峰值保证金"].mean(axis=1),
+    }
@@ -0,0 +1,118 @@
+import numpy as np
+
+from .montecarlo import simulate_paths
+from .strategy import dynamic_hedge_ratio
+
+# 路径模拟需保存整条价格路径，分块路径数小于终值模拟
+DEFAULT_PATH_CHUNK = 20_000
+
+# 逐路径输出列
+HEDGE_COLUMNS = ("对冲盈亏", "交易成本", "净对冲盈亏", "静态对冲盈亏", "换手量", "调仓次数", "期末对冲比例")
+
+
+def rebalance_hedge(spot, futures, spot_base, warehouse, hedge_ratio=20, dynamic_hedge=True,
+                    min_hedge=10, max_hedge=80, hedge_threshold=5, rebalance_band=None,
+                    commission_rate=0.0001, slippage=1.0, close_at_end=True):
+    """
+    沿价格路径逐日调仓的期货空头对冲，返回逐路径结果 {列名: (路径数,)}
+
+    spot/futures 形状 (路径数, 时点数)，第0列为建仓时点。全部路径一次性向量化，
+    Python 循环只在时间维：
+    - 建仓按当前价对应的对冲比例开空单
+    - 现货相对上次调仓价的涨跌幅超过 rebalance_band（默认等于 hedge_threshold）时，
+      按动态对冲规则以当时价格重新确定比例并调仓；关闭动态对冲时比例固定不调
+    - 每次成交按成交吨数收取手续费（成交额 × commission_rate）与滑点（元/吨）
+    - close_at_end 时到期平仓并计入平仓成本
+    静态对冲盈亏为现有模型口径：按到期价格对应的比例持有全程，用于对比。
+    """
+    spot = np.asarray(spot, dtype=float)
+    futures = np.asarray(futures, dtype=float)
+    band = hedge_threshold if rebalance_band is None else rebalance_band
+    n_paths, n_times = spot.shape
+
+    def target(price):
+        if dynamic_hedge:
+            return dynamic_hedge_ratio(price, spot_base, min_hedge, max_hedge, hedge_threshold) / 100 * warehouse
+        return np.full(price.shape, hedge_ratio / 100 * warehouse)
+
+    def trade_cost(tons, price):
+        return tons * (price * commission_rate + slippage)
+
+    position = target(spot[:, 0])
+    anchor = spot[:, 0].copy()
+    turnover = position.copy()
+    cost = trade_cost(position, futures[:, 0])
+    pnl = np.zeros(n_paths)
+    rebalances = np.zeros(n_paths, dtype=np.int64)
+
+    for t in range(1, n_times):
+        pnl -= position * (futures[:, t] - futures[:, t - 1])
+        if t == n_times - 1 or not dynamic_hedge:
+            continue
+        trigger = np.abs(spot[:, t] - anchor) / anchor * 100 > band
+        if not trigger.any():
+            continue
+        new_position = np.where(trigger, target(spot[:, t]), position)
+        traded = np.abs(new_position - position)
+        turnover += traded
+        cost += trade_cost(traded, futures[:, t])
+        rebalances += trigger
+        anchor = np.where(trigger, spot[:, t], anchor)
+        position = new_position
+
+    if close_at_end:
+        turnover += position
+        cost += trade_cost(position, futures[:, -1])
+
+    static_ratio = target(spot[:, -1])
+    return dict(zip(HEDGE_COLUMNS, (
+        pnl,
+        cost,
+        pnl - cost,
+        -static_ratio * (futures[:, -1] - futures[:, 0]),
+        turnover,
+        rebalances,
+        position / warehouse * 100 if warehouse else np.zeros(n_paths),
+    )))
+
+
+def simulate_dynamic_hedge(strategy_params, futures_base, sigma, days, n_paths, model="gbm", seed=None,
+                           chunk_size=DEFAULT_PATH_CHUNK, rebalance_band=None,
+                           commission_rate=0.0001, slippage=1.0, close_at_end=True, basis=None):
+    """
+    蒙特卡洛逐日路径上的动态调仓对冲模拟，返回逐路径结果 {列名: (n_paths,)}
+
+    strategy_params 与 strategy_pnl 的参数一致（只用到对冲相关参数）；路径分块及随机流
+    与 monte_carlo_risk 相同，同一 seed 结果可复现。basis 为基差模型参数（见 simulate_paths），
+    给定时期货路径含随机基差。
+    """
+    hedge_params = {key: strategy_params[key] for key in (
+        "spot_base", "warehouse", "hedge_ratio", "dynamic_hedge", "min_hedge", "max_hedge", "hedge_threshold"
+    )}
+    chunks = [
+        rebalance_hedge(spot, futures, rebalance_band=rebalance_band, commission_rate=commission_rate,
+                        slippage=slippage, close_at_end=close_at_end, **hedge_params)
+        for spot, futures in simulate_paths(strategy_params["spot_base"], futures_base, sigma, days,
+                                            n_paths, model, seed, chunk_size, basis=basis)
+    ]
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in HEDGE_COLUMNS}
+
+
+def hedge_summary(result, confidence=0.95):
+    """
+    动态调仓结果汇总：净对冲盈亏的均值、标准差、分位数 VaR 与 CVaR，
+    平均交易成本、换手量与调仓次数，以及与静态口径的均值差
+    """
+    net = result["净对冲盈亏"]
+    var = float(np.quantile(net, 1 - confidence))
+    return {
+        "mean": float(net.mean()),
+        "std": float(net.std()),
+        "var": var,
+        "cvar": float(net[net <= var].mean()),
+        "cost": float(result["交易成本"].mean()),
+        "turnover": float(result["换手量"].mean()),
+        "rebalances": float(result["调仓次数"].mean()),
+        "static_mean": float(result["静态对冲盈亏"].mean()),
+        "n_paths": int(len(net)),
+    }
@@ -0,0 +1,20 @@
+import pandas as pd
+
+# 日度行情文件列名（支持中文表头）
+HISTORY_COLUMNS = {
+    "日期": "date",
+    "现货价格": "spot",
+    "期货价格": "futures",
+}
+
+
+def read_price_history(source):
+    """
+    读取螺纹钢期现日度行情（CSV/Parquet 文件路径或文件对象），按日期排序
+    """
+    name = getattr(source, "name", str(source))
+    history = pd.read_parquet(source) if name.endswith(".parquet") else pd.read_csv(source)
+    history = history.rename(columns=HISTORY_COLUMNS)
+    history["date"] = pd.to_datetime(history["date"])
+    history = history.dropna(subset=["spot", "futures"]).sort_values("date")
+    return history[["date", "spot", "futures"]].reset_index(drop=True)
@@ -0,0 +1,115 @@
+import numpy as np
+
+from .montecarlo import simulate_paths
+from .pricing import black76_price
+
+DEFAULT_MARGIN_CHUNK = 20_000
+
+# 逐路径输出列
+MARGIN_COLUMNS = ("峰值保证金", "峰值占用率", "首次追保日", "最大资金缺口", "期末账户权益")
+
+
+def option_exchange_margin(F, K, value, margin_ratio):
+    """
+    卖出看涨期权每吨保证金（交易所口径）：
+    权利金市值 + max(标的期货保证金 − 虚值额/2, 标的期货保证金/2)
+    """
+    futures_margin = F * margin_ratio
+    out_of_money = np.maximum(K - F, 0)
+    return value + np.maximum(futures_margin - 0.5 * out_of_money, 0.5 * futures_margin)
+
+
+def margin_paths(futures, hedge_tons, option_tons, strike_price, option_premium, days, r, implied_vol,
+                 futures_margin_ratio, option_margin_ratio, cash_reserve):
+    """
+    沿期货价格路径逐日盯市，返回 (逐路径结果 {列名: (路径数,)}, 逐日统计 {名称: (天数+1,)})
+
+    futures 形状 (路径数, 天数+1)。期货空单每日按结算价划转浮动盈亏，卖出看涨期权按
+    Black-76 逐日重估并计入保证金；保证金比例为小数，cash_reserve 为期货账户初始资金（元）。
+    账户权益 = 初始资金 + 收取的权利金 + 期货累计盈亏，保证金需求超过账户权益即触发追保。
+    首次追保日为从建仓起的自然日数，未追保为 -1。
+    """
+    futures = np.asarray(futures, dtype=float)
+    n_paths, n_times = futures.shape
+    remaining = np.maximum(days - np.arange(n_times), 0) / 365
+
+    option_value = black76_price(futures, strike_price, remaining[None, :], r, implied_vol, "c")
+    margin = (hedge_tons * futures * futures_margin_ratio
+              + option_tons * option_exchange_margin(futures, strike_price, option_value, option_margin_ratio))
+    equity = (cash_reserve + option_premium * option_tons
+              - hedge_tons * (futures - futures[:, :1]))
+    shortfall = margin - equity
+    breach = shortfall > 0
+
+    called = breach.any(axis=1)
+    per_path = dict(zip(MARGIN_COLUMNS, (
+        margin.max(axis=1),
+        margin.max(axis=1) / cash_reserve if cash_reserve else np.full(n_paths, np.inf),
+        np.where(called, np.argmax(breach, axis=1), -1),
+        np.maximum(shortfall.max(axis=1), 0),
+        equity[:, -1],
+    )))
+    first_call = np.where(called, np.argmax(breach, axis=1), n_times)
+    per_day = {
+        "保证金合计": margin.sum(axis=0),
+        "保证金最大值": margin.max(axis=0),
+        "首次追保路径数": np.bincount(first_call, minlength=n_times + 1)[:n_times],
+    }
+    return per_path, per_day
+
+
+def simulate_margin(strategy_params, futures_base, sigma, days, n_paths, model="gbm", seed=None,
+                    chunk_size=DEFAULT_MARGIN_CHUNK, implied_vol=0.2, r=0.025,
+                    futures_margin_ratio=0.1, option_margin_ratio=0.15, cash_reserve=1_000_000, basis=None):
+    """
+    蒙特卡洛逐日盯市的保证金与流动性模拟
+
+    对冲仓位取固定 hedge_ratio（与保证金占用卡片口径一致），路径分块及随机流与
+    monte_carlo_risk 相同，basis 给定时期货路径含随机基差（见 simulate_paths）。
+    返回 (逐路径结果, 逐日统计)，逐日统计已跨块合并。
+    """
+    warehouse = strategy_params["warehouse"]
+    hedge_tons = strategy_params["hedge_ratio"] / 100 * warehouse
+    option_tons = strategy_params["option_ratio"] / 100 * warehouse
+
+    per_path, per_day = [], {}
+    for _, futures in simulate_paths(strategy_params["spot_base"], futures_base, sigma, days, n_paths,
+                                     model, seed, chunk_size, basis=basis):
+        chunk_path, chunk_day = margin_paths(
+            futures, hedge_tons, option_tons, strategy_params["strike_price"],
+            strategy_params["option_premium"], days, r, implied_vol,
+            futures_margin_ratio, option_margin_ratio, cash_reserve
+        )
+        per_path.append(chunk_path)
+        for name, values in chunk_day.items():
+            per_day[name] = np.maximum(per_day[name], values) if name == "保证金最大值" and name in per_day \
+                else per_day.get(name, 0) + values
+    result = {name: np.concatenate([chunk[name] for chunk in per_path]) for name in MARGIN_COLUMNS}
+    per_day["平均保证金"] = per_day.pop("保证金合计") / n_paths
+    return result, per_day
+
+
+def margin_summary(result, per_day, cash_reserve):
+    """
+    流动性风险汇总：峰值保证金分位数、追保概率、首次追保时间与资金缺口
+    """
+    peak = result["峰值保证金"]
+    first_call = result["首次追保日"]
+    called = first_call >= 0
+    shortfall = result["最大资金缺口"]
+    n = len(peak)
+    return {
+        "peak_mean": float(peak.mean()),
+        "peak_p95": float(np.quantile(peak, 0.95)),
+        "peak_p99": float(np.quantile(peak, 0.99)),
+        "usage_p99": float(np.quantile(peak, 0.99) / cash_reserve) if cash_reserve else np.inf,
+        "prob_call": float(called.mean()),
+        "first_call_median": float(np.median(first_call[called])) if called.any() else None,
+        "first_call_p05": float(np.quantile(first_call[called], 0.05)) if called.any() else None,
+        "shortfall_p99": float(np.quantile(shortfall, 0.99)),
+        "shortfall_given_call": float(shortfall[called].mean()) if called.any() else 0.0,
+        "call_curve": np.cumsum(per_day["首次追保路径数"]) / n,
+        "mean_margin": per_day["平均保证金"],
+        "max_margin": per_day["保证金最大值"],
+        "n_paths": n,
+    }
@@ -0,0 +1,341 @@
+import numpy as np
+
+from .basis import basis_mean, basis_paths, basis_std, terminal_basis
+from .strategy import strategy_pnl
+from .streaming import StreamingRisk, tail_capacity
+
+# 可选价格模型
+PRICE_MODELS = {
+    "gbm": "几何布朗运动 (GBM)",
+    "normal": "算术布朗运动 (正态)",
+}
+
+DEFAULT_CHUNK_SIZE = 250_000
+DEFAULT_BINS = 4000
+
+
+def chunk_streams(seed, n_paths, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    将路径数按块拆分，每块配一个由 SeedSequence 派生的独立随机种子
+
+    返回 [(块内路径数, SeedSequence), ...]；同一 seed 与 chunk_size 下结果完全可复现，
+    且与分块在哪个进程上计算无关。
+    """
+    n_chunks = max(1, -(-int(n_paths) // int(chunk_size)))
+    children = np.random.SeedSequence(seed).spawn(n_chunks)
+    sizes = [min(chunk_size, n_paths - i * chunk_size) for i in range(n_chunks)]
+    return list(zip(sizes, children))
+
+
+def _shocks(rng, shape, dtype):
+    return rng.standard_normal(shape, dtype=dtype)
+
+
+def price_bounds(spot_base, sigma, days, model="gbm", n_std=8.0):
+    """
+    终值价格的近似支撑区间（均值 ± n_std 个标准差），用于确定直方图范围
+    """
+    scale = sigma * np.sqrt(max(days, 0) / 365)
+    if model == "gbm":
+        drift = -0.5 * sigma ** 2 * max(days, 0) / 365
+        return spot_base * np.exp(drift - n_std * scale), spot_base * np.exp(drift + n_std * scale)
+    return spot_base * (1 - n_std * scale), spot_base * (1 + n_std * scale)
+
+
+def terminal_prices(rng, n, spot_base, sigma, days, model="gbm", dtype=np.float64):
+    """
+    模拟到期现货价格（零漂移），sigma 为年化波动率
+    """
+    return shocked_prices(_shocks(rng, n, np.dtype(dtype).type), spot_base, sigma, days, model)
+
+
+def shocked_prices(z, spot_base, sigma, days, model="gbm"):
+    """
+    由给定的标准正态冲击 z 生成到期价格；spot_base、sigma、days 可为数组（按广播），
+    同一组 z 代入不同参数即得公共随机数下的重估价格
+    """
+    dtype = z.dtype.type
+    years = np.maximum(days, 0) / 365
+    if model == "gbm":
+        return spot_base * np.exp((-0.5 * sigma ** 2 * years).astype(dtype) + (sigma * np.sqrt(years)).astype(dtype) * z)
+    if model == "normal":
+        return spot_base * (1 + (sigma * np.sqrt(years)).astype(dtype) * z)
+    raise ValueError(f"未知价格模型: {model}")
+
+
+def price_paths(rng, n, spot_base, sigma, days, model="gbm", steps_per_day=1, dtype=np.float64):
+    """
+    模拟逐日价格路径，返回形状 (n, days * steps_per_day + 1)，第0列为当前价格
+    """
+    dtype = np.dtype(dtype).type
+    n_steps = max(int(days * steps_per_day), 1)
+    dt = max(days, 0) / 365 / n_steps
+    z = _shocks(rng, (n, n_steps), dtype)
+    paths = np.empty((n, n_steps + 1), dtype=dtype)
+    paths[:, 0] = spot_base
+    if model == "gbm":
+        increments = dtype(-0.5 * sigma ** 2 * dt) + dtype(sigma * np.sqrt(dt)) * z
+        paths[:, 1:] = spot_base * np.exp(np.cumsum(increments, axis=1))
+    elif model == "normal":
+        paths[:, 1:] = spot_base * (1 + dtype(sigma * np.sqrt(dt)) * np.cumsum(z, axis=1))
+    else:
+        raise ValueError(f"未知价格模型: {model}")
+    return paths
+
+
+def simulate_terminal(spot_base, futures_base, sigma, days, n_paths, model="gbm", seed=None,
+                      chunk_size=DEFAULT_CHUNK_SIZE, dtype=np.float64, basis=None):
+    """
+    分块生成到期现货与期货价格，逐块产出 (现货, 期货)
+
+    basis 为 None 时基差保持当前水平；否则为基差模型参数
+    {"expiry_days", "basis_vol", "half_life"}，期货 = 现货 − 随机基差。
+    现货先于基差从同一随机流抽取，现货样本与不带基差时完全相同。
+    """
+    basis_base = spot_base - futures_base
+    for size, stream in chunk_streams(seed, n_paths, chunk_size):
+        rng = np.random.default_rng(stream)
+        spot = terminal_prices(rng, size, spot_base, sigma, days, model, dtype)
+        if basis is None:
+            yield spot, spot - np.dtype(dtype).type(basis_base)
+        else:
+            yield spot, spot - terminal_basis(rng, size, basis_base, days, dtype=dtype, **basis)
+
+
+def simulate_paths(spot_base, futures_base, sigma, days, n_paths, model="gbm", seed=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE, steps_per_day=1, dtype=np.float64, basis=None):
+    """
+    分块生成现货与期货价格路径，逐块产出 (现货路径, 期货路径)
+
+    basis 含义同 simulate_terminal，给定时期货路径 = 现货路径 − 收敛到到期日的随机基差路径。
+    """
+    basis_base = spot_base - futures_base
+    for size, stream in chunk_streams(seed, n_paths, chunk_size):
+        rng = np.random.default_rng(stream)
+        spot = price_paths(rng, size, spot_base, sigma, days, model, steps_per_day, dtype)
+        if basis is None:
+            yield spot, spot - np.dtype(dtype).type(basis_base)
+        else:
+            yield spot, spot - basis_paths(rng, size, basis_base, days, steps_per_day=steps_per_day,
+                                           dtype=dtype, **basis)
+
+
+class PnLHistogram:
+    """
+    固定分箱的盈亏直方图累加器
+
+    每个分箱记录样本数与盈亏合计，超出范围的样本计入首尾分箱；
+    内存只与分箱数有关，可逐块累加、跨进程合并。
+    """
+
+    def __init__(self, low, high, bins=DEFAULT_BINS):
+        pad = max((high - low) * 0.01, 1.0)
+        self.edges = np.linspace(low - pad, high + pad, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.sums = np.zeros(bins)
+        self.n = 0
+        self.n_loss = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def empty_like(self):
+        """
+        相同分箱的空直方图
+        """
+        hist = PnLHistogram.__new__(PnLHistogram)
+        hist.edges = self.edges
+        hist.counts = np.zeros_like(self.counts)
+        hist.sums = np.zeros_like(self.sums)
+        hist.n = hist.n_loss = 0
+        hist.total = hist.total_sq = 0.0
+        hist.min, hist.max = np.inf, -np.inf
+        return hist
+
+    def scalars(self):
+        """
+        标量统计量打包为数组：[样本数, 亏损数, 合计, 平方和, 最小值, 最大值]
+        """
+        return np.array([self.n, self.n_loss, self.total, self.total_sq, self.min, self.max])
+
+    def load(self, counts, sums, scalars):
+        """
+        从数组恢复累加状态（scalars 格式同 scalars()）
+        """
+        self.counts = np.asarray(counts, dtype=np.int64).copy()
+        self.sums = np.asarray(sums, dtype=np.float64).copy()
+        n, n_loss, self.total, self.total_sq, self.min, self.max = (float(v) for v in scalars)
+        self.n, self.n_loss = int(n), int(n_loss)
+        return self
+
+    def update(self, pnl):
+        pnl = np.asarray(pnl, dtype=np.float64).ravel()
+        idx = np.clip(np.searchsorted(self.edges, pnl, side="right") - 1, 0, len(self.counts) - 1)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+        self.sums += np.bincount(idx, weights=pnl, minlength=len(self.counts))
+        self.n += pnl.size
+        self.n_loss += int(np.count_nonzero(pnl < 0))
+        self.total += pnl.sum()
+        self.total_sq += np.dot(pnl, pnl)
+        self.min = min(self.min, pnl.min()) if pnl.size else self.min
+        self.max = max(self.max, pnl.max()) if pnl.size else self.max
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.sums += other.sums
+        self.n += other.n
+        self.n_loss += other.n_loss
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """
+        按累计分布在分箱内线性插值的分位数
+        """
+        cdf = np.cumsum(self.counts) / self.n
+        i = int(np.searchsorted(cdf, q))
+        prev = cdf[i - 1] if i > 0 else 0.0
+        frac = (q - prev) / (cdf[i] - prev) if cdf[i] > prev else 0.0
+        value = self.edges[i] + frac * (self.edges[i + 1] - self.edges[i])
+        return float(np.clip(value, self.min, self.max))
+
+    def tail_mean(self, q):
+        """
+        左尾（最差 q 比例样本）的平均盈亏，即 CVaR
+        """
+        target = q * self.n
+        cum = np.cumsum(self.counts)
+        i = int(np.searchsorted(cum, target))
+        below = cum[i - 1] if i > 0 else 0
+        partial = (target - below) / self.counts[i] * self.sums[i] if self.counts[i] else 0.0
+        return float((self.sums[:i].sum() + partial) / target)
+
+    @property
+    def mean(self):
+        return float(self.total / self.n)
+
+    @property
+    def std(self):
+        return float(np.sqrt(max(self.total_sq / self.n - self.mean ** 2, 0.0)))
+
+    def coarse(self, bins=100):
+        """
+        合并为较少分箱用于绘图，返回 (分箱中点, 样本数)
+        """
+        factor = max(len(self.counts) // bins, 1)
+        usable = len(self.counts) // factor * factor
+        counts = self.counts[:usable].reshape(-1, factor).sum(axis=1)
+        edges = self.edges[:usable + 1:factor]
+        return 0.5 * (edges[:-1] + edges[1:]), counts
+
+
+def pnl_histogram(strategy_params, sigma, days, model="gbm", bins=DEFAULT_BINS):
+    """
+    按价格支撑区间内的盈亏范围创建空直方图
+    """
+    low, high = price_bounds(strategy_params["spot_base"], sigma, days, model)
+    grid = np.linspace(low, high, 4097)
+    pnl = strategy_pnl(grid, **strategy_params)["总利润"]
+    return PnLHistogram(float(pnl.min()), float(pnl.max()), bins)
+
+
+def monte_carlo_risk(strategy_params, sigma, days, n_paths, model="gbm", seed=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE, dtype=np.float64, confidence=0.95,
+                     bins=DEFAULT_BINS):
+    """
+    蒙特卡洛风险评估：模拟到期现货价格并代入策略盈亏模型
+
+    期货对冲按现货价格变动计盈亏（零基差风险口径）；期货腿单独模拟的期现联合口径见 basis_risk。
+
+    逐块累加到流式风险累加器（直方图、t-digest、均值方差、尾部缓冲区），内存只与
+    chunk_size、分箱数和缓冲区容量有关，与路径数无关。
+    返回 VaR/CVaR（以盈亏计，亏损为负）、亏损概率、均值、标准差及各自的标准误、绘图用直方图。
+    """
+    risk = StreamingRisk(pnl_histogram(strategy_params, sigma, days, model, bins),
+                         tail_capacity=tail_capacity(n_paths, confidence))
+    for size, stream in chunk_streams(seed, n_paths, chunk_size):
+        risk.merge(chunk_histogram(risk, size, stream, strategy_params, sigma, days, model, dtype))
+    return risk.summary(confidence)
+
+
+def chunk_histogram(template, size, stream, strategy_params, sigma, days, model="gbm",
+                    dtype=np.float64):
+    """
+    计算单个分块的盈亏累加器（与 template 同类型、同分箱），串行与并行共用
+    """
+    spot = terminal_prices(np.random.default_rng(stream), size, strategy_params["spot_base"],
+                           sigma, days, model, dtype)
+    return template.empty_like().update(strategy_pnl(spot, **strategy_params)["总利润"])
+
+
+def summarize_histogram(hist, confidence=0.95):
+    """
+    从累加完成的直方图汇总风险指标
+    """
+    alpha = 1 - confidence
+    centers, counts = hist.coarse()
+    return {
+        "var": hist.quantile(alpha),
+        "cvar": hist.tail_mean(alpha),
+        "prob_loss": hist.n_loss / hist.n,
+        "mean": hist.mean,
+        "std": hist.std,
+        "min": float(hist.min),
+        "max": float(hist.max),
+        "n_paths": hist.n,
+        "bin_width": float(hist.edges[1] - hist.edges[0]),
+        "hist_centers": centers,
+        "hist_counts": counts,
+    }
+
+
+def basis_risk(strategy_params, futures_base, sigma, days, n_paths, model="gbm", seed=None,
+               chunk_size=DEFAULT_CHUNK_SIZE, dtype=np.float64, confidence=0.95, bins=DEFAULT_BINS,
+               expiry_days=None, basis_vol=400.0, half_life=20.0):
+    """
+    期现联合模拟的基差风险评估：期货对冲按期货价格变动计盈亏
+
+    现货到期价格与 monte_carlo_risk 使用相同随机流（样本一致），基差服从收敛到合约
+    到期日（expiry_days，默认与 days 相同）的均值回复 OU 桥。同一批样本分三种口径累加：
+    - 零基差风险：对冲按现货变动计盈亏（现有口径）
+    - 基差收敛：基差按期望路径确定性收敛
+    - 期现联合：基差随机
+    返回各口径的风险汇总及 VaR 差额：收敛贡献 = 收敛 − 零基差，随机基差贡献 = 联合 − 收敛。
+    """
+    expiry_days = days if expiry_days is None else expiry_days
+    spot_base = strategy_params["spot_base"]
+    basis_base = spot_base - futures_base
+    expected = float(basis_mean(basis_base, days, expiry_days))
+    spread = float(basis_std(days, expiry_days, basis_vol, half_life))
+    shifts = {"spot_only": 0.0, "convergence": expected - basis_base}
+
+    # 分箱范围覆盖基差 ±8 个标准差
+    low, high = price_bounds(spot_base, sigma, days, model)
+    grid = np.linspace(low, high, 4097)[:, None]
+    changes = expected - basis_base + spread * np.array([-8.0, 0.0, 8.0])
+    pnl = np.concatenate([strategy_pnl(grid, basis_change=changes, **strategy_params)["总利润"].ravel(),
+                          strategy_pnl(grid, **strategy_params)["总利润"].ravel()])
+    template = StreamingRisk(PnLHistogram(float(pnl.min()), float(pnl.max()), bins),
+                             tail_capacity=tail_capacity(n_paths, confidence))
+    hists = {name: template.empty_like() for name in ("spot_only", "convergence", "joint")}
+
+    for spot, futures in simulate_terminal(spot_base, futures_base, sigma, days, n_paths, model, seed,
+                                           chunk_size, dtype, dict(expiry_days=expiry_days, basis_vol=basis_vol,
+                                                                   half_life=half_life)):
+        for name, change in (*shifts.items(), ("joint", (spot - futures) - basis_base)):
+            hists[name].update(strategy_pnl(spot, basis_change=change, **strategy_params)["总利润"])
+
+    result = {name: hist.summary(confidence) for name, hist in hists.items()}
+    result.update(
+        expected_basis=expected,
+        basis_std=spread,
+        convergence_var=result["convergence"]["var"] - result["spot_only"]["var"],
+        stochastic_var=result["joint"]["var"] - result["convergence"]["var"],
+        basis_var=result["joint"]["var"] - result["spot_only"]["var"],
+    )
+    return result
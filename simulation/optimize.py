@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+from .scenario import calculate_annualized_return, margin_requirement
+from .strategy import strategy_pnl
+from .sweep import DEFAULT_MAX_CELLS, SWEEP_PARAMS, surface_metrics, sweep_chunks
+
+# 优化变量的默认搜索范围 (下限, 上限, 步长)。执行价可用 strike_price 直接给出价格范围，
+# 或用 strike_ratio 按当前现货价的比例给出（步长仍为元/吨），两者只能取其一
+OPT_BOUNDS = {
+    "hedge_ratio": (0, 50, 1),
+    "grid_ratio": (0, 30, 1),
+    "option_ratio": (0, 30, 1),
+    "strike_ratio": (0.9, 1.2, 50),
+    "option_premium": (0, 300, 1),
+}
+
+# 约束上限（占总资金比例）
+OPT_LIMITS = {"drawdown": 0.08, "var": 0.05, "margin": 0.5}
+
+# 优化目标
+OPT_OBJECTIVES = {"annualized": "年化收益率", "excess": "超额收益率"}
+
+
+def resolve_bounds(bounds, spot_base):
+    """
+    执行价的比例范围（strike_ratio）换算为价格范围（strike_price），返回 {参数: (下限, 上限, 步长)}
+    """
+    if "strike_ratio" in bounds and "strike_price" in bounds:
+        raise ValueError("执行价范围只能按 strike_price（价格）或 strike_ratio（现货价比例）之一给出")
+    resolved = {}
+    for name, (lo, hi, step) in bounds.items():
+        if name == "strike_ratio":
+            name, lo, hi = ("strike_price", np.floor(spot_base * lo / step) * step,
+                            np.ceil(spot_base * hi / step) * step)
+        resolved[name] = (lo, hi, step)
+    return resolved
+
+
+def _decode(unit, bounds):
+    """
+    [0, 1] 超立方体中的点映射为参数取值，并按步长取整
+    """
+    params = {}
+    for j, (name, (lo, hi, step)) in enumerate(bounds.items()):
+        values = lo + np.clip(unit[:, j], 0, 1) * (hi - lo)
+        params[name] = np.clip(np.round((values - lo) / step) * step + lo, lo, hi)
+    return params
+
+
+def _encode(params, bounds):
+    return np.column_stack([
+        (np.asarray(params[name], dtype=float) - lo) / (hi - lo) if hi > lo else np.zeros(np.size(params[name]))
+        for name, (lo, hi, _) in bounds.items()
+    ])
+
+
+def evaluate_candidates(prices, base_params, candidates, capital, risk_free_rate, days_to_expiry,
+                        futures_base, futures_margin_ratio, option_margin_ratio,
+                        limits=OPT_LIMITS, premium_fn=None, max_cells=DEFAULT_MAX_CELLS):
+    """
+    批量评估候选配置，返回 {指标: (候选数,)}
+
+    candidates 为 {参数名: 一维数组}；capital 以万元计，risk_free_rate 与保证金比例以百分数计。
+    先按解析式计算保证金并剔除超限候选（不再计算盈亏），其余候选分块广播计算价格网格上的
+    总利润，回撤、VaR 口径与风险分析页一致（VaR 取 5% 分位亏损）。
+    premium_fn 给定时权利金由执行价定价得到（如 Black-76），不作为独立变量。
+    """
+    prices = np.asarray(prices, dtype=float)
+    n = len(next(iter(candidates.values())))
+    params = {name: np.broadcast_to(np.asarray(base_params[name], dtype=float), (n,)).copy()
+              for name in ("hedge_ratio", "grid_ratio", "option_ratio", "strike_price", "option_premium")}
+    params.update({name: np.asarray(values, dtype=float) for name, values in candidates.items()})
+    if premium_fn is not None:
+        params["option_premium"] = np.asarray(premium_fn(params["strike_price"]), dtype=float)
+
+    capital_yuan = capital * 10000
+    _, _, margin = margin_requirement(futures_base, params["strike_price"], base_params["warehouse"],
+                                      params["hedge_ratio"], params["option_ratio"],
+                                      futures_margin_ratio, option_margin_ratio)
+    margin_pct = margin / capital_yuan
+
+    max_profit = np.full(n, np.nan)
+    drawdown_pct = np.full(n, np.nan)
+    var_pct = np.full(n, np.nan)
+    live = np.flatnonzero(margin_pct < limits["margin"])
+    for start, stop in sweep_chunks(len(live), len(prices), max_cells):
+        rows = live[start:stop]
+        chunk = dict(base_params)
+        chunk.update({name: values[rows][:, None] for name, values in params.items()})
+        totals = np.broadcast_to(strategy_pnl(prices[None, :], **chunk)["总利润"], (len(rows), len(prices)))
+        metrics = surface_metrics(prices, totals)
+        max_profit[rows] = metrics["最大利润"]
+        drawdown_pct[rows] = metrics["最大回撤"] / capital_yuan
+        var_pct[rows] = np.maximum(-metrics["95% VaR"], 0) / capital_yuan
+
+    annualized, excess = calculate_annualized_return(np.nan_to_num(max_profit, nan=-capital_yuan),
+                                                     capital, risk_free_rate, days_to_expiry)
+    violation = (np.maximum(margin_pct - limits["margin"], 0)
+                 + np.maximum(np.nan_to_num(drawdown_pct, nan=1.0) - limits["drawdown"], 0)
+                 + np.maximum(np.nan_to_num(var_pct, nan=1.0) - limits["var"], 0))
+    return {
+        **params,
+        "annualized": np.asarray(annualized),
+        "excess": np.asarray(excess),
+        "drawdown": drawdown_pct,
+        "var": var_pct,
+        "margin": margin_pct,
+        "violation": violation,
+        "feasible": violation == 0,
+    }
+
+
+def _evaluate_task(args):
+    return evaluate_candidates(*args[:-1], **args[-1])
+
+
+def optimize_allocation(prices, base_params, capital, risk_free_rate, days_to_expiry, futures_base,
+                        futures_margin_ratio, option_margin_ratio, objective="excess", bounds=OPT_BOUNDS,
+                        limits=OPT_LIMITS, premium_fn=None, population=2000, generations=10,
+                        elite_frac=0.1, seed=0, workers=1, start_method=None):
+    """
+    约束下的仓位与期权参数优化（交叉熵进化搜索）
+
+    每代在 [0, 1] 参数空间采样一批候选，整批向量化评估；可行候选按目标排序，
+    不可行候选按约束违反量排在其后（保证金超限的候选在计算盈亏前即被剔除）。
+    下一代从精英候选的均值与标准差采样，另保留少量均匀采样用于探索，
+    搜索分布逐代收缩到可行且收益较高的区域。workers > 1 时每代按块分配到进程池。
+    返回 (最优配置 dict 或 None, 全部已评估可行候选按目标降序（同目标按保证金升序）的 DataFrame)。
+    """
+    bounds = resolve_bounds(bounds, base_params["spot_base"])
+    if premium_fn is not None:
+        bounds.pop("option_premium", None)
+    rng = np.random.default_rng(seed)
+    dims = len(bounds)
+    n_elite = max(2, int(population * elite_frac))
+    extra = dict(limits=limits, premium_fn=premium_fn)
+    fixed = (prices, base_params)
+    context = (capital, risk_free_rate, days_to_expiry, futures_base, futures_margin_ratio, option_margin_ratio)
+
+    pool = None
+    if workers > 1:
+        from .parallel import _executor
+        pool = _executor(workers, start_method)
+
+    def evaluate(unit):
+        candidates = _decode(unit, bounds)
+        if pool is None:
+            return evaluate_candidates(*fixed, candidates, *context, **extra)
+        parts = np.array_split(np.arange(len(unit)), workers)
+        results = list(pool.map(_evaluate_task, [
+            (*fixed, {k: v[idx] for k, v in candidates.items()}, *context, extra) for idx in parts
+        ]))
+        return {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+
+    # 首代包含当前配置，保证结果不劣于现状（若其可行）
+    current = {name: np.atleast_1d(float(base_params[name])) for name in bounds}
+    unit = np.vstack([np.clip(_encode(current, bounds), 0, 1), rng.random((population - 1, dims))])
+
+    evaluated = []
+    try:
+        for _ in range(generations):
+            result = evaluate(unit)
+            evaluated.append(result)
+            score = np.where(result["feasible"], result[objective], -1e6 - result["violation"])
+            elite = unit[np.argsort(score)[::-1][:n_elite]]
+            mean, std = elite.mean(axis=0), np.maximum(elite.std(axis=0), 0.01)
+            n_explore = population // 10
+            unit = np.vstack([
+                np.clip(rng.normal(mean, std, (population - n_explore, dims)), 0, 1),
+                rng.random((n_explore, dims)),
+            ])
+            if std.max() <= 0.01:
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # 结果列取实际搜索的变量；权利金由执行价定价时也一并列出
+    names = list(bounds) + (["option_premium"] if premium_fn is not None else [])
+    columns = names + ["annualized", "excess", "drawdown", "var", "margin", "feasible"]
+    table = pd.DataFrame({key: np.concatenate([r[key] for r in evaluated]) for key in columns})
+    table = table[table["feasible"]].drop(columns="feasible")
+    # 目标相同时优先保证金占用低的配置
+    table = table.drop_duplicates(subset=names).sort_values([objective, "margin"],
+                                                                        ascending=[False, True])
+    table = table.reset_index(drop=True)
+    best = table.iloc[0].to_dict() if len(table) else None
+    return best, table.rename(columns={**SWEEP_PARAMS, **OPT_OBJECTIVES, "drawdown": "最大回撤率",
+                                       "var": "VaR占比", "margin": "保证金占比"})
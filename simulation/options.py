@@ -0,0 +1,260 @@
+import numpy as np
+
+from .pricing import black76_greeks, black76_price
+
+# 期权组合逐腿列（界面编辑表与Excel导出使用的列名）
+BOOK_COLUMNS = {
+    "strike": "执行价",
+    "flag": "类型",
+    "side": "方向",
+    "quantity": "数量(吨)",
+    "expiry": "到期天数",
+    "premium": "权利金",
+}
+
+# 常用组合模板
+BOOK_PRESETS = {
+    "short_call": "卖出看涨",
+    "collar": "领口（卖看涨 + 买看跌）",
+    "call_spread": "看涨价差（卖低执行价 + 买高执行价）",
+    "ladder": "阶梯卖出看涨",
+}
+
+# 单次矩阵运算的单元数上限（腿数 × 价格点数），超过时按价格分块
+DEFAULT_MAX_CELLS = 4_000_000
+
+_FLAGS = {"c": True, "call": True, "看涨": True, "p": False, "put": False, "看跌": False}
+_SIDES = {"买入": 1.0, "买": 1.0, "long": 1.0, "1": 1.0, "+1": 1.0,
+          "卖出": -1.0, "卖": -1.0, "short": -1.0, "-1": -1.0}
+
+
+def _parse(values, mapping, name):
+    """
+    逐个解析文本或数值取值：文本按 mapping 识别，数值须为 mapping 中的取值之一，否则报错
+    """
+    allowed = set(mapping.values())
+    parsed = []
+    for value in values:
+        if isinstance(value, str):
+            key = value.strip().lower()
+            if key not in mapping:
+                raise ValueError(f"无法识别的{name}: {value}")
+            parsed.append(mapping[key])
+        elif value in allowed:
+            parsed.append(value)
+        else:
+            raise ValueError(f"无法识别的{name}: {value}")
+    return parsed
+
+
+class OptionBook:
+    """
+    多腿期权组合（期货期权，按列存储）
+
+    每条腿为一组 (执行价, 看涨/看跌, 方向, 吨数, 到期天数, 每吨权利金)，方向买入为 +1、卖出为 −1。
+    组合盈亏按 (腿数 × 价格) 矩阵计算后以持仓权重做矩阵乘法汇总，没有逐腿循环。
+    horizon 为估值时点（距今天数）：到期日不晚于该时点的腿按内在价值结算，其余腿
+    按 Black-76 以剩余期限、r 与 sigma 重估。实例可作为 strategy_pnl 的 option_book 传入。
+    """
+
+    def __init__(self, strike, is_call, side, quantity, expiry, premium, horizon=None, r=0.0, sigma=0.2):
+        strike, is_call, side, quantity, expiry, premium = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(strike, dtype=float)), np.atleast_1d(np.asarray(is_call, dtype=bool)),
+            np.atleast_1d(np.asarray(side, dtype=float)), np.atleast_1d(np.asarray(quantity, dtype=float)),
+            np.atleast_1d(np.asarray(expiry, dtype=float)), np.atleast_1d(np.asarray(premium, dtype=float))
+        )
+        self.strike = strike.copy()
+        self.is_call = is_call.copy()
+        if np.any((side != 1) & (side != -1)):
+            raise ValueError("买卖方向只能为 +1（买入）或 −1（卖出）")
+        self.side = side.copy()
+        self.quantity = np.abs(quantity)
+        self.expiry = expiry.copy()
+        self.premium = premium.copy()
+        self.horizon = horizon
+        self.r = r
+        self.sigma = sigma
+
+    def __len__(self):
+        return len(self.strike)
+
+    @property
+    def weights(self):
+        """
+        各腿持仓权重（带方向的吨数）
+        """
+        return self.side * self.quantity
+
+    @property
+    def flags(self):
+        return np.where(self.is_call, "c", "p")
+
+    @property
+    def net_premium(self):
+        """
+        建仓权利金净收入（卖出收取为正，买入支付为负）
+        """
+        return float(-self.weights @ self.premium)
+
+    @classmethod
+    def single(cls, strike, premium, tons, expiry, flag="c", side=-1, **kwargs):
+        """
+        单腿组合（默认卖出看涨，即原有卖权策略）
+        """
+        return cls(strike, flag == "c", side, tons, expiry, premium, **kwargs)
+
+    @classmethod
+    def from_frame(cls, frame, **kwargs):
+        """
+        由逐腿表（列名见 BOOK_COLUMNS）构造，类型可写 C/P、看涨/看跌，方向可写 买入/卖出 或 ±1
+        """
+        frame = frame.dropna(how="any")
+        return cls(
+            frame[BOOK_COLUMNS["strike"]].to_numpy(dtype=float),
+            _parse(frame[BOOK_COLUMNS["flag"]], _FLAGS, "期权类型"),
+            _parse(frame[BOOK_COLUMNS["side"]], _SIDES, "买卖方向"),
+            frame[BOOK_COLUMNS["quantity"]].to_numpy(dtype=float),
+            frame[BOOK_COLUMNS["expiry"]].to_numpy(dtype=float),
+            frame[BOOK_COLUMNS["premium"]].to_numpy(dtype=float),
+            **kwargs
+        )
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame({
+            BOOK_COLUMNS["strike"]: self.strike,
+            BOOK_COLUMNS["flag"]: np.where(self.is_call, "C", "P"),
+            BOOK_COLUMNS["side"]: np.where(self.side > 0, "买入", "卖出"),
+            BOOK_COLUMNS["quantity"]: self.quantity,
+            BOOK_COLUMNS["expiry"]: self.expiry,
+            BOOK_COLUMNS["premium"]: self.premium,
+        })
+
+    def with_mark(self, horizon=None, r=0.0, sigma=0.2):
+        """
+        相同持仓、指定估值时点与定价参数的组合
+        """
+        return OptionBook(self.strike, self.is_call, self.side, self.quantity, self.expiry, self.premium,
+                          horizon, r, sigma)
+
+    def priced(self, F, r, sigma):
+        """
+        按 Black-76 理论价（建仓时点）重设各腿权利金
+        """
+        premium = black76_price(F, self.strike, self.expiry / 365, r, sigma, self.flags)
+        return OptionBook(self.strike, self.is_call, self.side, self.quantity, self.expiry, premium,
+                          self.horizon, self.r, self.sigma)
+
+    def payoff_matrix(self, prices):
+        """
+        各腿每吨到期内在价值，形状 (腿数, 价格点数)
+        """
+        phi = np.where(self.is_call, 1.0, -1.0)[:, None]
+        return np.maximum(phi * (np.asarray(prices, dtype=float).ravel()[None, :] - self.strike[:, None]), 0)
+
+    def _chunks(self, n, max_cells):
+        step = max(int(max_cells // max(len(self), 1)), 1)
+        return [slice(start, min(start + step, n)) for start in range(0, n, step)]
+
+    def expiry_pnl(self, prices, max_cells=DEFAULT_MAX_CELLS):
+        """
+        全部腿按到期内在价值结算的组合盈亏，与 prices 同形状
+        """
+        prices = np.asarray(prices, dtype=float)
+        flat = prices.ravel()
+        weights = self.weights
+        pnl = np.empty(flat.shape)
+        for part in self._chunks(len(flat), max_cells):
+            pnl[part] = weights @ self.payoff_matrix(flat[part])
+        return (pnl - weights @ self.premium).reshape(prices.shape)
+
+    def value(self, F, elapsed_days, r, sigma, max_cells=DEFAULT_MAX_CELLS):
+        """
+        组合盯市价值（多头为正），F、elapsed_days、sigma 可为同形状数组（如压力情景逐个给定）
+        """
+        F, elapsed, sigma = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (F, elapsed_days, sigma)))
+        shape = F.shape
+        F, elapsed, sigma = F.ravel(), elapsed.ravel(), sigma.ravel()
+        weights, flags = self.weights, self.flags[:, None]
+        value = np.empty(F.shape)
+        for part in self._chunks(len(F), max_cells):
+            remaining = np.maximum(self.expiry[:, None] - elapsed[None, part], 0) / 365
+            value[part] = weights @ black76_price(F[None, part], self.strike[:, None], remaining, r,
+                                                  sigma[None, part], flags)
+        return value.reshape(shape)
+
+    def pnl(self, F, elapsed_days, r, sigma, max_cells=DEFAULT_MAX_CELLS):
+        """
+        估值时点的组合盈亏 = 盯市价值 − 建仓成本（卖出腿收取的权利金计为负成本）
+        """
+        return self.value(F, elapsed_days, r, sigma, max_cells) - self.weights @ self.premium
+
+    def position(self, F, elapsed_days, r, sigma, max_cells=DEFAULT_MAX_CELLS):
+        """
+        组合市值与希腊字母（按持仓权重汇总，口径同 short_call_position），与 F 同形状
+        """
+        F = np.asarray(F, dtype=float)
+        flat = F.ravel()
+        weights, flags = self.weights, self.flags[:, None]
+        remaining = np.maximum(self.expiry - elapsed_days, 0)[:, None] / 365
+        result = {name: np.empty(flat.shape) for name in ("value", "delta", "gamma", "vega", "theta")}
+        for part in self._chunks(len(flat), max_cells):
+            greeks = black76_greeks(flat[None, part], self.strike[:, None], remaining, r, sigma, flags)
+            greeks["value"] = black76_price(flat[None, part], self.strike[:, None], remaining, r, sigma, flags)
+            for name, matrix in greeks.items():
+                result[name][part] = weights @ matrix
+        return {name: values.reshape(F.shape) for name, values in result.items()}
+
+    def __call__(self, price):
+        """
+        horizon 时点的组合盈亏：已到期腿按内在价值（矩阵乘法），未到期腿按 Black-76 重估
+        """
+        if self.horizon is None:
+            return self.expiry_pnl(price)
+        expired = self.expiry <= self.horizon
+        if expired.all():
+            return self.expiry_pnl(price)
+        live = self._subset(~expired)
+        pnl = live.pnl(price, self.horizon, self.r, self.sigma)
+        if expired.any():
+            pnl = pnl + self._subset(expired).expiry_pnl(price)
+        return pnl
+
+    def _subset(self, mask):
+        return OptionBook(self.strike[mask], self.is_call[mask], self.side[mask], self.quantity[mask],
+                          self.expiry[mask], self.premium[mask], self.horizon, self.r, self.sigma)
+
+    def margin_requirement(self, margin_ratio):
+        """
+        期权保证金（元）：卖出腿按 执行价 × 吨数 × 保证金比例（%），与 margin_requirement 口径一致
+        """
+        short = self.side < 0
+        return float(np.sum(self.strike[short] * self.quantity[short]) * margin_ratio / 100)
+
+    def kinks(self):
+        """
+        到期盈亏的拐点（全部执行价）
+        """
+        return np.unique(self.strike)
+
+
+def book_preset(name, futures_base, strike_price, tons, expiry, r=0.0, sigma=0.2, step=50):
+    """
+    按模板生成组合，各腿权利金取 Black-76 理论价
+
+    strike_price 为卖出看涨腿的执行价；领口的买入看跌执行价与之关于期货价对称，
+    价差的买入腿高一档（4 × step），阶梯为三档执行价各分 1/3 吨数。
+    """
+    if name == "short_call":
+        legs = [(strike_price, True, -1, tons)]
+    elif name == "collar":
+        put_strike = max(np.floor((2 * futures_base - strike_price) / step) * step, step)
+        legs = [(strike_price, True, -1, tons), (put_strike, False, 1, tons)]
+    elif name == "call_spread":
+        legs = [(strike_price, True, -1, tons), (strike_price + 4 * step, True, 1, tons)]
+    elif name == "ladder":
+        legs = [(strike_price + i * 2 * step, True, -1, tons / 3) for i in range(3)]
+    else:
+        raise ValueError(f"未知组合模板: {name}")
+    strike, is_call, side, quantity = (np.asarray(column) for column in zip(*legs))
+    return OptionBook(strike, is_call, side, quantity, expiry, 0.0).priced(futures_base, r, sigma)
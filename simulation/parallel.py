@@ -0,0 +1,144 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .montecarlo import DEFAULT_BINS, DEFAULT_CHUNK_SIZE, chunk_histogram, chunk_streams, pnl_histogram
+from .streaming import StreamingRisk, tail_capacity
+from .sweep import (
+    DEFAULT_MAX_CELLS, SWEEP_METRICS, combination_count, sweep_chunk, sweep_chunks, sweep_summary
+)
+
+
+def default_workers():
+    """
+    默认进程数：可用CPU核数
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class SharedArray:
+    """
+    基于共享内存的NumPy数组，子进程按名称挂载后直接写入，结果无需序列化回传
+    """
+
+    def __init__(self, shape, dtype=np.float64):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+        self.array.fill(0)
+
+    @property
+    def spec(self):
+        """
+        传给子进程的挂载信息 (名称, 形状, 类型)
+        """
+        return self.shm.name, self.shape, self.dtype.str
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        del self.array
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _attach(spec):
+    """
+    子进程挂载共享数组，返回 (SharedMemory, ndarray)
+    """
+    name, shape, dtype = spec
+    # 进程池子进程与父进程共用 resource_tracker，共享内存由父进程统一释放
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _executor(workers, start_method=None):
+    context = multiprocessing.get_context(start_method) if start_method else None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def _monte_carlo_task(size, stream, template, strategy_params, sigma, days, model, dtype):
+    return chunk_histogram(template, size, stream, strategy_params, sigma, days, model, dtype)
+
+
+def parallel_monte_carlo_risk(strategy_params, sigma, days, n_paths, model="gbm",
+                              seed=None, chunk_size=DEFAULT_CHUNK_SIZE, dtype=np.float64,
+                              confidence=0.95, bins=DEFAULT_BINS, workers=None, start_method=None):
+    """
+    多进程蒙特卡洛风险评估，结果与 monte_carlo_risk 逐位一致
+
+    路径分块及随机流与串行版相同（SeedSequence 派生）。各块的流式风险累加器大小有界
+    （直方图、t-digest 质心与尾部缓冲区），由子进程直接返回，全部完成后按块序号依次合并，
+    与进程调度顺序无关。尾部缓冲区容量由父进程按 tail_capacity(n_paths, confidence) 定好并随模板
+    传入，各块回传的尾部样本不超过全部路径最差 (1−置信度) 比例的样本数。
+    """
+    workers = workers or default_workers()
+    risk = StreamingRisk(pnl_histogram(strategy_params, sigma, days, model, bins),
+                         tail_capacity=tail_capacity(n_paths, confidence))
+    with _executor(workers, start_method) as pool:
+        futures = [
+            pool.submit(_monte_carlo_task, size, stream, risk, strategy_params, sigma, days, model, dtype)
+            for size, stream in chunk_streams(seed, n_paths, chunk_size)
+        ]
+        for future in futures:
+            risk.merge(future.result())
+    return risk.summary(confidence)
+
+
+def _sweep_task(prices, base_params, ranges, start, stop, metrics_spec, surface_spec):
+    chunk_metrics, totals = sweep_chunk(prices, base_params, ranges, start, stop)
+    shm, metrics = _attach(metrics_spec)
+    for i, key in enumerate(SWEEP_METRICS):
+        metrics[i, start:stop] = chunk_metrics[key]
+    del metrics
+    shm.close()
+    if surface_spec is not None:
+        shm, surface = _attach(surface_spec)
+        surface[start:stop] = totals
+        del surface
+        shm.close()
+    return start
+
+
+def parallel_sweep(prices, base_params, ranges, max_cells=DEFAULT_MAX_CELLS, keep_surface=False,
+                   workers=None, start_method=None):
+    """
+    多进程参数扫描，结果与 sweep_strategy 一致
+
+    各进程按组合区间计算并直接写入共享的指标矩阵（及可选的曲面矩阵）。
+    """
+    workers = workers or default_workers()
+    prices = np.asarray(prices, dtype=float)
+    n_combos = combination_count(ranges)
+
+    with SharedArray((len(SWEEP_METRICS), n_combos)) as metrics:
+        surface_buffer = SharedArray((n_combos, len(prices))) if keep_surface else None
+        try:
+            surface_spec = surface_buffer.spec if surface_buffer else None
+            with _executor(workers, start_method) as pool:
+                futures = [
+                    pool.submit(_sweep_task, prices, base_params, ranges, start, stop,
+                                metrics.spec, surface_spec)
+                    for start, stop in sweep_chunks(n_combos, len(prices), max_cells)
+                ]
+                for future in futures:
+                    future.result()
+            summary = sweep_summary(ranges, {key: metrics.array[i].copy()
+                                             for i, key in enumerate(SWEEP_METRICS)})
+            surface = surface_buffer.array.copy() if surface_buffer else None
+        finally:
+            if surface_buffer:
+                surface_buffer.close()
+
+    return summary, surface
@@ -0,0 +1,223 @@
+import numpy as np
+
+from .montecarlo import DEFAULT_BINS, PnLHistogram, chunk_streams
+from .streaming import StreamingRisk, tail_capacity
+
+# 多品种持仓表的列（界面编辑表列名）；对冲品种为空或与本品种相同即自身期货对冲
+ASSET_COLUMNS = {
+    "code": "品种",
+    "spot": "现货价格",
+    "futures": "期货价格",
+    "vol": "年化波动率(%)",
+    "inventory": "库存(吨)",
+    "hedge_asset": "对冲品种",
+    "hedge_ratio": "对冲比例(%)",
+    "grid_ratio": "网格比例(%)",
+    "grid_profit": "网格每吨收益",
+    "option_ratio": "卖权比例(%)",
+    "strike": "执行价",
+    "premium": "权利金",
+}
+
+# 默认持仓：螺纹钢、热卷、铁矿石、焦炭（价格与波动率为近年大致水平）
+DEFAULT_ASSETS = [
+    ("RB", 3700, 3500, 20, 5000, "RB", 20, 10, 20, 10, 3600, 20),
+    ("HC", 3800, 3650, 20, 3000, "HC", 30, 0, 0, 10, 3900, 40),
+    ("I", 800, 780, 30, 20000, "I", 40, 0, 0, 0, 850, 0),
+    ("J", 2000, 1900, 30, 3000, "RB", 30, 0, 0, 0, 2100, 0),
+]
+
+# 默认相关系数矩阵（黑色系品种日收益率相关性的近似值）
+DEFAULT_CORRELATION = [
+    [1.00, 0.90, 0.70, 0.65],
+    [0.90, 1.00, 0.65, 0.60],
+    [0.70, 0.65, 1.00, 0.70],
+    [0.65, 0.60, 0.70, 1.00],
+]
+
+# 分块路径数：每块的 (路径数 × 品种数) 矩阵控制在约千万个元素以内
+DEFAULT_PORTFOLIO_CHUNK = 200_000
+
+
+def nearest_correlation(corr, floor=1e-8):
+    """
+    对称化并裁剪负特征值，得到最接近的正定相关系数矩阵（对角线归一）
+    """
+    corr = np.asarray(corr, dtype=float)
+    corr = 0.5 * (corr + corr.T)
+    values, vectors = np.linalg.eigh(corr)
+    fixed = vectors @ np.diag(np.maximum(values, floor)) @ vectors.T
+    scale = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(scale, scale)
+
+
+class CorrelatedAssets:
+    """
+    相关多品种价格模型（零漂移 GBM）
+
+    构造时对协方差矩阵做一次 Cholesky 分解并保存下三角因子，模拟时每块路径只需一次
+    (路径数 × 品种数) @ 因子转置 的批量矩阵乘法；相关系数矩阵非正定时先修正为最近的正定矩阵。
+    """
+
+    def __init__(self, corr, vols):
+        self.vols = np.asarray(vols, dtype=float)
+        self.corr = nearest_correlation(corr)
+        self.factor = np.linalg.cholesky(self.corr * np.outer(self.vols, self.vols))
+
+    def terminal(self, rng, n, spots, days, dtype=np.float64):
+        """
+        模拟 days 天后的各品种现货价格，形状 (n, 品种数)
+        """
+        dtype = np.dtype(dtype).type
+        years = max(days, 0) / 365
+        z = rng.standard_normal((n, len(self.vols)), dtype=dtype)
+        shocks = z @ self.factor.T.astype(dtype) * dtype(np.sqrt(years))
+        drift = (-0.5 * self.vols ** 2 * years).astype(dtype)
+        return np.asarray(spots, dtype=dtype) * np.exp(shocks + drift)
+
+
+class AssetBook:
+    """
+    多品种持仓的列式参数：库存、对冲矩阵、网格与卖权腿
+
+    hedge 为 (库存品种 × 对冲品种) 的对冲吨数矩阵，跨品种对冲按货值折算：
+    对冲吨数 = 对冲比例 × 库存 × 现货价格 / 对冲品种期货价格。比例与波动率以百分数传入。
+    """
+
+    def __init__(self, codes, spot, futures, vol, inventory, hedge_asset, hedge_ratio, grid_ratio, grid_profit,
+                 option_ratio, strike, premium):
+        self.codes = [str(code) for code in codes]
+        self.spot = np.asarray(spot, dtype=float)
+        self.futures = np.asarray(futures, dtype=float)
+        self.vol = np.asarray(vol, dtype=float) / 100
+        self.inventory = np.asarray(inventory, dtype=float)
+        index = {code: i for i, code in enumerate(self.codes)}
+        unknown = {str(code) for code in hedge_asset if code and str(code) not in index}
+        if unknown:
+            raise ValueError(f"对冲品种不在持仓表中: {', '.join(sorted(unknown))}")
+        targets = np.array([index[str(code)] if code else i for i, code in enumerate(hedge_asset)], dtype=int)
+        notional = np.asarray(hedge_ratio, dtype=float) / 100 * self.inventory * self.spot
+        self.hedge = np.zeros((len(self.codes), len(self.codes)))
+        self.hedge[np.arange(len(self.codes)), targets] = notional / self.futures[targets]
+        self.grid_pnl = np.asarray(grid_ratio, dtype=float) / 100 * self.inventory * np.asarray(grid_profit, dtype=float)
+        self.option_tons = np.asarray(option_ratio, dtype=float) / 100 * self.inventory
+        self.strike = np.asarray(strike, dtype=float)
+        self.premium = np.asarray(premium, dtype=float)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def from_frame(cls, frame):
+        frame = frame.dropna(subset=[ASSET_COLUMNS["code"]])
+        columns = {name: frame[label].tolist() for name, label in ASSET_COLUMNS.items()}
+        columns["hedge_asset"] = ["" if value is None or value != value else value for value in columns["hedge_asset"]]
+        return cls(columns.pop("code"), **columns)
+
+    def pnl(self, prices):
+        """
+        各品种分项盈亏，prices 为 (路径数, 品种数) 现货价格，期货按当前基差同步变动
+
+        返回 {"现货", "期货对冲", "网格", "卖权", "合计"}，均为 (路径数, 品种数)，按库存品种归属；
+        期货对冲 = −价格变动 @ 对冲矩阵转置，一次矩阵乘法完成全部跨品种对冲。
+        """
+        move = prices - self.spot
+        spot_pnl = move * self.inventory
+        hedge_pnl = -move @ self.hedge.T
+        grid_pnl = np.broadcast_to(self.grid_pnl, prices.shape)
+        option_pnl = (self.premium - np.maximum(prices - self.strike, 0)) * self.option_tons
+        return {
+            "现货": spot_pnl,
+            "期货对冲": hedge_pnl,
+            "网格": grid_pnl,
+            "卖权": option_pnl,
+            "合计": spot_pnl + hedge_pnl + grid_pnl + option_pnl,
+        }
+
+    def factor_pnl(self, prices):
+        """
+        按价格因子（品种）归属的盈亏：组合盈亏可按各品种价格加性分解，便于确定分布范围
+        """
+        move = prices - self.spot
+        exposure = self.inventory - self.hedge.sum(axis=0)
+        return (move * exposure + self.grid_pnl
+                + (self.premium - np.maximum(prices - self.strike, 0)) * self.option_tons)
+
+    def margin(self, futures_margin_ratio, option_margin_ratio):
+        """
+        各库存品种的保证金占用（元），返回 (期货保证金, 期权保证金)，比例以百分数计
+        """
+        futures_margin = self.hedge @ self.futures * futures_margin_ratio / 100
+        option_margin = self.strike * self.option_tons * option_margin_ratio / 100
+        return futures_margin, option_margin
+
+
+def price_range(book, days, n_std=8.0):
+    """
+    各品种价格的近似支撑区间（对数收益 ± n_std 个标准差），返回 (下限, 上限)
+    """
+    scale = book.vol * np.sqrt(max(days, 0) / 365)
+    return book.spot * np.exp(-n_std * scale), book.spot * np.exp(n_std * scale)
+
+
+def simulate_portfolio(book, corr, days, n_paths, seed=None, chunk_size=DEFAULT_PORTFOLIO_CHUNK,
+                       dtype=np.float64, confidence=0.95, bins=DEFAULT_BINS, model=None):
+    """
+    相关多品种组合的蒙特卡洛风险评估
+
+    组合盈亏逐块累加到流式风险累加器，各品种单独 VaR 另用各自的直方图；同时按组合盈亏
+    分箱累计各品种盈亏，得到尾部（最差 1−confidence 样本）中各品种的平均贡献，
+    合计即组合 CVaR（分箱口径，与精确尾部均值相差不超过一个分箱宽度）。内存只与分块大小、分箱数和品种数有关。
+    model 为已构造的 CorrelatedAssets（Cholesky 因子可复用），缺省时按 corr 与 book.vol 构造。
+    """
+    model = CorrelatedAssets(corr, book.vol) if model is None else model
+    n_assets = len(book)
+
+    # 组合盈亏可按品种价格加性分解，分箱范围取各品种盈亏极值之和
+    low, high = price_range(book, days)
+    grid = np.linspace(low, high, 2049)
+    factor = book.factor_pnl(grid)
+    total_risk = StreamingRisk(PnLHistogram(float(factor.min(axis=0).sum()), float(factor.max(axis=0).sum()), bins),
+                               tail_capacity=tail_capacity(n_paths, confidence))
+    total_hist = total_risk.hist
+    # 单品种盈亏 = 自身价格的现货/网格/卖权 + 对冲品种价格的期货对冲，分别取极值
+    parts = book.pnl(grid)
+    own = parts["合计"] - parts["期货对冲"]
+    hedge_low, hedge_high = -book.hedge @ (high - book.spot), -book.hedge @ (low - book.spot)
+    asset_hists = [PnLHistogram(float(own[:, j].min() + hedge_low[j]), float(own[:, j].max() + hedge_high[j]), bins)
+                   for j in range(n_assets)]
+    tail_sums = np.zeros((bins, n_assets))
+    component_sums = {name: np.zeros(n_assets) for name in ("现货", "期货对冲", "网格", "卖权", "合计")}
+
+    for size, stream in chunk_streams(seed, n_paths, chunk_size):
+        prices = model.terminal(np.random.default_rng(stream), size, book.spot, days, dtype)
+        parts = book.pnl(prices.astype(np.float64))
+        by_asset = parts["合计"]
+        total = by_asset.sum(axis=1)
+        total_risk.update(total)
+        idx = np.clip(np.searchsorted(total_hist.edges, total, side="right") - 1, 0, bins - 1)
+        for j in range(n_assets):
+            asset_hists[j].update(by_asset[:, j])
+            tail_sums[:, j] += np.bincount(idx, weights=by_asset[:, j], minlength=bins)
+        for name, values in parts.items():
+            component_sums[name] += values.sum(axis=0)
+
+    # 尾部贡献：与 PnLHistogram.tail_mean 相同的累计口径，边界分箱按比例计入
+    alpha = 1 - confidence
+    target = alpha * total_hist.n
+    cum = np.cumsum(total_hist.counts)
+    i = int(np.searchsorted(cum, target))
+    below = cum[i - 1] if i > 0 else 0
+    frac = (target - below) / total_hist.counts[i] if total_hist.counts[i] else 0.0
+    tail = (tail_sums[:i].sum(axis=0) + frac * tail_sums[i]) / target
+
+    summary = total_risk.summary(confidence)
+    summary["assets"] = {
+        "品种": book.codes,
+        **{f"{name}均值": sums / n_paths for name, sums in component_sums.items()},
+        "单品种VaR": np.array([hist.quantile(alpha) for hist in asset_hists]),
+        "尾部贡献": tail,
+    }
+    # 分散化收益：组合 VaR 相对各品种单独 VaR 之和少亏的金额
+    summary["diversification"] = float(summary["var"] - summary["assets"]["单品种VaR"].sum())
+    return summary
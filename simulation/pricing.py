@@ -0,0 +1,73 @@
+import numpy as np
+from scipy.special import ndtr
+
+# Black-76 期货期权定价及希腊字母（NumPy闭式解，全部参数可按数组广播）
+# 希腊字母口径与 py_vollib.black.greeks.analytical 一致：
+# Vega 为波动率每变动1个百分点的价值变化，Theta 为每自然日的价值变化
+
+
+def _npdf(x):
+    return np.exp(-0.5 * x * x) / np.sqrt(2 * np.pi)
+
+
+def _d1_d2(F, K, T, sigma):
+    sqrt_t = np.sqrt(np.maximum(T, 0))
+    vol_sqrt_t = sigma * sqrt_t
+    live = vol_sqrt_t > 0
+    safe = np.where(live, vol_sqrt_t, 1.0)
+    d1 = np.where(live, (np.log(F / K) + 0.5 * vol_sqrt_t ** 2) / safe, 0.0)
+    return d1, d1 - vol_sqrt_t, live, sqrt_t
+
+
+def black76_price(F, K, T, r, sigma, flag="c"):
+    """
+    Black-76 期权价格（T 以年计，T<=0 或 sigma<=0 时为内在价值）
+    """
+    F, K, T, r, sigma = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (F, K, T, r, sigma)))
+    is_call = np.asarray(flag) == "c"
+    d1, d2, live, _ = _d1_d2(F, K, T, sigma)
+    discount = np.exp(-r * np.maximum(T, 0))
+    call = discount * (F * ndtr(d1) - K * ndtr(d2))
+    put = discount * (K * ndtr(-d2) - F * ndtr(-d1))
+    value = np.where(is_call, call, put)
+    intrinsic = np.where(is_call, np.maximum(F - K, 0), np.maximum(K - F, 0)) * discount
+    return np.where(live, value, intrinsic)
+
+
+def black76_greeks(F, K, T, r, sigma, flag="c"):
+    """
+    Black-76 希腊字母，返回 {"delta", "gamma", "vega", "theta"}
+    """
+    F, K, T, r, sigma = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (F, K, T, r, sigma)))
+    is_call = np.asarray(flag) == "c"
+    d1, d2, live, sqrt_t = _d1_d2(F, K, T, sigma)
+    discount = np.exp(-r * np.maximum(T, 0))
+    pdf_d1 = _npdf(d1)
+    price = black76_price(F, K, T, r, sigma, flag)
+
+    itm = np.where(is_call, F > K, F < K)
+    delta = np.where(
+        live,
+        np.where(is_call, discount * ndtr(d1), -discount * ndtr(-d1)),
+        np.where(itm, np.where(is_call, discount, -discount), 0.0)
+    )
+    safe = np.where(live, F * sigma * sqrt_t, 1.0)
+    gamma = np.where(live, discount * pdf_d1 / safe, 0.0)
+    vega = np.where(live, F * discount * pdf_d1 * sqrt_t * 0.01, 0.0)
+    safe_t = np.where(live, 2 * sqrt_t, 1.0)
+    theta = np.where(live, (-F * discount * pdf_d1 * sigma / safe_t + r * price) / 365, 0.0)
+    return {"delta": delta, "gamma": gamma, "vega": vega, "theta": theta}
+
+
+def short_call_position(F, strike_price, T, r, sigma, tons):
+    """
+    卖出看涨期权头寸的市值与希腊字母（按持仓吨数汇总，空头取负号）
+
+    F 可为价格网格或蒙特卡洛路径数组，返回与其同形状的
+    {"value", "delta", "gamma", "vega", "theta"}。
+    """
+    value = -black76_price(F, strike_price, T, r, sigma, "c") * tons
+    greeks = black76_greeks(F, strike_price, T, r, sigma, "c")
+    position = {name: -greek * tons for name, greek in greeks.items()}
+    position["value"] = value
+    return position
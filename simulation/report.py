@@ -0,0 +1,68 @@
+import io
+
+# Excel 单个工作表的行数上限（含表头）
+EXCEL_MAX_ROWS = 1_048_576
+
+# 任一工作表超过该行数时启用 xlsxwriter 的 constant_memory 流式写入
+STREAMING_ROWS = 10_000
+
+
+def _cell_values(column):
+    """
+    列转为 xlsxwriter 可直接写入的 Python 原生值（日期列转为文本，缺失值写为空单元格）
+    """
+    if column.dtype.kind == "M":
+        column = column.astype(str)
+    elif column.hasnans:
+        return [None if value != value else value for value in column.tolist()]
+    return column.tolist()
+
+
+def write_excel(sheets, target, streaming_rows=STREAMING_ROWS):
+    """
+    将 {工作表名: DataFrame} 按行顺序写入 xlsx（target 为文件路径或文件对象）
+
+    逐行写入可配合 constant_memory 模式：每写完一行即刷出到临时文件，内存占用与行数无关
+    （pandas.to_excel 按列写单元格，不能用于该模式）。
+    """
+    import xlsxwriter
+
+    for name, frame in sheets.items():
+        if len(frame) + 1 > EXCEL_MAX_ROWS:
+            raise ValueError(f"工作表“{name}”共 {len(frame):,} 行，超过Excel行数上限，请导出为Parquet/CSV")
+
+    n_rows = max((len(frame) for frame in sheets.values()), default=0)
+    workbook = xlsxwriter.Workbook(target, {
+        "constant_memory": n_rows > streaming_rows,
+        "nan_inf_to_errors": True,
+    })
+    header_format = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    for name, frame in sheets.items():
+        sheet = workbook.add_worksheet(name)
+        sheet.write_row(0, 0, [str(col) for col in frame.columns], header_format)
+        columns = [_cell_values(frame[col]) for col in frame.columns]
+        for row, values in enumerate(zip(*columns), start=1):
+            sheet.write_row(row, 0, values)
+    workbook.close()
+
+
+def excel_report(sheets, streaming_rows=STREAMING_ROWS):
+    """
+    生成Excel报告，返回 xlsx 文件内容（bytes）
+    """
+    buffer = io.BytesIO()
+    write_excel(sheets, buffer, streaming_rows)
+    return buffer.getvalue()
+
+
+def table_bytes(frame, fmt="parquet"):
+    """
+    单表导出为 Parquet 或 CSV（UTF-8 BOM，Excel 可直接打开中文表头），返回 bytes
+    """
+    if fmt == "parquet":
+        buffer = io.BytesIO()
+        frame.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    if fmt == "csv":
+        return frame.to_csv(index=False).encode("utf-8-sig")
+    raise ValueError(f"不支持的导出格式: {fmt}")
@@ -0,0 +1,176 @@
+from datetime import date, timedelta
+
+import numpy as np
+from scipy.signal import lfilter
+
+from .montecarlo import chunk_streams, price_paths
+from .scenario import calculate_annualized_return
+
+# 展期模拟需保存 (路径, 天数, 合约) 三维期货价格，分块路径数较小
+DEFAULT_ROLL_CHUNK = 4_000
+
+# 螺纹钢主力合约月份，最后交易日为合约月份15日
+MAIN_MONTHS = (1, 5, 10)
+LAST_TRADING_DAY = 15
+
+# 逐路径输出列
+ROLL_COLUMNS = ("现货盈亏", "期货对冲", "展期收益", "交易成本", "总盈亏", "峰值保证金")
+
+
+def contract_strip(today, horizon_days, months=MAIN_MONTHS, roll_before=30, symbol="RB"):
+    """
+    覆盖对冲期限的合约序列：从首个在展期提前量之后到期的主力合约起，至到期日晚于期末的合约止
+
+    返回 [(合约代码, 到期日), ...]，合约代码如 RB2601。
+    """
+    months = sorted(set(int(month) for month in months))
+    if not months or months[0] < 1 or months[-1] > 12:
+        raise ValueError("合约月份需为 1-12 中的至少一个月份")
+    end = today + timedelta(days=int(horizon_days))
+    strip = []
+    year = today.year
+    while not strip or strip[-1][1] <= end:
+        for month in months:
+            expiry = date(year, month, LAST_TRADING_DAY)
+            if (expiry - today).days > roll_before and (not strip or strip[-1][1] <= end):
+                strip.append((f"{symbol}{year % 100:02d}{month:02d}", expiry))
+        year += 1
+    return strip
+
+
+def roll_schedule(expiries, horizon_days, roll_before=30, roll_window=5):
+    """
+    展期计划：各合约每日持仓占比，形状 (天数+1, 合约数)，每行合计为 1
+
+    合约 i 在到期前 roll_before 天结束展期，此前 roll_window 天内每日等量移仓到下一合约；
+    移仓进度 p_i(t) 按时间线性插值，合约 i 的占比 = p_{i−1}(t) − p_i(t)（p_{−1} ≡ 1），
+    全部合约一次向量化求出。最后一个合约不再展期，其到期日须晚于对冲期末。
+    """
+    expiries = np.asarray(expiries, dtype=float)
+    if expiries.size == 0 or expiries[-1] < horizon_days:
+        raise ValueError("期货合约序列需覆盖对冲期限")
+    if np.any(np.diff(expiries) <= roll_window):
+        raise ValueError("相邻合约到期日间隔需大于展期窗口")
+    days = np.arange(int(horizon_days) + 1, dtype=float)[:, None]
+    window = max(int(roll_window), 1)
+    start = expiries[:-1] - roll_before - window
+    progress = np.clip((days - start[None, :] + 1) / window, 0, 1)
+    progress = np.hstack([np.ones((len(days), 1)), progress, np.zeros((len(days), 1))])
+    return progress[:, :-1] - progress[:, 1:]
+
+
+def carry_paths(rng, n, carry, days, carry_vol, half_life=60, dtype=np.float64):
+    """
+    期限结构斜率（年化持有成本，小数）的逐日路径，均值回复到当前水平，形状 (n, days+1)
+    """
+    dtype = np.dtype(dtype).type
+    n_steps = max(int(days), 1)
+    dt = 1 / 365
+    kappa = np.log(2) / (half_life / 365) if half_life else 0.0
+    decay = np.exp(-kappa * dt)
+    scale = carry_vol * np.sqrt((1 - decay ** 2) / (2 * kappa) if kappa else dt)
+    z = rng.standard_normal((n, n_steps), dtype=dtype)
+    noise = np.zeros((n, n_steps + 1), dtype=dtype)
+    noise[:, 1:] = lfilter([scale], [1.0, -decay], z, axis=1)
+    return dtype(carry) + noise
+
+
+def term_structure(spot, carry, expiries, day):
+    """
+    各合约期货价格 F_i = S · exp(c · τ_i)，τ_i 为剩余年限（到期后为 0，期货收敛到现货）
+
+    spot、carry 形状 (..., 天数)，day 为对应的天数下标，返回 (..., 天数, 合约数)。
+    """
+    remaining = np.maximum(np.asarray(expiries, dtype=float)[None, :] - np.asarray(day, dtype=float)[:, None], 0)
+    return spot[..., None] * np.exp(carry[..., None] * remaining / 365)
+
+
+def implied_carry(spot_base, futures_base, days_to_expiry):
+    """
+    由现货与近月期货价格反推年化持有成本（负值为贴水/反向市场）
+    """
+    return float(np.log(futures_base / spot_base) / (max(days_to_expiry, 1) / 365))
+
+
+def roll_paths(spot, carry, weights, expiries, hedge_tons, warehouse, commission_rate=0.0001,
+               spread_cost=2.0, margin_ratio=0.1):
+    """
+    沿路径计算展期对冲，返回逐路径结果 {列名: (路径数,)} 与逐日平均保证金
+
+    spot、carry 形状 (路径数, 天数+1)，weights 为 roll_schedule 的展期计划。
+    期货对冲 = −对冲吨数 × Σ_t Σ_i w_i(t−1)·ΔF_i(t)，以 einsum 在路径与合约维同时求和；
+    展期收益为期货对冲相对“按现货变动对冲”的差额（期限结构与收敛的贡献）。
+    交易成本含建仓、移仓、期末平仓的手续费，以及每吨移仓的跨期价差成本 spread_cost。
+    """
+    days = np.arange(spot.shape[1])
+    futures = term_structure(spot, carry, expiries, days)
+    traded = np.abs(np.diff(weights, axis=0, prepend=0, append=0))
+
+    hedge = -hedge_tons * np.einsum("ntk,tk->n", np.diff(futures, axis=1), weights[:-1])
+    fees = np.einsum("ntk,tk->n", futures, traded[:-1]) + np.einsum("nk,k->n", futures[:, -1], traded[-1])
+    rolled = np.clip(-np.diff(weights, axis=0), 0, None).sum()
+    cost = hedge_tons * (fees * commission_rate + rolled * spread_cost)
+    spot_pnl = (spot[:, -1] - spot[:, 0]) * warehouse
+    margin = hedge_tons * margin_ratio * np.einsum("ntk,tk->nt", futures, weights)
+
+    per_path = dict(zip(ROLL_COLUMNS, (
+        spot_pnl,
+        hedge,
+        hedge + hedge_tons * (spot[:, -1] - spot[:, 0]),
+        cost,
+        spot_pnl + hedge - cost,
+        margin.max(axis=1),
+    )))
+    return per_path, margin.sum(axis=0)
+
+
+def simulate_rolling_hedge(strategy_params, sigma, horizon_days, expiries, carry, n_paths, model="gbm",
+                           seed=None, carry_vol=0.1, carry_half_life=60, roll_before=30, roll_window=5,
+                           commission_rate=0.0001, spread_cost=2.0, margin_ratio=0.1,
+                           chunk_size=DEFAULT_ROLL_CHUNK):
+    """
+    跨合约展期对冲的蒙特卡洛模拟
+
+    对冲仓位取固定 hedge_ratio × warehouse 吨，按 roll_schedule 在合约序列间移仓；
+    现货路径随机流与 monte_carlo_risk 一致，期限结构斜率为均值回复过程。
+    返回 (逐路径结果 {列名: (n_paths,)}, 展期计划 (天数+1, 合约数), 逐日平均保证金)。
+    """
+    warehouse = strategy_params["warehouse"]
+    hedge_tons = strategy_params["hedge_ratio"] / 100 * warehouse
+    weights = roll_schedule(expiries, horizon_days, roll_before, roll_window)
+
+    chunks, margin_total = [], 0.0
+    for size, stream in chunk_streams(seed, n_paths, chunk_size):
+        rng = np.random.default_rng(stream)
+        spot = price_paths(rng, size, strategy_params["spot_base"], sigma, horizon_days, model)
+        carries = carry_paths(rng, size, carry, horizon_days, carry_vol, carry_half_life)
+        per_path, margin_sum = roll_paths(spot, carries, weights, expiries, hedge_tons, warehouse,
+                                          commission_rate, spread_cost, margin_ratio)
+        chunks.append(per_path)
+        margin_total = margin_total + margin_sum
+    result = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in ROLL_COLUMNS}
+    return result, weights, margin_total / n_paths
+
+
+def rolling_summary(result, capital, risk_free_rate, horizon_days, confidence=0.95):
+    """
+    展期对冲汇总：总盈亏均值与 VaR/CVaR、展期收益与交易成本均值、峰值保证金分位数，
+    以及按总盈亏均值计算的年化收益率（capital 以万元计，risk_free_rate 以百分数计）
+    """
+    total = result["总盈亏"]
+    var = float(np.quantile(total, 1 - confidence))
+    annualized, excess = calculate_annualized_return(float(total.mean()), capital, risk_free_rate, horizon_days)
+    return {
+        "mean": float(total.mean()),
+        "std": float(total.std()),
+        "var": var,
+        "cvar": float(total[total <= var].mean()),
+        "hedge_mean": float(result["期货对冲"].mean()),
+        "roll_yield": float(result["展期收益"].mean()),
+        "cost": float(result["交易成本"].mean()),
+        "peak_margin_mean": float(result["峰值保证金"].mean()),
+        "peak_margin_p95": float(np.quantile(result["峰值保证金"], 0.95)),
+        "annualized": annualized,
+        "excess": excess,
+        "n_paths": int(len(total)),
+    }
@@ -0,0 +1,174 @@
+import numpy as np
+
+from .strategy import (
+    adaptive_price_grid, price_grid, profit_interval, strategy_kinks, strategy_pnl, total_profit_fn
+)
+
+# 单个情景的参数及默认值（与界面侧边栏一致；比例类参数以百分数计，vol 为小数，capital 以万元计）
+SCENARIO_DEFAULTS = {
+    "spot_base": 3700,
+    "futures_base": 3500,
+    "warehouse": 5000,
+    "strike_price": 3600,
+    "capital": 1000,
+    "risk_free_rate": 2.5,
+    "days_to_expiry": 90,
+    "hedge_ratio": 20,
+    "grid_ratio": 10,
+    "option_ratio": 10,
+    "vol": 0.15,
+    "price_step": 50,
+    "adaptive_grid": False,
+    "grid_profit_per_ton": 20,
+    "option_premium": 20,
+    "futures_margin_ratio": 10,
+    "option_margin_ratio": 15,
+    "dynamic_hedge": True,
+    "min_hedge": 10,
+    "max_hedge": 80,
+    "hedge_threshold": 5,
+    # 蒙特卡洛（mc_paths 为 0 时不启用，VaR 取价格网格分位数）
+    "mc_paths": 0,
+    "mc_model": "gbm",
+    "mc_sigma": 0.2,
+    "mc_seed": 42,
+}
+
+
+def strategy_params(scenario):
+    """
+    由情景参数得到 strategy_pnl 的参数（关闭动态对冲时对冲比例固定为 hedge_ratio）
+    """
+    dynamic = bool(scenario["dynamic_hedge"])
+    return dict(
+        spot_base=scenario["spot_base"], warehouse=scenario["warehouse"],
+        hedge_ratio=scenario["hedge_ratio"], grid_ratio=scenario["grid_ratio"],
+        option_ratio=scenario["option_ratio"], grid_profit_per_ton=scenario["grid_profit_per_ton"],
+        option_premium=scenario["option_premium"], strike_price=scenario["strike_price"],
+        dynamic_hedge=dynamic,
+        min_hedge=scenario["min_hedge"] if dynamic else scenario["hedge_ratio"],
+        max_hedge=scenario["max_hedge"] if dynamic else scenario["hedge_ratio"],
+        hedge_threshold=scenario["hedge_threshold"] if dynamic else 5,
+    )
+
+
+def strategy_columns(spot_base, warehouse, hedge_ratio, grid_ratio, option_ratio,
+                     grid_profit_per_ton, option_premium, vol, strike_price,
+                     dynamic_hedge=True, min_hedge=10, max_hedge=80, hedge_threshold=5,
+                     price_step=50, adaptive_grid=False, basis_change=0.0, option_book=None):
+    """
+    在模拟价格网格上计算各策略组件盈亏，返回 {列名: 数组}
+    """
+    params = dict(
+        spot_base=spot_base, warehouse=warehouse, hedge_ratio=hedge_ratio,
+        grid_ratio=grid_ratio, option_ratio=option_ratio,
+        grid_profit_per_ton=grid_profit_per_ton, option_premium=option_premium,
+        strike_price=strike_price, dynamic_hedge=dynamic_hedge,
+        min_hedge=min_hedge, max_hedge=max_hedge, hedge_threshold=hedge_threshold,
+        basis_change=basis_change, option_book=option_book
+    )
+
+    if adaptive_grid:
+        strikes = option_book.kinks() if option_book is not None else strike_price
+        price_range = adaptive_price_grid(
+            total_profit_fn(**params), spot_base, vol, price_step,
+            strategy_kinks(spot_base, strikes, dynamic_hedge, hedge_threshold)
+        )
+    else:
+        price_range = price_grid(spot_base, vol, price_step)
+
+    return strategy_pnl(price_range, **params)
+
+
+def calculate_strategy(*args, **kwargs):
+    """
+    策略盈亏表（DataFrame），参数同 strategy_columns
+    """
+    import pandas as pd
+    return pd.DataFrame(strategy_columns(*args, **kwargs))
+
+
+def margin_requirement(futures_base, strike_price, warehouse, hedge_ratio, option_ratio,
+                       futures_margin_ratio, option_margin_ratio):
+    """
+    保证金占用，返回 (期货保证金, 期权保证金, 总保证金)
+    """
+    futures_margin = futures_base * warehouse * (hedge_ratio / 100) * (futures_margin_ratio / 100)
+    option_margin = strike_price * warehouse * (option_ratio / 100) * (option_margin_ratio / 100)
+    return futures_margin, option_margin, futures_margin + option_margin
+
+
+def calculate_annualized_return(total_profit, capital, risk_free_rate, days_to_expiry):
+    """
+    计算年化收益率和超额收益率（total_profit 可为数组，供优化器批量计算）
+    """
+    # 总收益率 = 总利润 / 总资金
+    total_return = np.asarray(total_profit, dtype=float) / (capital * 10000)  # 资本单位：万元转为元
+
+    # 年化因子 = 365 / 合约剩余天数
+    annual_factor = 365 / days_to_expiry if days_to_expiry > 0 else 1
+
+    # 年化收益率 = (1 + 总收益率)^(年化因子) - 1
+    growth = np.maximum(1 + total_return, 0)
+    annualized_return = np.where(total_return > -1, growth ** annual_factor - 1, 0.0)
+    if annualized_return.ndim == 0:
+        annualized_return = float(annualized_return)
+
+    # 超额收益率 = 年化收益率 - 无风险利率
+    excess_return = annualized_return - (risk_free_rate / 100)
+
+    return annualized_return, excess_return
+
+
+def run_scenario(scenario):
+    """
+    计算单个情景，返回 (盈亏列 {列名: 数组}, 汇总指标 dict)
+
+    scenario 为参数字典，缺省项取 SCENARIO_DEFAULTS；汇总指标口径与界面风险分析页一致。
+    """
+    unknown = set(scenario) - set(SCENARIO_DEFAULTS) - {"name"}
+    if unknown:
+        raise ValueError(f"未知情景参数: {', '.join(sorted(unknown))}")
+    s = {**SCENARIO_DEFAULTS, **scenario}
+    params = strategy_params(s)
+    columns = strategy_columns(vol=s["vol"], price_step=s["price_step"],
+                               adaptive_grid=bool(s["adaptive_grid"]), **params)
+    total = columns["总利润"]
+    total_at = total_profit_fn(**params)
+    capital_yuan = s["capital"] * 10000
+
+    max_profit, min_profit = float(total.max()), float(total.min())
+    if s["mc_paths"]:
+        from .montecarlo import monte_carlo_risk
+        var_95 = monte_carlo_risk(params, s["mc_sigma"], max(s["days_to_expiry"], 1),
+                                  int(s["mc_paths"]), s["mc_model"], seed=int(s["mc_seed"]))["var"]
+    else:
+        var_95 = float(np.quantile(total, 0.05))
+    stress_price = s["spot_base"] * (1 - s["vol"] * 1.5)
+    stress_loss = float(total_at(stress_price))
+    breakeven = profit_interval(total_at, columns["现货价格"])
+    annualized, excess = calculate_annualized_return(max_profit, s["capital"], s["risk_free_rate"],
+                                                     s["days_to_expiry"])
+    futures_margin, option_margin, total_margin = margin_requirement(
+        s["futures_base"], s["strike_price"], s["warehouse"], s["hedge_ratio"], s["option_ratio"],
+        s["futures_margin_ratio"], s["option_margin_ratio"]
+    )
+
+    summary = {
+        "最大利润": max_profit,
+        "最小利润": min_profit,
+        "最大回撤": max_profit - min_profit,
+        "最大回撤率": (max_profit - min_profit) / capital_yuan,
+        "95% VaR": float(var_95),
+        "盈亏平衡下限": breakeven[0] if breakeven else None,
+        "盈亏平衡上限": breakeven[1] if breakeven else None,
+        "压力测试价格": stress_price,
+        "压力测试损益": stress_loss,
+        "年化收益率": annualized,
+        "超额收益率": excess,
+        "期货保证金": futures_margin,
+        "期权保证金": option_margin,
+        "总保证金": total_margin,
+        "保证金占比": total_margin / capital_yuan,
+    }
+    return columns, summary
@@ -0,0 +1,134 @@
+import numpy as np
+
+from .montecarlo import DEFAULT_CHUNK_SIZE, chunk_streams, shocked_prices
+from .stress import stress_test
+
+# 敏感度因子：(名称, 单位, 默认差分步长)；波动率步长以小数计（1个百分点），时间以自然日计
+SENSITIVITY_FACTORS = {
+    "spot": ("现货价格", "元/吨", 10.0),
+    "vol": ("波动率", "百分点", 0.01),
+    "basis": ("基差", "元/吨", 10.0),
+    "time": ("时间", "天", 1.0),
+}
+
+# 阶梯图的冲击档位（现货为相对涨跌幅，其余单位同差分步长）
+SENSITIVITY_LADDERS = {
+    "spot": np.linspace(-0.10, 0.10, 11),
+    "vol": np.linspace(-0.10, 0.10, 11),
+    "basis": np.linspace(-300, 300, 13),
+    "time": np.arange(0, 35, 5, dtype=float),
+}
+
+# 单次重估的单元数上限（冲击行数 × 路径数），超过时按路径分块
+DEFAULT_MAX_CELLS = 1_000_000
+
+
+def bump_rows(spot_base, bumps=None, ladders=None):
+    """
+    全部冲击行：基准、各因子 ±步长（时间只向前）及阶梯档位，返回 (标签列表, {因子: 加量数组})
+
+    加量为现货（元/吨）、波动率（小数）、基差（元/吨）、天数的绝对变动，每行只有一个因子非零。
+    """
+    bumps = {name: spec[2] for name, spec in SENSITIVITY_FACTORS.items()} | (bumps or {})
+    ladders = SENSITIVITY_LADDERS | (ladders or {})
+    labels, rows = [("base", 0.0)], [(None, 0.0)]
+    for name, step in bumps.items():
+        for sign in ((1,) if name == "time" else (-1, 1)):
+            labels.append((f"{name}{'+' if sign > 0 else '-'}", sign * step))
+            rows.append((name, sign * step))
+    for name, levels in ladders.items():
+        levels = np.asarray(levels, dtype=float) * (spot_base if name == "spot" else 1)
+        labels += [(f"ladder:{name}", level) for level in levels]
+        rows += [(name, level) for level in levels]
+    shifts = {name: np.array([value if factor == name else 0.0 for factor, value in rows])
+              for name in SENSITIVITY_FACTORS}
+    return labels, shifts
+
+
+def revalue(strategy_params, futures_base, shifts, z, sigma, days, days_to_expiry, r, implied_vol, model="gbm"):
+    """
+    一次向量化重估全部冲击行，返回总盈亏矩阵 (冲击行数, 路径数)
+
+    各冲击行共用同一组标准正态冲击 z（公共随机数）：现货冲击改变起点价格，波动率冲击同时
+    平移价格模型波动率与期权隐含波动率，时间冲击延长持有天数，基差冲击使期货少涨 Δ基差；
+    期权腿按 Black-76 在持有期末重估，口径与压力测试一致。z 为 None 时价格不随机（确定性重估）。
+    """
+    spot_base = strategy_params["spot_base"]
+    start = (spot_base + shifts["spot"])[:, None]
+    vol = np.maximum(sigma + shifts["vol"], 1e-6)[:, None]
+    held = (days + shifts["time"])[:, None]
+    if z is None:
+        spot = start.astype(np.float64)
+    else:
+        spot = shocked_prices(z[None, :], start, vol, held, model).astype(np.float64)
+    futures = futures_base + (spot - spot_base) - shifts["basis"][:, None]
+    scenarios = {
+        "spot_shock": spot / spot_base - 1,
+        "futures_shock": futures / futures_base - 1,
+        "iv_shift": np.broadcast_to(shifts["vol"][:, None], spot.shape),
+        "days": np.broadcast_to(held, spot.shape),
+    }
+    return stress_test(strategy_params, futures_base, scenarios, days_to_expiry, r, implied_vol)["总利润"]
+
+
+def portfolio_sensitivities(strategy_params, futures_base, days_to_expiry, r=0.025, implied_vol=0.2, sigma=0.2,
+                            days=0, n_paths=0, model="gbm", seed=None, bumps=None, ladders=None, confidence=0.95,
+                            dtype=np.float64, max_cells=DEFAULT_MAX_CELLS):
+    """
+    组合敏感度：全部冲击行堆叠成一个 (冲击行数 × 路径数) 数组一次重估，代价约为一次重估
+
+    n_paths 为 0 时在当前时点做确定性重估（持有 days 天、价格不随机）；否则模拟 days 天后的
+    现货价格，随机冲击与 monte_carlo_risk 同种子时的样本一致，所有冲击行共用（公共随机数），
+    差分不受抽样噪声干扰。敏感度取期望盈亏的中心差分（时间为前向差分），另给出 VaR 的差分。
+    返回 {"table": 敏感度表列, "ladders": {因子: 阶梯表列}, "base_mean", "base_var", "n_rows", "n_paths"}。
+    """
+    labels, shifts = bump_rows(strategy_params["spot_base"], bumps, ladders)
+    if n_paths:
+        z = np.concatenate([np.random.default_rng(stream).standard_normal(size, dtype=dtype)
+                            for size, stream in chunk_streams(seed, n_paths, DEFAULT_CHUNK_SIZE)])
+        total = np.empty((len(labels), len(z)))
+        step = max(int(max_cells // len(labels)), 1)
+        for start in range(0, len(z), step):
+            part = slice(start, start + step)
+            total[:, part] = revalue(strategy_params, futures_base, shifts, z[part], sigma, days,
+                                     days_to_expiry, r, implied_vol, model)
+    else:
+        total = revalue(strategy_params, futures_base, shifts, None, sigma, days, days_to_expiry, r, implied_vol)
+
+    alpha = 1 - confidence
+    mean = total.mean(axis=1)
+    var = np.quantile(total, alpha, axis=1)
+    index = {label: i for i, (label, _) in enumerate(labels)}
+
+    table = {"因子": [], "单位": [], "期望盈亏敏感度": [], "二阶敏感度": [], "VaR敏感度": []}
+    for name, (label, unit, _) in SENSITIVITY_FACTORS.items():
+        # 波动率敏感度按每1个百分点计，其余按每单位计
+        per_unit = 0.01 if name == "vol" else 1.0
+        up = index[f"{name}+"]
+        step = labels[up][1]
+        down, width = (0, step) if name == "time" else (index[f"{name}-"], 2 * step)
+        table["因子"].append(label)
+        table["单位"].append(f"元/({unit})" if "/" in unit else f"元/{unit}")
+        table["期望盈亏敏感度"].append((mean[up] - mean[down]) / width * per_unit)
+        table["VaR敏感度"].append((var[up] - var[down]) / width * per_unit)
+        table["二阶敏感度"].append(np.nan if name == "time" else
+                              (mean[up] - 2 * mean[0] + mean[down]) / step ** 2 * per_unit ** 2)
+
+    ladder_tables = {}
+    for name in SENSITIVITY_FACTORS:
+        rows = [i for i, (label, _) in enumerate(labels) if label == f"ladder:{name}"]
+        if rows:
+            levels = np.array([labels[i][1] for i in rows])
+            ladder_tables[name] = {
+                "冲击": levels / (0.01 if name == "vol" else 1),
+                "期望盈亏变动": mean[rows] - mean[0],
+                "VaR变动": var[rows] - var[0],
+            }
+    return {
+        "table": {key: np.asarray(values) for key, values in table.items()},
+        "ladders": ladder_tables,
+        "base_mean": float(mean[0]),
+        "base_var": float(var[0]),
+        "n_rows": len(labels),
+        "n_paths": int(n_paths),
+    }
@@ -0,0 +1,138 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from .io import read_price_history
+
+# 合约代码与字段名直接用作目录名和文件名，只允许字母、数字、下划线和连字符
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# 日期统一存为自1970-01-01起的天数（int64），便于二分查找
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def _day_number(value):
+    return (np.datetime64(pd.Timestamp(value).date(), "D") - EPOCH).astype(np.int64)
+
+
+class MarketDataStore:
+    """
+    列式内存映射行情库
+
+    每个合约一个目录，日期与各字段分别存为 .npy 文件，index.json 记录合约、字段、
+    日期范围与到期日。原始文件只需导入一次，查询时以 mmap 方式打开并按日期二分切片，
+    返回的数组是磁盘映射的零拷贝视图，内存占用与历史长度无关。
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._index_path = os.path.join(root, self.INDEX_FILE)
+        self.index = {}
+        if os.path.exists(self._index_path):
+            with open(self._index_path, encoding="utf-8") as f:
+                self.index = json.load(f)
+        self._maps = {}
+
+    def _save_index(self):
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._index_path)
+
+    def _dir(self, contract):
+        """
+        合约目录；合约代码不合法（如含路径分隔符、..）时报错，防止写到行情库目录之外
+        """
+        if not isinstance(contract, str) or not NAME_PATTERN.match(contract):
+            raise ValueError(f"合约代码只能包含字母、数字、下划线和连字符: {contract!r}")
+        return os.path.join(self.root, contract)
+
+    def _path(self, contract, field):
+        if not isinstance(field, str) or not NAME_PATTERN.match(field):
+            raise ValueError(f"字段名只能包含字母、数字、下划线和连字符: {field!r}")
+        return os.path.join(self._dir(contract), f"{field}.npy")
+
+    def ingest(self, contract, frame, expiry=None):
+        """
+        写入（或整体替换）一个合约的日度数据
+
+        frame 需含 date 列，其余数值列各存为一个字段；expiry 为合约到期日（可选）。
+        """
+        fields = [col for col in frame.columns if col != "date"]
+        paths = {field: self._path(contract, field) for field in ["date", *fields]}
+        frame = frame.sort_values("date")
+        os.makedirs(self._dir(contract), exist_ok=True)
+        days = (pd.to_datetime(frame["date"]).values.astype("datetime64[D]") - EPOCH).astype(np.int64)
+        np.save(paths["date"], days)
+        for field in fields:
+            np.save(paths[field], frame[field].to_numpy(dtype=np.float64))
+
+        self.index[contract] = {
+            "fields": fields,
+            "start": str(frame["date"].iloc[0].date()) if len(frame) else None,
+            "end": str(frame["date"].iloc[-1].date()) if len(frame) else None,
+            "rows": int(len(frame)),
+            "expiry": str(pd.Timestamp(expiry).date()) if expiry is not None else None,
+        }
+        self._save_index()
+        self._maps = {key: value for key, value in self._maps.items() if key[0] != contract}
+
+    def ingest_file(self, contract, source, expiry=None):
+        """
+        导入一份期现日度行情原始文件（CSV/Parquet，格式同历史回测）
+        """
+        self.ingest(contract, read_price_history(source), expiry)
+
+    def contracts(self):
+        return sorted(self.index)
+
+    def _column(self, contract, field):
+        key = (contract, field)
+        if key not in self._maps:
+            self._maps[key] = np.load(self._path(contract, field), mmap_mode="r")
+        return self._maps[key]
+
+    def _bounds(self, contract, start=None, end=None):
+        days = self._column(contract, "date")
+        lo = 0 if start is None else int(np.searchsorted(days, _day_number(start), side="left"))
+        hi = len(days) if end is None else int(np.searchsorted(days, _day_number(end), side="right"))
+        return lo, hi
+
+    def query(self, contract, start=None, end=None, fields=None):
+        """
+        按日期区间（含首尾）查询，返回 {字段: 只读内存映射切片}，日期字段为 datetime64[D]
+        """
+        lo, hi = self._bounds(contract, start, end)
+        fields = fields or self.index[contract]["fields"]
+        result = {"date": self._column(contract, "date")[lo:hi].view("datetime64[D]")}
+        for field in fields:
+            result[field] = self._column(contract, field)[lo:hi]
+        return result
+
+    def frame(self, contract, start=None, end=None):
+        """
+        区间查询结果组装为 DataFrame（会复制数据，供回测等下游使用）
+        """
+        data = self.query(contract, start, end)
+        frame = pd.DataFrame({name: np.asarray(values) for name, values in data.items()})
+        frame["date"] = pd.to_datetime(frame["date"])
+        return frame
+
+    def latest(self, contract):
+        """
+        合约最新一日的各字段取值及到期日
+        """
+        days = self._column(contract, "date")
+        if len(days) == 0:
+            return None
+        row = {field: float(self._column(contract, field)[-1]) for field in self.index[contract]["fields"]}
+        row["date"] = pd.Timestamp(days[-1].astype("datetime64[D]"))
+        expiry = self.index[contract].get("expiry")
+        row["expiry"] = pd.Timestamp(expiry).date() if expiry else None
+        return row
@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+
+# 策略模拟结果列（与界面及Excel导出保持一致）
+PNL_COLUMNS = (
+    "现货价格", "价格变化率", "现货盈亏", "期货对冲",
+    "实际对冲比例", "网格策略", "卖权策略", "总利润"
+)
+
+
+def price_grid(spot_base, vol, step=50):
+    """
+    生成模拟价格网格（±vol 范围，按 step 元等距）
+    """
+    return np.arange(
+        int(spot_base * (1 - vol)),
+        int(spot_base * (1 + vol) + 1),
+        step
+    )
+
+
+def dynamic_hedge_ratio(price, spot_base, min_hedge=10, max_hedge=80, hedge_threshold=5):
+    """
+    动态对冲比例（%）：价格偏离当前价超过阈值取最高比例，阈值内线性插值
+    """
+    price_change_pct = np.abs(np.asarray(price) - spot_base) / spot_base * 100
+    return np.where(
+        price_change_pct > hedge_threshold,
+        max_hedge,
+        min_hedge + (max_hedge - min_hedge) * (price_change_pct / hedge_threshold)
+    )
+
+
+def strategy_pnl(price, spot_base, warehouse, hedge_ratio, grid_ratio, option_ratio,
+                 grid_profit_per_ton, option_premium, strike_price,
+                 dynamic_hedge=True, min_hedge=10, max_hedge=80, hedge_threshold=5, basis_change=0.0,
+                 option_book=None):
+    """
+    向量化策略盈亏模型
+
+    price 及各参数均可为NumPy数组，按广播规则整体计算，
+    返回 {列名: 数组} 的列式结果，各列形状一致。
+    grid_profit_per_ton 也可为 价格 -> 每吨收益 的函数（如网格交易模拟得到的 GridProfitCurve）。
+    basis_change 为基差（现货 − 期货）的变动，期货对冲按期货价格变动 = 现货变动 − 基差变动 计盈亏，
+    默认 0 即期货与现货同涨同跌（零基差风险）。
+    option_book 为多腿期权组合（OptionBook）时卖权策略列取组合盈亏，替代单腿卖出看涨。
+    """
+    price = np.asarray(price)
+    delta = price - spot_base
+
+    # 动态调整对冲比例：超过阈值取最高比例，阈值内线性插值
+    dynamic_ratio = dynamic_hedge_ratio(price, spot_base, min_hedge, max_hedge, hedge_threshold)
+    actual_hedge_ratio = np.where(dynamic_hedge, dynamic_ratio, hedge_ratio)
+
+    # 现货盈亏
+    spot_pnl = delta * warehouse
+
+    # 期货对冲盈亏（按期货价格变动）
+    hedge_pnl = -(delta - basis_change) * (actual_hedge_ratio / 100) * warehouse
+
+    # 网格策略收益（固定每吨收益，或随到期价格变化的模拟收益曲线）
+    if callable(grid_profit_per_ton):
+        grid_profit_per_ton = grid_profit_per_ton(price)
+    grid_pnl = grid_profit_per_ton * (grid_ratio / 100) * warehouse
+
+    # 期权策略收益：权利金收入减去价格超过执行价部分的损失
+    if option_book is not None:
+        option_pnl = option_book(price)
+    else:
+        option_tons = (option_ratio / 100) * warehouse
+        option_pnl = option_premium * option_tons - np.clip(price - strike_price, 0, None) * option_tons
+
+    # 总盈亏
+    total = spot_pnl + hedge_pnl + grid_pnl + option_pnl
+
+    arrays = np.broadcast_arrays(
+        price, delta / spot_base * 100, spot_pnl, hedge_pnl,
+        actual_hedge_ratio, grid_pnl, option_pnl, total
+    )
+    return dict(zip(PNL_COLUMNS, arrays))
+
+
+def total_profit_fn(**params):
+    """
+    返回只计算总利润的单变量函数（价格 -> 总利润），供求根与网格加密使用
+    """
+    return lambda price: strategy_pnl(price, **params)["总利润"]
+
+
+def strategy_kinks(spot_base, strike_price, dynamic_hedge=True, hedge_threshold=5):
+    """
+    盈亏曲线的拐点：执行价（多腿期权组合时可传入全部执行价），以及动态对冲下的当前价和阈值上下沿
+    """
+    kinks = list(np.atleast_1d(strike_price))
+    if dynamic_hedge:
+        kinks += [spot_base * (1 - hedge_threshold / 100), spot_base, spot_base * (1 + hedge_threshold / 100)]
+    return np.asarray(kinks, dtype=float)
+
+
+def refine_grid(grid, points, step, levels=3):
+    """
+    在指定价格点附近按 step/2、step/4…… 加密网格，新增点限制在原网格区间内
+    """
+    grid = np.asarray(grid, dtype=float)
+    points = np.asarray(points, dtype=float)
+    if grid.size == 0 or points.size == 0:
+        return grid
+    halves = 0.5 ** np.arange(1, levels + 1)
+    offsets = step * np.concatenate([[0.0], halves, -halves])
+    extra = (points[:, None] + offsets).ravel()
+    extra = extra[(extra >= grid[0]) & (extra <= grid[-1])]
+    return np.union1d(grid, extra)
+
+
+def find_roots(func, grid, tol=1e-6, max_iter=100):
+    """
+    向量化求根：在网格上找出所有变号区间，同时二分收敛，最后线性插值定位
+
+    func 需接受数组并返回同形状数组；返回升序排列的全部根。
+    """
+    x = np.asarray(grid, dtype=float)
+    y = np.asarray(func(x), dtype=float)
+    exact = x[y == 0]
+
+    idx = np.nonzero(np.sign(y[:-1]) * np.sign(y[1:]) < 0)[0]
+    a, b = x[idx], x[idx + 1]
+    fa, fb = y[idx], y[idx + 1]
+    for _ in range(max_iter):
+        if a.size == 0 or np.max(b - a) <= tol:
+            break
+        m = 0.5 * (a + b)
+        fm = np.asarray(func(m), dtype=float)
+        right = np.sign(fm) == np.sign(fa)  # 根位于 [m, b]
+        a, fa = np.where(right, m, a), np.where(right, fm, fa)
+        b, fb = np.where(right, b, m), np.where(right, fb, fm)
+
+    # 收敛区间内线性插值
+    denom = np.where(fb != fa, fb - fa, 1.0)
+    roots = np.where(fb != fa, a - fa * (b - a) / denom, 0.5 * (a + b))
+    return np.unique(np.concatenate([exact, roots]))
+
+
+def adaptive_price_grid(total_fn, spot_base, vol, step=50, kinks=()):
+    """
+    自适应价格网格：在等距粗网格基础上，只在拐点和盈亏平衡点附近加密
+    """
+    grid = refine_grid(price_grid(spot_base, vol, step), kinks, step)
+    return refine_grid(grid, find_roots(total_fn, grid), step)
+
+
+def profit_interval(total_fn, grid):
+    """
+    网格区间内盈利部分（总利润>=0）的精确下界与上界，无盈利区间时返回 None
+    """
+    grid = np.asarray(grid, dtype=float)
+    ends = grid[[0, -1]]
+    ends = ends[np.asarray(total_fn(ends)) >= 0]
+    candidates = np.concatenate([ends, find_roots(total_fn, grid)])
+    if candidates.size == 0:
+        return None
+    return candidates.min(), candidates.max()
+
+
+def calculate_strategy_reference(spot_base, warehouse, hedge_ratio, grid_ratio, option_ratio,
+                                 grid_profit_per_ton, option_premium, vol, strike_price,
+                                 dynamic_hedge=True, min_hedge=10, max_hedge=80, hedge_threshold=5,
+                                 price_step=50, prices=None):
+    """
+    逐行计算的参考实现，用于核对向量化结果（prices 缺省时按 price_grid 生成价格网格）
+    """
+    price_range = price_grid(spot_base, vol, price_step) if prices is None else prices
+
+    results = []
+    for price in price_range:
+        delta = price - spot_base
+
+        # 动态调整对冲比例
+        if dynamic_hedge:
+            price_change_pct = abs(delta) / spot_base * 100
+            if price_change_pct > hedge_threshold:
+                actual_hedge_ratio = max_hedge
+            else:
+                actual_hedge_ratio = min_hedge + (max_hedge - min_hedge) * (price_change_pct / hedge_threshold)
+        else:
+            actual_hedge_ratio = hedge_ratio
+
+        # 现货盈亏
+        spot_pnl = delta * warehouse
+
+        # 期货对冲盈亏
+        hedge_pnl = -delta * (actual_hedge_ratio / 100) * warehouse
+
+        # 网格策略收益（固定收益）
+        grid_pnl = grid_profit_per_ton * (grid_ratio / 100) * warehouse
+
+        # 期权策略收益
+        option_pnl = option_premium * (option_ratio / 100) * warehouse
+        # 当现货价格超过执行价时，期权策略产生损失
+        if price > strike_price:
+            option_loss = (price - strike_price) * (option_ratio / 100) * warehouse
+            option_pnl -= option_loss
+
+        # 总盈亏
+        total = spot_pnl + hedge_pnl + grid_pnl + option_pnl
+
+        results.append({
+            "现货价格": price,
+            "价格变化率": delta / spot_base * 100,
+            "现货盈亏": spot_pnl,
+            "期货对冲": hedge_pnl,
+            "实际对冲比例": actual_hedge_ratio,
+            "网格策略": grid_pnl,
+            "卖权策略": option_pnl,
+            "总利润": total
+        })
+
+    return pd.DataFrame(results)
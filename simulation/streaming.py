@@ -0,0 +1,230 @@
+import numpy as np
+
+# t-digest 压缩参数：质心数约为其一半，越大分位数越精确
+DEFAULT_COMPRESSION = 500
+
+# 尾部缓冲区最多保留的最差样本数；最差 (1−置信度) 比例的样本数不超过该值时 VaR/CVaR 为精确值
+DEFAULT_TAIL_CAPACITY = 100_000
+
+
+def tail_capacity(n_paths, confidence=0.95):
+    """
+    尾部缓冲区容量：恰好覆盖最差 (1−置信度) 比例的样本（另留 2 个插值余量），不超过默认上限
+    """
+    return int(min(DEFAULT_TAIL_CAPACITY, np.ceil((1 - confidence) * n_paths) + 2))
+
+
+class RunningMoments:
+    """
+    流式均值与方差（按块合并的 Welford/Chan 公式），可跨进程合并
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size:
+            mean = float(values.mean())
+            self._combine(values.size, mean, float(np.dot(values - mean, values - mean)))
+        return self
+
+    def merge(self, other):
+        if other.n:
+            self._combine(other.n, other.mean, other.m2)
+        return self
+
+    def _combine(self, n, mean, m2):
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.m2 / self.n)) if self.n else 0.0
+
+
+class TDigest:
+    """
+    合并式 t-digest 分位数草图
+
+    样本与已有质心一起排序后按 k1 尺度函数 k(q) = δ/(2π)·arcsin(2q−1) 分组，每组 k 跨度
+    不超过 1：两端质心小（尾部分位数精确），中间质心大。分组用 reduceat 一次完成，
+    质心数约 δ/2，与样本数无关；两个草图合并即拼接质心后重新压缩。
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def n(self):
+        return float(self.weights.sum())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size:
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self._compress(np.concatenate([self.means, values]),
+                           np.concatenate([self.weights, np.ones(values.size)]))
+        return self
+
+    def merge(self, other):
+        if other.weights.size:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]),
+                           np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        cum = np.cumsum(weights)
+        q_left = (cum - weights) / cum[-1]
+        k = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q_left - 1))
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q):
+        """
+        分位数：在质心中点（累计权重）之间线性插值，两端取最小值与最大值
+        """
+        cum = np.cumsum(self.weights)
+        centers = cum - self.weights / 2
+        return np.interp(np.asarray(q) * cum[-1], np.r_[0.0, centers, cum[-1]],
+                         np.r_[self.min, self.means, self.max])
+
+
+class TailBuffer:
+    """
+    保留最差 capacity 个样本的尾部缓冲区，逐块用 np.partition 截断，可跨进程合并
+    """
+
+    def __init__(self, capacity=DEFAULT_TAIL_CAPACITY):
+        self.capacity = int(capacity)
+        self.values = np.empty(0)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.values = self._keep(np.concatenate([self.values, values]))
+        return self
+
+    def merge(self, other):
+        self.values = self._keep(np.concatenate([self.values, other.values]))
+        return self
+
+    def _keep(self, values):
+        if values.size > self.capacity:
+            return np.partition(values, self.capacity - 1)[:self.capacity]
+        return values
+
+    def covers(self, q, n):
+        """
+        缓冲区是否包含计算 q 分位数与左尾均值所需的全部样本
+        """
+        return int(np.floor((n - 1) * q)) + 2 <= self.values.size or self.values.size == n
+
+    def tail(self, q, n):
+        """
+        精确 VaR（与 np.quantile 线性插值口径一致）、CVaR（与 PnLHistogram.tail_mean 口径一致）
+        及尾部样本方差
+        """
+        worst = np.sort(self.values)
+        pos = (n - 1) * q
+        i = int(np.floor(pos))
+        var = worst[i] + (pos - i) * (worst[min(i + 1, worst.size - 1)] - worst[i])
+        target = q * n
+        whole = int(np.floor(target))
+        partial = (target - whole) * worst[whole] if whole < worst.size else 0.0
+        cvar = (worst[:whole].sum() + partial) / target
+        tail = worst[:max(int(np.ceil(target)), 1)]
+        return float(var), float(cvar), float(tail.var())
+
+
+class StreamingRisk:
+    """
+    流式风险累加器：固定分箱直方图 + t-digest + 流式均值方差 + 尾部缓冲区
+
+    逐块消费盈亏样本，各组成部分都可合并，内存只与分箱数、压缩参数和缓冲区容量有关。
+    汇总时尾部缓冲区覆盖所需样本则给出精确 VaR/CVaR，否则取直方图插值；
+    同时给出 VaR、CVaR、亏损概率与均值的标准误。
+    """
+
+    def __init__(self, hist, compression=DEFAULT_COMPRESSION, tail_capacity=DEFAULT_TAIL_CAPACITY):
+        self.hist = hist
+        self.digest = TDigest(compression)
+        self.moments = RunningMoments()
+        self.tail = TailBuffer(tail_capacity)
+
+    @property
+    def n(self):
+        return self.moments.n
+
+    def empty_like(self):
+        return StreamingRisk(self.hist.empty_like(), self.digest.compression, self.tail.capacity)
+
+    def update(self, pnl):
+        self.hist.update(pnl)
+        self.digest.update(pnl)
+        self.moments.update(pnl)
+        self.tail.update(pnl)
+        return self
+
+    def merge(self, other):
+        self.hist.merge(other.hist)
+        self.digest.merge(other.digest)
+        self.moments.merge(other.moments)
+        self.tail.merge(other.tail)
+        return self
+
+    def density(self, q):
+        """
+        q 分位点处的概率密度估计（t-digest 分位数的中心差分），用于 VaR 标准误
+        """
+        h = min(q / 2, max(0.1 * q, 1 / np.sqrt(self.n)))
+        spread = float(self.digest.quantile(q + h) - self.digest.quantile(q - h))
+        return 2 * h / spread if spread > 0 else np.inf
+
+    def summary(self, confidence=0.95):
+        """
+        汇总风险指标，字段同 summarize_histogram，另含各指标的标准误与 t-digest 分位数
+        """
+        from .montecarlo import summarize_histogram
+        alpha = 1 - confidence
+        n = self.n
+        result = summarize_histogram(self.hist, confidence)
+        exact = self.tail.covers(alpha, n)
+        if exact:
+            var, cvar, tail_var = self.tail.tail(alpha, n)
+        else:
+            var, cvar = result["var"], result["cvar"]
+            centers = 0.5 * (self.hist.edges[:-1] + self.hist.edges[1:])
+            below = centers <= var
+            counts = self.hist.counts[below]
+            tail_var = float(np.average((centers[below] - cvar) ** 2, weights=counts)) if counts.sum() else 0.0
+        prob_loss = result["prob_loss"]
+        std = self.moments.std
+        result.update(
+            var=var,
+            cvar=cvar,
+            mean=self.moments.mean,
+            std=std,
+            # 分位数渐近标准误 sqrt(α(1−α)/n)/f(VaR)；CVaR 标准误含尾部方差与分位数估计误差
+            var_se=float(np.sqrt(alpha * (1 - alpha) / n) / self.density(alpha)),
+            cvar_se=float(np.sqrt((tail_var + (1 - alpha) * (var - cvar) ** 2) / (alpha * n))),
+            prob_loss_se=float(np.sqrt(prob_loss * (1 - prob_loss) / n)),
+            mean_se=float(std / np.sqrt(n)),
+            var_digest=float(self.digest.quantile(alpha)),
+            exact_tail=bool(exact),
+        )
+        return result
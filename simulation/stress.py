@@ -0,0 +1,102 @@
+import numpy as np
+
+from .pricing import black76_price
+from .strategy import dynamic_hedge_ratio
+
+# 情景参数向量：现货、期货为相对涨跌幅（小数），隐含波动率为绝对变动（小数），持续天数为自然日
+SCENARIO_FIELDS = ("spot_shock", "futures_shock", "iv_shift", "days")
+
+# 界面与导出使用的情景参数列名
+SCENARIO_LABELS = {
+    "spot_shock": "现货冲击(%)",
+    "futures_shock": "期货冲击(%)",
+    "iv_shift": "波动率变动(百分点)",
+    "days": "持续天数",
+}
+
+# 压力测试逐情景输出列
+STRESS_COLUMNS = ("冲击后现货", "冲击后期货", "基差变动", "现货盈亏", "期货对冲", "网格策略", "卖权策略", "总利润")
+
+# 螺纹钢主力合约历史行情冲击 (现货, 期货, 隐含波动率变动, 持续天数)
+# 涨跌幅为阶段高低点之间的近似值，用于情景分析而非精确复现
+HISTORICAL_SCENARIOS = {
+    "2016年供给侧改革急涨": (0.40, 0.45, 0.15, 80),
+    "2020年3月疫情冲击": (-0.06, -0.08, 0.08, 20),
+    "2021年5月黑色系急涨": (0.18, 0.20, 0.12, 20),
+    "2021年5月下旬调控回落": (-0.18, -0.22, 0.08, 10),
+    "2021年10月限产后暴跌": (-0.25, -0.28, 0.08, 25),
+    "2022年6-7月地产风险下跌": (-0.20, -0.23, 0.06, 40),
+}
+
+
+def scenario_vectors(rows):
+    """
+    情景字典 {名称: (现货, 期货, 波动率变动, 天数)} 转为 (名称列表, {参数: 数组})
+    """
+    names = list(rows)
+    values = np.asarray([rows[name] for name in names], dtype=float).reshape(len(names), len(SCENARIO_FIELDS))
+    return names, dict(zip(SCENARIO_FIELDS, values.T))
+
+
+def shock_grid(spot_shocks, basis_shifts, iv_shifts, days, spot_base, futures_base):
+    """
+    假设情景网格：现货涨跌幅 × 基差变动（元/吨）× 波动率变动 的笛卡尔积，返回 {参数: 数组}
+
+    基差 = 现货 − 期货，期货冲击由现货变动与基差变动换算：F1 = F0 + ΔS − Δ基差。
+    """
+    spot, basis, iv = (grid.ravel() for grid in np.meshgrid(
+        np.asarray(spot_shocks, dtype=float), np.asarray(basis_shifts, dtype=float),
+        np.asarray(iv_shifts, dtype=float), indexing="ij"
+    ))
+    return {
+        "spot_shock": spot,
+        "futures_shock": (spot_base * spot - basis) / futures_base,
+        "iv_shift": iv,
+        "days": np.full(spot.shape, float(days)),
+    }
+
+
+def stress_test(strategy_params, futures_base, scenarios, days_to_expiry, r=0.025, implied_vol=0.2):
+    """
+    按情景参数向量一次性重估当前持仓，返回 {列名: (情景数,)}
+
+    各分项与策略盈亏表口径一致（现货、期货、网格相对当前价计盈亏，对冲比例按策略规则
+    取冲击后价格对应的比例），区别在于期货腿按冲击后期货价格计盈亏（体现基差风险），
+    卖出看涨期权按 Black-76 以剩余期限和冲击后隐含波动率重估：盈亏 = 收取的权利金 − 当前市值；
+    含多腿期权组合（option_book）时按组合逐腿重估。
+    """
+    spot_shock, futures_shock, iv_shift, days = (np.asarray(scenarios[name], dtype=float)
+                                                 for name in SCENARIO_FIELDS)
+    spot_base = strategy_params["spot_base"]
+    warehouse = strategy_params["warehouse"]
+    spot = spot_base * (1 + spot_shock)
+    futures = futures_base * (1 + futures_shock)
+
+    if strategy_params["dynamic_hedge"]:
+        hedge_ratio = dynamic_hedge_ratio(spot, spot_base, strategy_params["min_hedge"],
+                                          strategy_params["max_hedge"], strategy_params["hedge_threshold"])
+    else:
+        hedge_ratio = strategy_params["hedge_ratio"]
+
+    grid_profit = strategy_params["grid_profit_per_ton"]
+    if callable(grid_profit):
+        grid_profit = grid_profit(spot)
+
+    shocked_vol = np.maximum(implied_vol + iv_shift, 0.0)
+    option_book = strategy_params.get("option_book")
+    if option_book is not None:
+        option_pnl = option_book.pnl(futures, days, r, shocked_vol)
+    else:
+        option_tons = strategy_params["option_ratio"] / 100 * warehouse
+        remaining = np.maximum(days_to_expiry - days, 0) / 365
+        option_value = black76_price(futures, strategy_params["strike_price"], remaining, r, shocked_vol, "c")
+        option_pnl = (strategy_params["option_premium"] - option_value) * option_tons
+
+    spot_pnl = (spot - spot_base) * warehouse
+    hedge_pnl = -(futures - futures_base) * hedge_ratio / 100 * warehouse
+    grid_pnl = grid_profit * strategy_params["grid_ratio"] / 100 * warehouse
+    basis_change = (spot - spot_base) - (futures - futures_base)
+    total = spot_pnl + hedge_pnl + grid_pnl + option_pnl
+    return dict(zip(STRESS_COLUMNS, np.broadcast_arrays(
+        spot, futures, basis_change, spot_pnl, hedge_pnl, grid_pnl, option_pnl, total
+    )))
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from .strategy import strategy_pnl
+
+# 可扫描的策略参数及显示名称
+SWEEP_PARAMS = {
+    "hedge_ratio": "对冲比例",
+    "grid_ratio": "网格比例",
+    "option_ratio": "期权比例",
+    "option_premium": "期权权利金",
+    "strike_price": "执行价格",
+    "grid_profit_per_ton": "网格收益",
+    "min_hedge": "最低对冲比例",
+    "max_hedge": "最高对冲比例",
+    "hedge_threshold": "波动阈值",
+}
+
+# 每个参数组合输出的指标
+SWEEP_METRICS = ("最大利润", "最小利润", "最大回撤", "95% VaR", "盈亏平衡点")
+
+# 单个分块允许的 (参数组合 × 价格点) 单元数，用于限制内存占用
+DEFAULT_MAX_CELLS = 1_000_000
+
+
+def parameter_combinations(ranges):
+    """
+    参数取值的笛卡尔积，返回 {参数名: 一维数组}，各数组长度为组合数
+    """
+    names = list(ranges)
+    axes = [np.asarray(ranges[name], dtype=float).ravel() for name in names]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    return {name: m.ravel() for name, m in zip(names, mesh)}
+
+
+def combination_count(ranges):
+    """
+    参数组合总数
+    """
+    return int(np.prod([np.size(values) for values in ranges.values()]))
+
+
+def combination_slice(ranges, start, stop):
+    """
+    第 start 至 stop 个参数组合（与 parameter_combinations 顺序一致），无需展开全部组合
+    """
+    names = list(ranges)
+    axes = [np.asarray(ranges[name], dtype=float).ravel() for name in names]
+    index = np.unravel_index(np.arange(start, stop), [len(axis) for axis in axes])
+    return {name: axis[i] for name, axis, i in zip(names, axes, index)}
+
+
+def profit_surface(prices, base_params, **axes):
+    """
+    总利润曲面：每个扫描参数占一个维度，最后一维为价格
+
+    例如 profit_surface(prices, params, hedge_ratio=[10, 20, 30]) 返回 (3, 价格点数)。
+    """
+    prices = np.asarray(prices, dtype=float)
+    ndim = len(axes) + 1
+    params = dict(base_params)
+    for i, (name, values) in enumerate(axes.items()):
+        shape = [1] * ndim
+        shape[i] = -1
+        params[name] = np.asarray(values, dtype=float).reshape(shape)
+    return strategy_pnl(prices, **params)["总利润"]
+
+
+def surface_metrics(prices, totals):
+    """
+    沿价格维计算每个参数组合的风险指标：最大/最小利润、最大回撤、95% VaR、盈亏平衡点
+    """
+    prices = np.asarray(prices, dtype=float)
+    max_profit = totals.max(axis=1)
+    min_profit = totals.min(axis=1)
+
+    # 第一个变号区间内线性插值得到盈亏平衡点
+    sign = totals >= 0
+    crossing = sign[:, 1:] != sign[:, :-1]
+    has_cross = crossing.any(axis=1)
+    i = np.argmax(crossing, axis=1)
+    rows = np.arange(totals.shape[0])
+    t0, t1 = totals[rows, i], totals[rows, i + 1]
+    p0, p1 = prices[i], prices[i + 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        breakeven = np.where(has_cross, p0 - t0 * (p1 - p0) / (t1 - t0), np.nan)
+
+    return {
+        "最大利润": max_profit,
+        "最小利润": min_profit,
+        "最大回撤": max_profit - min_profit,
+        "95% VaR": np.quantile(totals, 0.05, axis=1),
+        "盈亏平衡点": breakeven,
+    }
+
+
+def sweep_chunks(n_combos, n_prices, max_cells=DEFAULT_MAX_CELLS):
+    """
+    按单块单元数上限划分组合区间，返回 [(start, stop), ...]
+    """
+    chunk = max(1, max_cells // max(n_prices, 1))
+    return [(start, min(start + chunk, n_combos)) for start in range(0, n_combos, chunk)]
+
+
+def sweep_chunk(prices, base_params, ranges, start, stop):
+    """
+    计算第 start 至 stop 个参数组合的总利润矩阵及指标，串行与并行共用
+    """
+    prices = np.asarray(prices, dtype=float)
+    params = dict(base_params)
+    params.update({name: values[:, None] for name, values in combination_slice(ranges, start, stop).items()})
+    totals = np.broadcast_to(
+        strategy_pnl(prices[None, :], **params)["总利润"], (stop - start, len(prices))
+    )
+    return surface_metrics(prices, totals), totals
+
+
+def sweep_summary(ranges, metrics):
+    """
+    组装参数扫描汇总表：参数列在前，指标列在后
+    """
+    summary = pd.DataFrame({SWEEP_PARAMS.get(name, name): values
+                            for name, values in parameter_combinations(ranges).items()})
+    for key, values in metrics.items():
+        summary[key] = values
+    return summary
+
+
+def sweep_strategy(prices, base_params, ranges, max_cells=DEFAULT_MAX_CELLS, keep_surface=False):
+    """
+    批量参数扫描：对参数笛卡尔积一次性广播计算盈亏模型
+
+    按组合分块计算，每块不超过 max_cells 个 (组合 × 价格) 单元，内存与组合总数无关。
+    返回 (汇总表, 曲面)；keep_surface=False 时曲面为 None。
+    """
+    prices = np.asarray(prices, dtype=float)
+    n_combos = combination_count(ranges)
+
+    metrics = {key: np.empty(n_combos) for key in SWEEP_METRICS}
+    surface = np.empty((n_combos, len(prices))) if keep_surface else None
+    for start, stop in sweep_chunks(n_combos, len(prices), max_cells):
+        chunk_metrics, totals = sweep_chunk(prices, base_params, ranges, start, stop)
+        for key, values in chunk_metrics.items():
+            metrics[key][start:stop] = values
+        if keep_surface:
+            surface[start:stop] = totals
+
+    return sweep_summary(ranges, metrics), surface
@@ -0,0 +1,143 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .cache import LRUCache
+from .pricing import black76_greeks, black76_price
+
+# 期权报价链列名（支持中文表头）
+CHAIN_COLUMNS = {
+    "执行价": "strike",
+    "剩余天数": "expiry_days",
+    "类型": "type",
+    "权利金": "price",
+    "期货价格": "futures",
+}
+
+# 已拟合波动率曲面的缓存，键为报价快照的哈希
+SURFACE_CACHE = LRUCache(maxsize=32)
+
+
+def implied_vol(price, F, K, T, r, flag="c", tol=1e-8, max_iter=100, low=1e-4, high=5.0):
+    """
+    向量化隐含波动率求解：牛顿迭代，步长越出括号区间或Vega过小时改用二分
+
+    全部参数可为数组；报价低于内在价值或高于理论上限时返回 NaN。
+    """
+    price, F, K, T, r = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (price, F, K, T, r)))
+    flag = np.broadcast_to(np.asarray(flag), price.shape)
+    is_call = flag == "c"
+
+    # 无套利边界检查
+    discount = np.exp(-r * T)
+    lower = discount * np.where(is_call, np.maximum(F - K, 0), np.maximum(K - F, 0))
+    upper = discount * np.where(is_call, F, K)
+    valid = (T > 0) & (price > lower) & (price < upper)
+
+    lo = np.full(price.shape, low)
+    hi = np.full(price.shape, high)
+    # Brenner-Subrahmanyam 近似作为初值
+    sigma = np.clip(np.sqrt(2 * np.pi / np.where(T > 0, T, 1.0)) * price / F, low * 2, high / 2)
+    active = valid.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        diff = black76_price(F, K, T, r, sigma, flag) - price
+        active &= np.abs(diff) > tol
+        hi = np.where(active & (diff > 0), sigma, hi)
+        lo = np.where(active & (diff <= 0), sigma, lo)
+
+        vega = black76_greeks(F, K, T, r, sigma, flag)["vega"] * 100
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = sigma - diff / vega
+        use_newton = (vega > 1e-12) & (newton > lo) & (newton < hi)
+        sigma = np.where(active, np.where(use_newton, newton, 0.5 * (lo + hi)), sigma)
+
+    return np.where(valid, sigma, np.nan)
+
+
+def read_option_chain(source):
+    """
+    读取期权报价链（CSV/Parquet 文件路径或文件对象），统一列名
+    """
+    name = getattr(source, "name", str(source))
+    chain = pd.read_parquet(source) if name.endswith(".parquet") else pd.read_csv(source)
+    chain = chain.rename(columns=CHAIN_COLUMNS)
+    kind = chain["type"].astype(str).str.strip().str.lower()
+    chain["type"] = np.where((kind.str[0] == "c") | kind.isin(["认购", "看涨"]), "c", "p")
+    return chain
+
+
+class VolSurface:
+    """
+    隐含波动率曲面：同一到期日内按执行价线性插值，跨到期日按总方差线性插值，区间外平推
+    """
+
+    def __init__(self, expiry_days, strikes, vols):
+        expiry_days = np.asarray(expiry_days, dtype=float)
+        strikes = np.asarray(strikes, dtype=float)
+        vols = np.asarray(vols, dtype=float)
+        keep = np.isfinite(vols)
+        expiry_days, strikes, vols = expiry_days[keep], strikes[keep], vols[keep]
+
+        self.expiries = np.unique(expiry_days)
+        self.smiles = []
+        for expiry in self.expiries:
+            mask = expiry_days == expiry
+            order = np.argsort(strikes[mask])
+            self.smiles.append((strikes[mask][order], vols[mask][order]))
+
+    def __call__(self, strike, expiry_days):
+        """
+        查询隐含波动率，strike 与 expiry_days 可为数组
+        """
+        strike, expiry_days = np.broadcast_arrays(np.asarray(strike, dtype=float),
+                                                  np.asarray(expiry_days, dtype=float))
+        # 各到期日切片上的插值结果，形状 (到期日数, ...)
+        slices = np.stack([np.interp(strike, k, v) for k, v in self.smiles])
+        if len(self.expiries) == 1:
+            return slices[0]
+
+        t = np.clip(expiry_days, self.expiries[0], self.expiries[-1])
+        j = np.clip(np.searchsorted(self.expiries, t) - 1, 0, len(self.expiries) - 2)
+        t0, t1 = self.expiries[j], self.expiries[j + 1]
+        w = (t - t0) / (t1 - t0)
+        v0 = np.take_along_axis(slices, j[None, ...], axis=0)[0]
+        v1 = np.take_along_axis(slices, (j + 1)[None, ...], axis=0)[0]
+        total_var = (1 - w) * v0 ** 2 * t0 + w * v1 ** 2 * t1
+        return np.sqrt(total_var / t)
+
+    def to_frame(self):
+        """
+        曲面节点展开为表格（剩余天数、执行价、隐含波动率）
+        """
+        rows = [(expiry, k, v) for expiry, (strikes, vols) in zip(self.expiries, self.smiles)
+                for k, v in zip(strikes, vols)]
+        return pd.DataFrame(rows, columns=["剩余天数", "执行价", "隐含波动率"])
+
+
+def snapshot_key(chain, futures_price, r):
+    """
+    报价快照的哈希键：报价内容、标的价格与利率相同则命中缓存
+    """
+    digest = hashlib.sha1(pd.util.hash_pandas_object(chain, index=False).values.tobytes())
+    digest.update(np.asarray([futures_price, r], dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+def fit_surface(chain, futures_price, r, cache=SURFACE_CACHE):
+    """
+    由报价链批量反解隐含波动率并构建曲面，相同快照直接取缓存
+
+    chain 需含 strike、expiry_days、type、price 列；含 futures 列时按行使用各自标的价格。
+    """
+    key = snapshot_key(chain, futures_price, r)
+    surface = cache.get(key)
+    if surface is None:
+        F = chain["futures"].values if "futures" in chain else futures_price
+        vols = implied_vol(chain["price"].values, F, chain["strike"].values,
+                           chain["expiry_days"].values / 365, r, chain["type"].values)
+        surface = VolSurface(chain["expiry_days"].values, chain["strike"].values, vols)
+        cache.put(key, surface)
+    return surface
@@ -0,0 +1,45 @@
+from functools import partial
+
+import numpy as np
+import pytest
+
+from simulation import SCENARIO_DEFAULTS, price_grid
+from simulation.optimize import optimize_allocation, resolve_bounds
+from simulation.pricing import black76_price
+
+BASE = {name: SCENARIO_DEFAULTS[name] for name in (
+    "spot_base", "warehouse", "hedge_ratio", "grid_ratio", "option_ratio", "grid_profit_per_ton",
+    "option_premium", "strike_price", "min_hedge", "max_hedge", "hedge_threshold")}
+BASE["dynamic_hedge"] = False
+CONTEXT = dict(capital=1000, risk_free_rate=2.5, days_to_expiry=90, futures_base=BASE["spot_base"] - 200,
+               futures_margin_ratio=10, option_margin_ratio=15)
+LOOSE = {"drawdown": 1.0, "var": 1.0, "margin": 1.0}
+
+
+def run(bounds, premium_fn=None):
+    prices = price_grid(BASE["spot_base"], 0.15)
+    return optimize_allocation(prices, BASE, objective="excess", bounds=bounds, limits=LOOSE,
+                               premium_fn=premium_fn, population=200, generations=3, **CONTEXT)
+
+
+def test_custom_bounds_keys_reach_result_table():
+    bounds = {"hedge_ratio": (0, 50, 5), "grid_profit_per_ton": (0, 50, 5), "max_hedge": (50, 100, 10)}
+    best, table = run(bounds)
+    assert set(bounds) <= set(best)
+    assert {"对冲比例", "网格收益", "最高对冲比例"} <= set(table.columns)
+    # 候选按全部搜索变量去重，不同的网格收益不会被合并
+    assert table["网格收益"].nunique() > 1
+    assert not table.duplicated(subset=["对冲比例", "网格收益", "最高对冲比例"]).any()
+
+
+def test_premium_fn_lists_priced_premium():
+    premium_fn = partial(black76_price, CONTEXT["futures_base"], T=0.25, r=0.025, sigma=0.2)
+    best, table = run({"option_ratio": (0, 30, 1), "strike_ratio": (0.9, 1.2, 50)}, premium_fn)
+    assert {"option_ratio", "strike_price", "option_premium"} <= set(best)
+    assert best["option_premium"] == pytest.approx(float(premium_fn(best["strike_price"])))
+    assert np.isclose(best["strike_price"] % 50, 0)
+
+
+def test_resolve_bounds_rejects_both_strike_keys():
+    with pytest.raises(ValueError):
+        resolve_bounds({"strike_price": (3000, 4000, 50), "strike_ratio": (0.9, 1.1, 50)}, 3700)
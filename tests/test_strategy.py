@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from simulation import (
+    calculate_strategy, calculate_strategy_reference, profit_interval, strategy_kinks, total_profit_fn
+)
+
+# 默认界面参数（vol 为小数，±15%），及执行价低于现货、阈值较大、价格步长非默认的情形
+PARAMS = [
+    dict(spot_base=3700, warehouse=5000, hedge_ratio=20, grid_ratio=10, option_ratio=10,
+         grid_profit_per_ton=20, option_premium=20, vol=0.15, strike_price=3600,
+         min_hedge=10, max_hedge=80, hedge_threshold=5, price_step=50),
+    dict(spot_base=4210, warehouse=1200, hedge_ratio=55, grid_ratio=25, option_ratio=30,
+         grid_profit_per_ton=35, option_premium=80, vol=0.30, strike_price=4050,
+         min_hedge=0, max_hedge=100, hedge_threshold=12, price_step=20),
+    dict(spot_base=3500, warehouse=800, hedge_ratio=40, grid_ratio=5, option_ratio=50,
+         grid_profit_per_ton=10, option_premium=120, vol=0.20, strike_price=3700,
+         min_hedge=20, max_hedge=60, hedge_threshold=3, price_step=7),
+]
+
+
+@pytest.mark.parametrize("dynamic_hedge", [True, False])
+@pytest.mark.parametrize("params", PARAMS)
+def test_vectorized_strategy_matches_reference(params, dynamic_hedge):
+    expected = calculate_strategy_reference(dynamic_hedge=dynamic_hedge, **params)
+    result = calculate_strategy(dynamic_hedge=dynamic_hedge, **params)
+    assert expected["现货价格"].between(params["spot_base"] * 0.5, params["spot_base"] * 1.5).all()
+    pd.testing.assert_frame_equal(result[list(expected.columns)], expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("dynamic_hedge", [True, False])
+@pytest.mark.parametrize("params", PARAMS)
+def test_adaptive_grid_matches_reference(params, dynamic_hedge):
+    result = calculate_strategy(dynamic_hedge=dynamic_hedge, adaptive_grid=True, **params)
+    prices = result["现货价格"].to_numpy()
+    expected = calculate_strategy_reference(dynamic_hedge=dynamic_hedge, prices=prices, **params)
+    pd.testing.assert_frame_equal(result[list(expected.columns)], expected, check_dtype=False)
+
+    # 加密网格包含区间内的全部拐点与盈亏平衡点
+    kinks = strategy_kinks(params["spot_base"], params["strike_price"], dynamic_hedge, params["hedge_threshold"])
+    kinks = kinks[(kinks >= prices[0]) & (kinks <= prices[-1])]
+    assert np.isin(kinks, prices).all()
+    pnl_params = {k: v for k, v in params.items() if k not in ("vol", "price_step")}
+    total_fn = total_profit_fn(dynamic_hedge=dynamic_hedge, **pnl_params)
+    interval = profit_interval(total_fn, prices)
+    if interval is not None:
+        for bound in interval:
+            assert bound in (prices[0], prices[-1]) or abs(total_fn(bound)) < 1e-3 * params["warehouse"]